@@ -1,25 +1,1305 @@
+import click
+import numpy as np
 import requests
-from flask import Flask, render_template_string, request, jsonify
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process rate limiting
+    fcntl = None
+try:  # optional: brotli responses when installed, gzip otherwise
+    import brotli
+except ImportError:
+    brotli = None
+try:  # only needed for the async execution mode
+    import httpx
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:
+    httpx = None
+    WsgiToAsgi = None
+from flask import Flask, Response, abort, g, request, jsonify, send_file, stream_with_context
+import asyncio
+import atexit
+import base64
+import bisect
+import contextvars
+import gzip
+import hashlib
+import heapq
+import itertools
 import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sqlite3
 import threading
+import time
+import zlib
+from urllib.parse import parse_qsl
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
 
-app = Flask(__name__)
+app = Flask(__name__, static_folder=None)  # static/ is served fingerprinted by static_file()
 
 # Replace with your TMDB API key , this is just a random values
 API_KEY = "your_api_here"
-BASE_URL = "https://api.themoviedb.org/3"
+BASE_URL = os.environ.get('TMDB_BASE_URL', "https://api.themoviedb.org/3")  # point at bench/fake_tmdb.py to benchmark
+
+# Logging: records are queued and written by a background thread, so request
+# threads never block on stdout
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s [%(threadName)s] %(message)s'
+LOG_PAYLOADS = os.environ.get('LOG_PAYLOADS', '') == '1'  # dump TMDb error bodies at DEBUG
+LOG_PAYLOAD_LIMIT = 2000  # characters of a dumped body
+LOG_REQUESTS = os.environ.get('LOG_REQUESTS', '1') == '1'  # one structured record per request
+
+log = logging.getLogger('movie_recommender')
+request_log = logging.getLogger('movie_recommender.requests')
+
+
+def _configure_logging():
+    if log.handlers:
+        return
+    records = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    log.addHandler(logging.handlers.QueueHandler(records))
+    log.setLevel(LOG_LEVEL)
+    log.propagate = False
+
+
+_configure_logging()
+
+
+def _log_upstream_failure(label, response):
+    """Warn about a non-200 TMDb answer; the body only when LOG_PAYLOADS is on"""
+    log.warning("%s failed: HTTP %s", label, response.status_code)
+    if LOG_PAYLOADS and log.isEnabledFor(logging.DEBUG):
+        log.debug("%s response body: %s", label, response.text[:LOG_PAYLOAD_LIMIT])
+
+
+class LogFields(dict):
+    """key=value pairs rendered only if the record is actually emitted"""
+
+    def __str__(self):
+        return ' '.join(f"{key}={value}" for key, value in self.items())
+
+
+class RequestTrace:
+    """Counters for one incoming request: TMDb calls, upstream time and cache lookups.
+
+    The active trace lives in a context variable, so coroutines and fan-out
+    work submitted with copy_context() add to the request that caused them.
+    Background refreshes and warm-up run outside any trace.
+    """
+
+    _current = contextvars.ContextVar('request_trace', default=None)
+
+    def __init__(self, route, method='GET'):
+        self.route = route
+        self.method = method
+        self.started = time.perf_counter()
+        self.counts = {'tmdb_calls': 0, 'cache_hits': 0, 'cache_misses': 0}
+        self.upstream_time = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def begin(cls, route, method='GET'):
+        trace = cls(route, method)
+        return trace, cls._current.set(trace)
+
+    @classmethod
+    def current(cls):
+        return cls._current.get()
+
+    @classmethod
+    def count(cls, name, elapsed=None):
+        trace = cls._current.get()
+        if trace is not None:
+            with trace._lock:
+                trace.counts[name] += 1
+                if elapsed is not None:
+                    trace.upstream_time += elapsed
+
+    def detach(self, token):
+        """Stop being the active trace; a streamed response calls finish() once its body is sent"""
+        self._current.reset(token)
+
+    def finish(self, token, status):
+        if token is not None:
+            self._current.reset(token)
+        total = time.perf_counter() - self.started
+        metrics.observe_request(self.route, status, total)
+        if LOG_REQUESTS and request_log.isEnabledFor(logging.INFO):
+            request_log.info("%s", LogFields(
+                method=self.method, route=self.route, status=status,
+                total_ms=round(total * 1000, 1), upstream_ms=round(self.upstream_time * 1000, 1),
+                **self.counts))
+
+
+# Metrics served on /metrics in the Prometheus text exposition format
+METRICS_PREFIX = 'movie_recommender'
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def metric_lines(name, kind, help_text, samples):
+    """Exposition lines for one metric family; samples are (labels dict, value)"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        label_text = ','.join(f'{key}="{_label_value(val)}"' for key, val in labels.items())
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return lines
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram keyed by a tuple of label values.
+
+    observe() is a bisect plus three additions under one lock, cheap enough
+    for every request and every TMDb call.
+    """
+
+    def __init__(self, name, help_text, label_names, buckets=METRICS_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, seconds):
+        slot = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[slot] += 1
+            series[-1] += seconds
+
+    def render(self):
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, series in sorted(snapshot.items()):
+            labels = ','.join(f'{key}="{_label_value(val)}"' for key, val in zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-1]}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class Metrics:
+    """Request and TMDb instrumentation for /metrics.
+
+    Route and upstream observations are pushed as they happen; cache, rate
+    limiter and recommender numbers are pulled from their stats() at scrape time.
+    """
+
+    def __init__(self, prefix=METRICS_PREFIX):
+        self.prefix = prefix
+        self.request_latency = Histogram(
+            f"{prefix}_http_request_duration_seconds", 'Time spent serving each route', ('route',))
+        self.upstream_latency = Histogram(
+            f"{prefix}_tmdb_request_duration_seconds", 'TMDb call latency including retries', ('endpoint',))
+        self._responses = {}  # (route, status) -> count
+        self._upstream_statuses = {}  # (endpoint, status) -> count
+        self._upstream_inflight = {}  # endpoint -> calls currently waiting on TMDb
+        self._upstream_rate_limited = {}  # endpoint -> calls refused by the rate limiter before sending
+        self._lock = threading.Lock()
+
+    def observe_request(self, route, status, seconds):
+        self.request_latency.observe((route,), seconds)
+        with self._lock:
+            self._responses[route, status] = self._responses.get((route, status), 0) + 1
+
+    def upstream_started(self, endpoint):
+        with self._lock:
+            self._upstream_inflight[endpoint] = self._upstream_inflight.get(endpoint, 0) + 1
+
+    def observe_upstream(self, endpoint, status, seconds):
+        self.upstream_latency.observe((endpoint,), seconds)
+        status = 'error' if status is None else status
+        with self._lock:
+            self._upstream_inflight[endpoint] -= 1
+            self._upstream_statuses[endpoint, status] = self._upstream_statuses.get((endpoint, status), 0) + 1
+
+    def upstream_rate_limited(self, endpoint):
+        with self._lock:
+            self._upstream_rate_limited[endpoint] = self._upstream_rate_limited.get(endpoint, 0) + 1
+
+    def render(self, collectors=()):
+        """The whole exposition text; collectors are callables returning more lines"""
+        prefix = self.prefix
+        with self._lock:
+            responses = sorted(self._responses.items(), key=str)
+            statuses = sorted(self._upstream_statuses.items(), key=str)
+            inflight = sorted(self._upstream_inflight.items())
+            rate_limited = sorted(self._upstream_rate_limited.items())
+        lines = self.request_latency.render()
+        lines += metric_lines(f"{prefix}_http_responses_total", 'counter', 'Responses by route and status code',
+                              [({'route': route, 'status': status}, count) for (route, status), count in responses])
+        lines += self.upstream_latency.render()
+        lines += metric_lines(f"{prefix}_tmdb_responses_total", 'counter',
+                              'TMDb responses by endpoint and status code ("error" when no response arrived)',
+                              [({'endpoint': endpoint, 'status': status}, count)
+                               for (endpoint, status), count in statuses])
+        lines += metric_lines(f"{prefix}_tmdb_errors_total", 'counter',
+                              'TMDb calls that failed or returned a 4xx/5xx, by endpoint and status code',
+                              [({'endpoint': endpoint, 'status': status}, count)
+                               for (endpoint, status), count in statuses
+                               if status == 'error' or status >= 400])
+        lines += metric_lines(f"{prefix}_tmdb_inflight_requests", 'gauge', 'TMDb calls currently in flight',
+                              [({'endpoint': endpoint}, count) for endpoint, count in inflight])
+        lines += metric_lines(f"{prefix}_tmdb_rate_limited_total", 'counter',
+                              'TMDb calls refused by the client-side rate limiter before anything was sent',
+                              [({'endpoint': endpoint}, count) for endpoint, count in rate_limited])
+        for collect in collectors:
+            lines += collect()
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+# HTTP transport settings for TMDb calls
+HTTP_POOL_SIZE = 20
+HTTP_CONNECT_TIMEOUT = 3.05
+HTTP_READ_TIMEOUT = 10
+HTTP_MAX_RETRIES = 3
+HTTP_BACKOFF_FACTOR = 0.5
+HTTP_RETRY_STATUSES = (500, 502, 503, 504)  # 429 is handled by the rate limiter
+
+# Concurrent detail fetches in get_similar_by_genre
+FANOUT_WORKERS = 8
+FANOUT_DEADLINE = 8  # seconds per request
+
+
+# Client-side rate limiting of TMDb calls (token bucket per API key)
+RATE_LIMIT_PER_SECOND = 40
+RATE_LIMIT_BURST = 40
+RATE_LIMIT_MAX_WAIT = 5  # seconds a 'queue' caller may wait for a token
+RATE_LIMIT_POLICY = os.environ.get('RATE_LIMIT_POLICY', 'queue')  # queue | shed | stale
+RATE_LIMIT_FILE = os.environ.get('RATE_LIMIT_FILE')  # share buckets across processes on one host
+
+
+class RateLimitExceeded(Exception):
+    """No TMDb request budget was available for this call.
+
+    allow_stale tells the cache layer it may answer with an expired entry.
+    """
+
+    def __init__(self, retry_after, allow_stale=False):
+        super().__init__(f"TMDb rate limit exhausted; retry in {retry_after:.2f}s")
+        self.retry_after = retry_after
+        self.allow_stale = allow_stale
+
+
+class TokenBucket:
+    """In-process token bucket, safe to share between threads; timed on the monotonic clock"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def take(self):
+        """Take a token; returns 0 on success, else seconds until one is available"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def pause(self, seconds):
+        """Stop handing out tokens for a while (e.g. after a 429 with Retry-After)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+class FileTokenBucket:
+    """Token bucket whose state lives in a lock-protected file shared by worker processes"""
+
+    def __init__(self, path, key, rate, burst):
+        if fcntl is None:
+            raise RuntimeError("FileTokenBucket needs fcntl (POSIX only)")
+        self.path = path
+        self.key = key
+        self.rate = rate
+        self.burst = burst
+
+    def _update(self, change):
+        with open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                buckets = json.loads(raw) if raw else {}
+                state = buckets.get(self.key) or {'tokens': self.burst, 'updated': time.time(), 'paused_until': 0}
+                result = change(state, time.time())
+                buckets[self.key] = state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(buckets))
+                f.flush()
+                return result
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def take(self):
+        def change(state, now):
+            if now < state['paused_until']:
+                return state['paused_until'] - now
+            state['tokens'] = min(self.burst, state['tokens'] + (now - state['updated']) * self.rate)
+            state['updated'] = now
+            if state['tokens'] >= 1:
+                state['tokens'] -= 1
+                return 0
+            return (1 - state['tokens']) / self.rate
+        return self._update(change)
+
+    def pause(self, seconds):
+        def change(state, now):
+            state['paused_until'] = max(state['paused_until'], now + seconds)
+            state['tokens'] = 0
+        self._update(change)
+
+
+class RateLimiter:
+    """Per-API-key token buckets with queue / shed / stale policies.
+
+    queue: wait up to max_wait seconds for a token, then give up.
+    shed:  fail immediately when the budget is exhausted.
+    stale: fail immediately, but let the cache answer with an expired entry.
+    """
+
+    _shared = None
+
+    def __init__(self, rate=RATE_LIMIT_PER_SECOND, burst=RATE_LIMIT_BURST,
+                 max_wait=RATE_LIMIT_MAX_WAIT, path=RATE_LIMIT_FILE):
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.path = path
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._stats = {'granted': 0, 'queued': 0, 'rejected': 0, 'backoffs': 0}
+
+    @classmethod
+    def shared(cls):
+        """The process-wide limiter used by default for every TMDb client"""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def bucket(self, key):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if self.path:
+                    bucket = FileTokenBucket(self.path, hashlib.sha1(key.encode()).hexdigest(), self.rate, self.burst)
+                else:
+                    bucket = TokenBucket(self.rate, self.burst)
+                self._buckets[key] = bucket
+            return bucket
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _wait_or_raise(self, wait, waited, policy):
+        """Seconds to sleep before retrying, or raise RateLimitExceeded"""
+        if policy != 'queue' or waited + wait > self.max_wait:
+            self._count('rejected')
+            raise RateLimitExceeded(wait, allow_stale=(policy == 'stale'))
+        if waited == 0:
+            self._count('queued')
+        return wait
+
+    def acquire(self, key, policy=RATE_LIMIT_POLICY):
+        bucket = self.bucket(key)
+        waited = 0.0
+        while True:
+            wait = bucket.take()
+            if wait == 0:
+                self._count('granted')
+                return
+            wait = self._wait_or_raise(wait, waited, policy)
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, key, policy=RATE_LIMIT_POLICY):
+        bucket = self.bucket(key)
+        # A shared file bucket takes a flock and reads the file; keep that off the event loop
+        shared = isinstance(bucket, FileTokenBucket)
+        waited = 0.0
+        while True:
+            wait = await asyncio.to_thread(bucket.take) if shared else bucket.take()
+            if wait == 0:
+                self._count('granted')
+                return
+            wait = self._wait_or_raise(wait, waited, policy)
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def backoff(self, key, response_headers, attempt):
+        """Pause a key's bucket after a 429, honouring Retry-After; returns the pause length"""
+        seconds = self._backoff_seconds(response_headers, attempt)
+        self.bucket(key).pause(seconds)
+        self._count('backoffs')
+        return seconds
+
+    async def backoff_async(self, key, response_headers, attempt):
+        seconds = self._backoff_seconds(response_headers, attempt)
+        bucket = self.bucket(key)
+        if isinstance(bucket, FileTokenBucket):
+            await asyncio.to_thread(bucket.pause, seconds)
+        else:
+            bucket.pause(seconds)
+        self._count('backoffs')
+        return seconds
+
+    @staticmethod
+    def _backoff_seconds(response_headers, attempt):
+        retry_after = response_headers.get('Retry-After', '')
+        return float(retry_after) if retry_after.replace('.', '', 1).isdigit() else HTTP_BACKOFF_FACTOR * (2 ** attempt)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+class _TransportStats:
+    """Per-endpoint latency counters shared by the sync and async transports"""
+
+    def _init_stats(self):
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def endpoint_name(self, url):
+        """Collapse a request URL into an endpoint label, e.g. movie/{id}/similar"""
+        path = url[len(self.base_url):] if url.startswith(self.base_url) else url
+        return re.sub(r'/\d+', '/{id}', path).strip('/')
+
+    def _stat(self, endpoint):
+        stat = self._stats.get(endpoint)
+        if stat is None:
+            stat = self._stats[endpoint] = {
+                'count': 0, 'errors': 0, 'rate_limited': 0, 'total_time': 0.0, 'max_time': 0.0
+            }
+        return stat
+
+    def _record(self, endpoint, elapsed, status, api_call=True):
+        if api_call:  # CDN image fetches are not TMDb API calls
+            RequestTrace.count('tmdb_calls', elapsed)
+        metrics.observe_upstream(endpoint, status, elapsed)
+        with self._stats_lock:
+            stat = self._stat(endpoint)
+            stat['count'] += 1
+            stat['total_time'] += elapsed
+            stat['max_time'] = max(stat['max_time'], elapsed)
+            if status is None or status >= 400:
+                stat['errors'] += 1
+
+    def _record_rate_limited(self, endpoint):
+        """A call the rate limiter refused before sending; neither a TMDb call nor an error"""
+        metrics.upstream_rate_limited(endpoint)
+        with self._stats_lock:
+            self._stat(endpoint)['rate_limited'] += 1
+
+    def stats(self):
+        """Per-endpoint call counts and latencies (seconds)"""
+        with self._stats_lock:
+            return {
+                endpoint: dict(stat, avg_time=stat['total_time'] / stat['count'] if stat['count'] else 0.0)
+                for endpoint, stat in self._stats.items()
+            }
+
+
+class TMDbClient(_TransportStats):
+    """Shared keep-alive HTTP transport for every TMDb call"""
+
+    def __init__(self, base_url=BASE_URL, pool_size=HTTP_POOL_SIZE,
+                 connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT,
+                 max_retries=HTTP_MAX_RETRIES, backoff_factor=HTTP_BACKOFF_FACTOR,
+                 rate_limiter=None, rate_limit_policy=RATE_LIMIT_POLICY):
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+
+        self.max_retries = max_retries
+        self.rate_limiter = rate_limiter or RateLimiter.shared()
+        self.rate_limit_policy = rate_limit_policy
+
+        # Retry idempotent GETs on server errors; 429s go through the rate limiter
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=HTTP_RETRY_STATUSES,
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._init_stats()
+
+    def get(self, url, params=None, policy=None):
+        """GET a TMDb URL through the rate limiter and pooled session, recording its latency"""
+        endpoint = self.endpoint_name(url)
+        key = (params or {}).get('api_key', '')
+        start = time.perf_counter()
+        status = None
+        sent = False
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    self.rate_limiter.acquire(key, policy or self.rate_limit_policy)
+                except RateLimitExceeded:
+                    self._record_rate_limited(endpoint)
+                    raise
+                if not sent:
+                    metrics.upstream_started(endpoint)
+                    sent = True
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                status = response.status_code
+                if status != 429 or attempt == self.max_retries:
+                    return response
+                # Every thread sharing the key backs off, not just this one
+                self.rate_limiter.backoff(key, response.headers, attempt)
+        finally:
+            if sent:  # calls the rate limiter refused never reached TMDb
+                self._record(endpoint, time.perf_counter() - start, status)
+
+    def get_image(self, url):
+        """GET an image from TMDb's CDN on the pooled session; images are not API calls, so no rate limit"""
+        metrics.upstream_started('image')
+        start = time.perf_counter()
+        status = None
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            status = response.status_code
+            return response
+        finally:
+            self._record('image', time.perf_counter() - start, status, api_call=False)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncTMDbClient(_TransportStats):
+    """httpx-based async counterpart of TMDbClient for AsyncMovieRecommender.
+
+    Bound to the event loop it is first used on; shares the rate limiter
+    with the sync client and retries 429/5xx with backoff, honouring Retry-After.
+    """
+
+    def __init__(self, base_url=BASE_URL, pool_size=HTTP_POOL_SIZE,
+                 connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT,
+                 max_retries=HTTP_MAX_RETRIES, backoff_factor=HTTP_BACKOFF_FACTOR,
+                 rate_limiter=None, rate_limit_policy=RATE_LIMIT_POLICY):
+        if httpx is None:
+            raise RuntimeError("AsyncTMDbClient requires the httpx package")
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.rate_limiter = rate_limiter or RateLimiter.shared()
+        self.rate_limit_policy = rate_limit_policy
+        self.session = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+        self._init_stats()
+
+    async def get(self, url, params=None, policy=None):
+        """GET a TMDb URL through the rate limiter and pooled async client, recording its latency"""
+        endpoint = self.endpoint_name(url)
+        key = (params or {}).get('api_key', '')
+        start = time.perf_counter()
+        status = None
+        sent = False
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    await self.rate_limiter.acquire_async(key, policy or self.rate_limit_policy)
+                except RateLimitExceeded:
+                    self._record_rate_limited(endpoint)
+                    raise
+                if not sent:
+                    metrics.upstream_started(endpoint)
+                    sent = True
+                response = await self.session.get(url, params=params)
+                status = response.status_code
+                if attempt == self.max_retries:
+                    return response
+                if status == 429:
+                    await self.rate_limiter.backoff_async(key, response.headers, attempt)
+                elif status in HTTP_RETRY_STATUSES:
+                    await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+                else:
+                    return response
+        finally:
+            if sent:  # calls the rate limiter refused never reached TMDb
+                self._record(endpoint, time.perf_counter() - start, status)
+
+    async def close(self):
+        await self.session.aclose()
+
+
+# In-memory cache budget and per-kind time-to-live (seconds)
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_TTLS = {
+    'details': 24 * 3600,
+    'similar_genre': 6 * 3600,
+    'similar_content': 6 * 3600,
+    'tmdb_similar': 6 * 3600,
+    'search_movie': 3600,
+    'discover': 3600,
+    'actor_credits': 24 * 3600,
+}
+CACHE_DEFAULT_TTL = 3600
+
+# Optional on-disk cache tier shared by all workers on a host (SQLite file path)
+DISK_CACHE_PATH = os.environ.get('DISK_CACHE_PATH')
+DISK_CACHE_PURGE_EVERY = 500  # writes between expired-row purges
+DISK_CACHE_STALE_GRACE = 24 * 3600  # keep expired rows this long for stale serving
+
+# Stale-while-revalidate: serve expired entries at once and refresh them in the background
+SWR_ENABLED = True
+SWR_KINDS = ('details', 'similar_genre', 'similar_content', 'tmdb_similar', 'discover')
+SWR_MAX_STALENESS = 24 * 3600  # older expired entries are treated as misses
+SWR_WORKERS = 2
+SWR_SCAN_INTERVAL = 30  # seconds between scans for hot entries close to expiry
+SWR_REFRESH_AHEAD = 0.1  # refresh hot entries in the last 10% of their TTL
+SWR_MIN_HITS = 3  # accesses since the last scan that make an entry "hot"
+
+
+class DiskCache:
+    """SQLite-backed cache tier storing zlib-compressed JSON payloads.
+
+    WAL mode lets several worker processes on one host read and write the
+    same file; each thread keeps its own connection.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        self._connect().execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'key TEXT PRIMARY KEY, payload BLOB NOT NULL, '
+            'fetched_at REAL NOT NULL, expires_at REAL NOT NULL)'
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, allow_stale=False):
+        """Return (value, fetched_at, expires_at) for a fresh (or any, if allow_stale) entry, else None"""
+        try:
+            row = self._connect().execute(
+                'SELECT payload, fetched_at, expires_at FROM cache WHERE key = ? AND expires_at > ?',
+                (key, float('-inf') if allow_stale else time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            log.warning("Disk cache read failed for %s: %s", key, e)
+            return None
+        if row is None:
+            return None
+        payload, fetched_at, expires_at = row
+        try:
+            return json.loads(zlib.decompress(payload)), fetched_at, expires_at
+        except (zlib.error, ValueError) as e:
+            # A corrupt row (e.g. a torn write) is a miss; drop it so the next load replaces it
+            log.warning("Disk cache entry for %s is unreadable, discarding it: %s", key, e)
+            try:
+                self._connect().execute('DELETE FROM cache WHERE key = ?', (key,))
+            except sqlite3.Error:
+                pass
+            return None
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        payload = zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+        try:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO cache (key, payload, fetched_at, expires_at) VALUES (?, ?, ?, ?)',
+                (key, payload, now, now + ttl)
+            )
+            self._writes += 1
+            if self._writes % DISK_CACHE_PURGE_EVERY == 0:
+                conn.execute('DELETE FROM cache WHERE expires_at <= ?', (now - DISK_CACHE_STALE_GRACE,))
+        except sqlite3.Error as e:
+            log.warning("Disk cache write failed for %s: %s", key, e)
+
+    def clear(self):
+        self._connect().execute('DELETE FROM cache')
+
+
+class _InFlight:
+    """A cache load in progress that other callers can wait on"""
+    __slots__ = ('done', 'value', 'error', 'abandoned')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.abandoned = False  # the loader gave up without a result; waiters load it themselves
+
+
+class BackgroundRefresher:
+    """Refreshes cache entries on a small worker pool, hottest keys first.
+
+    Entries served stale are queued right away; a scanner also queues hot
+    entries (by recent access count) shortly before they expire, so popular
+    keys are usually refreshed before anyone sees them stale. The threads
+    start with the first refreshable entry, not at import.
+    """
+
+    def __init__(self, cache, workers=SWR_WORKERS, scan_interval=SWR_SCAN_INTERVAL,
+                 refresh_ahead=SWR_REFRESH_AHEAD, min_hits=SWR_MIN_HITS):
+        self.cache = cache
+        self.scan_interval = scan_interval
+        self.refresh_ahead = refresh_ahead
+        self.min_hits = min_hits
+        self._queue = queue.PriorityQueue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._stats = {'scheduled': 0, 'refreshes': 0, 'refresh_errors': 0}
+        self.workers = workers
+        self._started = False
+
+    def start(self):
+        """Start the worker and scanner threads once"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for i in range(self.workers):
+            threading.Thread(target=self._work, name=f'cache-refresh-{i}', daemon=True).start()
+        threading.Thread(target=self._scan, name='cache-refresh-scan', daemon=True).start()
+
+    def schedule(self, key, loader, hits=0):
+        """Queue a refresh unless one is already pending; more hits run sooner"""
+        self.start()
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+            self._stats['scheduled'] += 1
+        self._queue.put((-hits, next(self._seq), key, loader))
+
+    def _work(self):
+        while True:
+            _, _, key, loader = self._queue.get()
+            try:
+                value = loader()
+                if value:
+                    self.cache.set(key, value)
+                    self.cache.remember_loader(key, loader)
+                with self._lock:
+                    self._stats['refreshes'] += 1
+            except Exception as e:
+                log.warning("Background refresh of %s failed: %s", key, e)
+                with self._lock:
+                    self._stats['refresh_errors'] += 1
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+    def _scan(self):
+        while True:
+            time.sleep(self.scan_interval)
+            for key, loader, hits in self.cache.hot_expiring(self.refresh_ahead, self.min_hits):
+                self.schedule(key, loader, hits)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, queue_depth=self._queue.qsize())
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-kind TTLs and an approximate byte budget.
+
+    The kind of an entry is the key prefix it starts with (see CACHE_TTLS),
+    e.g. "details_603" is a "details" entry.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, ttls=None, default_ttl=CACHE_DEFAULT_TTL, disk=None,
+                 stale_while_revalidate=False):
+        self.max_bytes = max_bytes
+        self.disk = disk
+        self.ttls = dict(CACHE_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'coalesced': 0,
+                       'disk_hits': 0, 'stale_hits': 0, 'stale_served': 0}
+        self._inflight = {}  # key -> _InFlight for loads currently running
+        self._access = {}   # key -> accesses since the last refresh scan
+        self._loaders = {}  # key -> loader that produced it, for background refresh
+        self.refresher = BackgroundRefresher(self) if stale_while_revalidate else None
+
+    def kind_of(self, key):
+        for kind in self.ttls:
+            if key.startswith(kind + '_'):
+                return kind
+        return 'other'
+
+    def ttl_for(self, key):
+        return self.ttls.get(self.kind_of(key), self.default_ttl)
+
+    @staticmethod
+    def _sizeof(value):
+        try:
+            return len(json.dumps(value, separators=(',', ':')))
+        except (TypeError, ValueError):
+            return 1024
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, size = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    self._access[key] = self._access.get(key, 0) + 1
+                    RequestTrace.count('cache_hits')
+                    return value
+                # Expired entries stay until evicted so they can be served stale
+                self._stats['expirations'] += 1
+            self._stats['misses'] += 1
+        RequestTrace.count('cache_misses')
+
+        if self.disk is not None:
+            stored = self.disk.get(key)
+            if stored is not None:
+                value, _, expires_at = stored
+                # Promote into memory for whatever TTL the disk entry has left
+                self.set(key, value, ttl=expires_at - time.time(), persist=False)
+                with self._lock:
+                    self._stats['disk_hits'] += 1
+                return value
+        return default
+
+    def get_stale(self, key):
+        """The cached value for key even if it has expired, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._stats['stale_hits'] += 1
+                return entry[0]
+        if self.disk is not None:
+            stored = self.disk.get(key, allow_stale=True)
+            if stored is not None:
+                with self._lock:
+                    self._stats['stale_hits'] += 1
+                return stored[0]
+        return None
+
+    def set(self, key, value, ttl=None, persist=True):
+        if ttl is None:
+            ttl = self.ttl_for(key)
+        if persist and self.disk is not None:
+            self.disk.set(key, value, ttl)
+
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, or load it exactly once.
+
+        Concurrent callers missing on the same key wait for the single
+        in-flight loader and share its result. A loader exception is raised
+        in every waiter and nothing is cached; falsy results are not cached.
+        """
+        value, flight = self.claim(key, loader)
+        if flight is None:
+            return value
+        try:
+            value = loader()
+        except BaseException as e:
+            return self.settle(key, flight, loader, error=e)
+        return self.settle(key, flight, loader, value)
+
+    def claim(self, key, loader):
+        """Answer key through the cache layer, or make the caller its single-flight loader.
+
+        Returns (value, None) for a fresh hit, a recently expired entry served
+        while loader refreshes it in the background, or the result of a
+        concurrent load. Returns (None, flight) when the caller has to load
+        the value itself and hand it to settle() (or abandon()) afterwards.
+        """
+        value = self.get(key)
+        if value is not None:
+            if self.refresher is not None and key not in self._loaders and self.kind_of(key) in SWR_KINDS:
+                self.remember_loader(key, loader)  # e.g. just promoted from the disk tier
+            return value, None
+
+        if self.refresher is not None and self.kind_of(key) in SWR_KINDS:
+            # Serve a recently expired entry now and refresh it in the background
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] > time.monotonic() - SWR_MAX_STALENESS:
+                    self._stats['stale_served'] += 1
+                    hits = self._access[key] = self._access.get(key, 0) + 1
+                else:
+                    entry = None
+            if entry is not None:
+                self.refresher.schedule(key, loader, hits)
+                return entry[0], None
+
+        while True:
+            with self._lock:
+                flight = self._inflight.get(key)
+                if flight is None:
+                    flight = self._inflight[key] = _InFlight()
+                    return None, flight
+                self._stats['coalesced'] += 1
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if not flight.abandoned:
+                return flight.value, None
+
+    def settle(self, key, flight, loader, value=None, error=None):
+        """Finish a load claimed with claim(): cache the value and hand it to every waiter.
+
+        With error, the waiters get the error instead, except that a load
+        that ran out of TMDb budget falls back to an expired entry, which is
+        returned rather than raised.
+        """
+        try:
+            if error is not None:
+                # Out of TMDb budget: an expired answer beats no answer
+                if isinstance(error, RateLimitExceeded) and error.allow_stale:
+                    flight.value = self.get_stale(key)
+                if flight.value is None:
+                    raise error
+                return flight.value
+            flight.value = value
+            if value:
+                self.set(key, value)
+                if self.refresher is not None and self.kind_of(key) in SWR_KINDS:
+                    self.remember_loader(key, loader)
+            return value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            self._release(key, flight)
+
+    def abandon(self, key, flight):
+        """Give up a claimed load without a result; waiting callers retry it themselves"""
+        flight.abandoned = True
+        self._release(key, flight)
+
+    def _release(self, key, flight):
+        with self._lock:
+            del self._inflight[key]
+        flight.done.set()
+
+    def remember_loader(self, key, loader):
+        """Keep the loader of a cached refreshable entry so the refresher can renew it ahead of expiry"""
+        with self._lock:
+            if key not in self._entries:
+                return
+            self._loaders[key] = loader
+        self.refresher.start()
+
+    def hot_expiring(self, refresh_ahead, min_hits):
+        """(key, loader, hits) for hot refreshable entries near expiry, hottest first.
+
+        Access counts are halved on every call so hotness tracks recent traffic.
+        """
+        now = time.monotonic()
+        with self._lock:
+            hot = []
+            for key, loader in self._loaders.items():
+                hits = self._access.get(key, 0)
+                entry = self._entries.get(key)
+                if entry is not None and hits >= min_hits and entry[1] - now < self.ttl_for(key) * refresh_ahead:
+                    hot.append((key, loader, hits))
+            self._access = {key: hits // 2 for key, hits in self._access.items() if hits > 1}
+        hot.sort(key=lambda item: item[2], reverse=True)
+        return hot
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+        self._loaders.pop(key, None)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[1] > time.monotonic()
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._loaders.clear()
+            self._access.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries), bytes=self._bytes, max_bytes=self.max_bytes)
+        lookups = stats['hits'] + stats['misses']
+        stats['stale_serve_ratio'] = stats['stale_served'] / lookups if lookups else 0.0
+        if self.refresher is not None:
+            refresher = self.refresher.stats()
+            stats['refresh_queue_depth'] = refresher.pop('queue_depth')
+            stats.update(refresher)
+        return stats
+
+
+# The genre list changes about once a year: keep it in process and refresh in the background
+GENRES_TTL = 7 * 24 * 3600
+GENRES_RETRY_INTERVAL = 300  # seconds before retrying after a failed refresh
+GENRES_BROWSER_MAX_AGE = 24 * 3600  # Cache-Control for /get_genres
+GENRES_CDN_MAX_AGE = 7 * 24 * 3600
+
+
+class GenreStore:
+    """The TMDb genre list, its id -> name map and a strong ETag for it.
+
+    Only the very first call waits on TMDb. Once the list is older than the
+    TTL it keeps being served while one background thread fetches a new copy.
+    """
+
+    def __init__(self, fetch, ttl=GENRES_TTL):
+        self.fetch = fetch
+        self.ttl = ttl
+        self._current = None  # (genres, id -> name, etag), replaced as a whole
+        self._next_refresh = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def _snapshot(self):
+        if self._current is None:
+            with self._lock:
+                # After a failed first load, callers get an empty list until the retry is due
+                if self._current is None and time.monotonic() >= self._next_refresh:
+                    self._load()
+            return self._current or ([], {}, None)
+        if time.monotonic() >= self._next_refresh:
+            with self._lock:
+                start = not self._refreshing
+                self._refreshing = True
+            if start:
+                threading.Thread(target=self._refresh, name='genre-refresh', daemon=True).start()
+        return self._current
+
+    def get(self):
+        return self._snapshot()[0]
+
+    def names(self):
+        return self._snapshot()[1]
+
+    def versioned(self):
+        """(genres, etag) from the same refresh"""
+        genres, _, etag = self._snapshot()
+        return genres, etag
+
+    def _load(self):
+        try:
+            genres = self.fetch()
+        except Exception as e:
+            log.warning("Genre refresh failed: %s", e)
+            genres = None
+        if not genres:
+            self._next_refresh = time.monotonic() + GENRES_RETRY_INTERVAL
+            return
+        body = json.dumps(genres, sort_keys=True, separators=(',', ':')).encode()
+        names = {genre['id']: genre['name'] for genre in genres}
+        self._current = (genres, names, hashlib.sha1(body).hexdigest())
+        self._next_refresh = time.monotonic() + self.ttl
+
+    def _refresh(self):
+        try:
+            self._load()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+
+# TMDb payloads are projected down to the fields the routes, pages and indexes
+# read before they are cached or returned; full details with credits appended
+# run to hundreds of crew entries, of which only the director is used
+MOVIE_FIELDS = ('id', 'title', 'genre_ids', 'original_language', 'popularity',
+                'vote_average', 'poster_path', 'release_date')
+DETAILS_FIELDS = ('id', 'title', 'overview', 'genres', 'original_language', 'popularity',
+                  'vote_average', 'poster_path', 'release_date', 'runtime')
+PERSON_FIELDS = ('id', 'name', 'popularity', 'profile_path')
+PAGE_FIELDS = ('page', 'total_pages', 'total_results')
+DETAILS_TOP_CAST = 10  # the modal lists ten names; the content index uses the first few
+
+
+def _pick(payload, fields):
+    return {field: payload.get(field) for field in fields}
+
+
+def project_movie(movie):
+    """The discover-style fields a result card needs; actor credits keep the role"""
+    projected = _pick(movie, MOVIE_FIELDS)
+    if movie.get('character'):
+        projected['character'] = movie['character']
+    return projected
+
+
+def project_movie_page(data):
+    """A search/discover/similar page with slim result entries"""
+    projected = {field: data[field] for field in PAGE_FIELDS if field in data}
+    projected['results'] = [project_movie(movie) for movie in data.get('results') or []]
+    return projected
+
+
+def project_people_page(data):
+    projected = {field: data[field] for field in PAGE_FIELDS if field in data}
+    projected['results'] = [_pick(person, PERSON_FIELDS) for person in data.get('results') or []]
+    return projected
+
+
+def project_credits(data):
+    """An actor's movie credits; crew credits are not used"""
+    return {'cast': [project_movie(movie) for movie in data.get('cast') or []]}
+
+
+def project_details(details):
+    """Movie details with top-billed cast, directors, keywords and one trailer"""
+    projected = _pick(details, DETAILS_FIELDS)
+    projected['genres'] = [{'id': g['id'], 'name': g.get('name')} for g in details.get('genres') or []]
+    credits = details.get('credits') or {}
+    projected['credits'] = {
+        'cast': [{'id': c['id'], 'name': c.get('name')} for c in (credits.get('cast') or [])[:DETAILS_TOP_CAST]],
+        'crew': [{'id': c['id'], 'name': c.get('name'), 'job': 'Director'}
+                 for c in credits.get('crew') or [] if c.get('job') == 'Director'],
+    }
+    keywords = (details.get('keywords') or {}).get('keywords') or []
+    projected['keywords'] = {'keywords': [{'id': k['id'], 'name': k.get('name')} for k in keywords]}
+    trailers = [
+        {'type': v['type'], 'site': v['site'], 'key': v['key']}
+        for v in (details.get('videos') or {}).get('results') or []
+        if v.get('type') == 'Trailer' and v.get('site') == 'YouTube'
+    ]
+    projected['videos'] = {'results': trailers[:1]}
+    return projected
+
+
+# Result lists are served a page at a time. Each page of a TMDb list is cached
+# under its own key; page 1 keeps the unsuffixed key it always had
+RESULTS_PAGE_SIZE = 20
+MAX_DISCOVER_PAGE = 500  # TMDb rejects discover pages past this
+SIMILAR_MAX_PAGES = 10
+
+
+def page_suffix(page):
+    return f"_p{page}" if page > 1 else ''
+
+
+def encode_cursor(page):
+    """Opaque token for a result page, handed out as next_cursor"""
+    return base64.urlsafe_b64encode(json.dumps({'page': page}).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Page number in a cursor from encode_cursor; ValueError if it is not one"""
+    data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    page = data.get('page') if isinstance(data, dict) else None
+    if not isinstance(page, int) or page < 1:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return page
+
+
+def with_next_cursor(data, max_pages=MAX_DISCOVER_PAGE):
+    """Set next_cursor on a result page: the following page, or None on the last one"""
+    page = data.get('page') or 1
+    data['next_cursor'] = encode_cursor(page + 1) if page < min(data.get('total_pages') or page, max_pages) else None
+    return data
+
+
+def _with_cursor(data, max_pages=MAX_DISCOVER_PAGE):
+    """A cached page as served: entries cached before pagination get their next_cursor on a copy"""
+    if not data or 'next_cursor' in data:
+        return data
+    return with_next_cursor(dict(data), max_pages)
+
 
 class MovieRecommender:
-    def __init__(self, api_key):
+    def __init__(self, api_key, client=None, catalog=None, content_index=None):
         self.api_key = api_key
         self.base_url = BASE_URL
-        self.cache = {} 
+        self.client = client or TMDbClient(self.base_url)
+        self.catalog = catalog
+        self.content_index = content_index
+        self.executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix='tmdb-fanout')
+        self.cache = TTLCache(disk=DiskCache(DISK_CACHE_PATH) if DISK_CACHE_PATH else None,
+                              stale_while_revalidate=SWR_ENABLED)
+        self.genres = GenreStore(self._fetch_genres)
+        self.counters = {'detail_calls_avoided': 0}
+        self._counters_lock = threading.Lock()
         
     def search_movie_by_name(self, movie_name, language="en"):
-        cache_key = f"search_movie_{movie_name}_{language}"
-        if cache_key in self.cache:
-            return self.cache[cache_key]
         """Search for movies by name"""
+        cache_key = f"search_movie_{movie_name}_{language}"
+        return self.cache.get_or_load(cache_key, lambda: self._fetch_movie_search(movie_name, language))
+
+    def _fetch_movie_search(self, movie_name, language):
         url = f"{self.base_url}/search/movie"
         params = {
             'api_key': self.api_key,
@@ -28,11 +1308,9 @@ class MovieRecommender:
             'include_adult': False
         }
         
-        response = requests.get(url, params=params)
+        response = self.client.get(url, params=params)
         if response.status_code == 200:
-            result = response.json()
-            self.cache[cache_key] = result  # Cache the result
-            return result
+            return project_movie_page(response.json())
     
     def get_similar_movies(self, movie_id, target_language=None):
         """Get similar movies based on movie ID"""
@@ -43,21 +1321,39 @@ class MovieRecommender:
             'page': 1
         }
     
-        response = requests.get(url, params=params)
+        response = self.client.get(url, params=params)
         if response.status_code == 200:
-            return response.json()
+            return project_movie_page(response.json())
         return None
     
-    def discover_movies_by_genre_flexible(self, genre_ids, language="en"):
+    def discover_movies_by_genre_flexible(self, genre_ids, language="en", page=1):
         """Discover movies by genre with fallback to popular movies if not enough found"""
-        
+        cache_key = f"discover_{genre_ids}_{language or 'all'}{page_suffix(page)}"
+        return _with_cursor(self.cache.get_or_load(cache_key, lambda: self._fetch_discover(genre_ids, language, page)))
+
+    def prefetch_discover_page(self, genre_ids, language, page):
+        """Load a discover page into the cache in the background unless it is already there"""
+        cache_key = f"discover_{genre_ids}_{language or 'all'}{page_suffix(page)}"
+        if page > MAX_DISCOVER_PAGE or cache_key in self.cache:
+            return
+        self._count('discover_pages_prefetched')
+        self.executor.submit(self._prefetch, self.discover_movies_by_genre_flexible, genre_ids, language, page)
+
+    @staticmethod
+    def _prefetch(load, *args):
+        try:
+            load(*args)
+        except Exception as e:
+            log.debug("Prefetch %s%r failed: %s", load.__name__, args, e)
+
+    def _fetch_discover(self, genre_ids, language, page=1):
         # Build API parameters
         params = {
             'api_key': self.api_key,
             'with_genres': genre_ids,
             'sort_by': 'popularity.desc',
             'include_adult': False,
-            'page': 1
+            'page': page
         }
         
         # Add language filter if specified
@@ -67,338 +1363,1741 @@ class MovieRecommender:
         # Make API call
         url = f"{self.base_url}/discover/movie"
         try:
-            response = requests.get(url, params=params)
+            response = self.client.get(url, params=params)
             
             if response.status_code == 200:
+                return with_next_cursor(project_movie_page(response.json()))
+            else:
+                _log_upstream_failure('discover', response)
+                return None
+                
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            log.warning("Exception in discover_movies_by_genre_flexible: %s", e)
+            return None
+
+    def discover_movies_by_genre_with_fallback(self, genre_ids, language="en", page=1):
+        """Discover movies by genre with fallback strategy.
+
+        Page 1 decides which query is used, so later pages continue the same list.
+        """
+        
+        # First try exact match with language
+        results = self.discover_movies_by_genre_flexible(genre_ids, language)
+        
+        if results and len(results.get('results', [])) >= 10:
+            return self._discover_page(results, genre_ids, language, page)
+        
+        # If not enough results, try without language filter
+        results_no_lang = self.discover_movies_by_genre_flexible(genre_ids, "")
+        
+        if results_no_lang and len(results_no_lang.get('results', [])) > 0:
+            return self._discover_page(results_no_lang, genre_ids, "", page)
+        
+        # If still not enough, get popular movies from the first genre
+        if ',' in str(genre_ids):
+            first_genre = str(genre_ids).split(',')[0]
+            fallback_results = self.discover_movies_by_genre_flexible(first_genre, "")
+            if fallback_results:
+                return self._discover_page(fallback_results, first_genre, "", page)
+        
+        return {'results': []}
+
+    def _discover_page(self, first_page, genre_ids, language, page):
+        if page == 1:
+            results = first_page
+        elif page > min(first_page.get('total_pages') or 1, MAX_DISCOVER_PAGE):
+            return {'results': []}
+        else:
+            results = self.discover_movies_by_genre_flexible(genre_ids, language, page) or {'results': []}
+        # Similar pages walk discover pages in order, so have the next one cached
+        # for the same query (after any fallback) by the time it is asked for
+        if results.get('next_cursor'):
+            self.prefetch_discover_page(genre_ids, language, page + 1)
+        return results
+
+    def get_similar_by_genre(self, movie_id, target_language=None, page=1):
+        """Get movies with exactly the same genres first, then similar movies to reach 20 total - Optimized hybrid version"""
+
+        # Concurrent requests for the same movie share a single computation
+        cache_key = f"similar_genre_{movie_id}_{target_language or 'all'}{page_suffix(page)}"
+        return _with_cursor(self.cache.get_or_load(
+            cache_key, lambda: self._build_similar_by_genre(movie_id, target_language, page)), SIMILAR_MAX_PAGES)
+
+    def _build_similar_by_genre(self, movie_id, target_language, page=1):
+        # Get the movie details to extract genres (with caching)
+        movie_details = self.cached_movie_details(movie_id)
+
+        if not movie_details or not movie_details.get('genres'):
+            log.info("No movie details or genres found for movie_id: %s", movie_id)
+            return None
+
+        # Extract and sort genre IDs
+        original_genre_ids = sorted([genre['id'] for genre in movie_details['genres']])
+        genre_string = ','.join(str(gid) for gid in original_genre_ids)
+        
+        log.debug("Original movie genres: %s", genre_string)
+
+        # Rank the whole offline catalog when one is loaded; otherwise (or when it
+        # has no candidates) classify this page of discover results
+        final_results = None
+        if self.catalog is not None:
+            final_results, more = self.rank_catalog_candidates(
+                self.catalog, movie_id, original_genre_ids, target_language, page)
+        if not final_results:
+            final_results, more = self._rank_discover_candidates(
+                movie_id, original_genre_ids, genre_string, target_language, page)
+        if final_results is None:
+            return None
+        if page > 1:
+            # The first page may have been topped up from /similar; don't show those movies again
+            first_page = self.get_similar_by_genre(movie_id, target_language) or {'results': []}
+            shown = {movie['id'] for movie in first_page['results']}
+            final_results = [movie for movie in final_results if movie['id'] not in shown]
+
+        # If still not enough, get more from TMDB's similar endpoint. Only the first
+        # page is topped up: later pages would repeat what the fill already showed
+        similar_movies = None
+        if len(final_results) < 20 and page == 1:
+            similar_movies = self._similar_fill(movie_id, target_language)
+        result = self.fill_from_similar(final_results, similar_movies, movie_id, page, more)
+
+        log.debug("Final results count: %d", len(result['results']))
+
+        return result
+
+    def iter_similar_by_genre(self, movie_id, target_language=None):
+        """Yield (match, movies) batches of get_similar_by_genre's answer as soon as each is known.
+
+        match is 'exact' or 'similar' for genre matches, 'fill' for movies
+        topped up from TMDb's /similar, or 'cached' when the whole answer was
+        already cached. The assembled answer is cached under the same key and
+        is the generator's return value, so callers can read its next_cursor.
+        """
+        cache_key = f"similar_genre_{movie_id}_{target_language or 'all'}"
+        # The same entry and loader as get_similar_by_genre, so a cached, stale or
+        # in-flight answer is shared with the plain route and refreshed like it
+        def loader():
+            return self._build_similar_by_genre(movie_id, target_language)
+        cached, flight = self.cache.claim(cache_key, loader)
+        if flight is None:
+            if cached and cached['results']:
+                yield 'cached', cached['results']
+            return _with_cursor(cached, SIMILAR_MAX_PAGES)
+        try:
+            result = yield from self._stream_similar_by_genre(movie_id, target_language)
+        except GeneratorExit:
+            self.cache.abandon(cache_key, flight)  # the client went away mid-stream
+            raise
+        except BaseException as e:
+            stale = self.cache.settle(cache_key, flight, loader, error=e)
+            yield 'cached', stale['results']
+            return _with_cursor(stale, SIMILAR_MAX_PAGES)
+        return self.cache.settle(cache_key, flight, loader, result)
+
+    def _stream_similar_by_genre(self, movie_id, target_language):
+        """_build_similar_by_genre's first page as (match, movies) batches; returns the assembled page"""
+        movie_details = self.cached_movie_details(movie_id)
+        if not movie_details or not movie_details.get('genres'):
+            log.info("No movie details or genres found for movie_id: %s", movie_id)
+            return None
+        original_genre_ids = sorted([genre['id'] for genre in movie_details['genres']])
+        genre_string = ','.join(str(gid) for gid in original_genre_ids)
+
+        matches = None
+        if self.catalog is not None:
+            ranked, more = self.rank_catalog_candidates(
+                self.catalog, movie_id, original_genre_ids, target_language)
+            if ranked:
+                matches = (('exact' if sorted(movie['genre_ids']) == original_genre_ids else 'similar', movie)
+                           for movie in ranked)
+        if matches is None:
+            discover_results = self.discover_movies_by_genre_with_fallback(genre_string, target_language)
+            if not discover_results or not discover_results.get('results'):
+                log.info("No results from discover API")
+                return None
+            more = 1 < (discover_results.get('total_pages') or 1)
+            movies_to_check = [movie for movie in discover_results['results'] if movie['id'] != movie_id]
+            matches = self.iter_genre_matches(self._iter_candidate_genres(movies_to_check[:30]), original_genre_ids)
+
+        # Only the first 20 make the answer. Each exact match goes out as soon as it
+        # is confirmed; overlaps are known only once the scan ends, so they go together
+        final_results = []
+        similar_matches = []
+        for match, movie in matches:
+            final_results.append(movie)
+            if match == 'exact':
+                yield match, [movie]
+            else:
+                similar_matches.append(movie)
+            if len(final_results) >= 20:
+                break
+        if similar_matches:
+            yield 'similar', similar_matches
+
+        similar_movies = self._similar_fill(movie_id, target_language) if len(final_results) < 20 else None
+        ranked_count = len(final_results)
+        result = self.fill_from_similar(final_results, similar_movies, movie_id, more=more)
+        if len(result['results']) > ranked_count:
+            yield 'fill', result['results'][ranked_count:]
+        return result
+
+    @staticmethod
+    def rank_catalog_candidates(catalog, movie_id, original_genre_ids, target_language, page=1):
+        """(matches, more) for one page of exact then overlapping genre matches from the catalog.
+
+        Widens to all languages if sparse; one extra match is ranked to tell
+        whether another page follows.
+        """
+        k = page * RESULTS_PAGE_SIZE + 1
+        ranked = catalog.similar_by_genres(
+            original_genre_ids, k=k, exclude_id=movie_id, language=target_language)
+        if len(ranked) < 10 and target_language:
+            ranked = catalog.similar_by_genres(original_genre_ids, k=k, exclude_id=movie_id)
+        return ranked[(page - 1) * RESULTS_PAGE_SIZE:], len(ranked) == k
+
+    def _rank_discover_candidates(self, movie_id, original_genre_ids, genre_string, target_language, page=1):
+        """(matches, more) among one page of discover results; matches is None if discover is empty"""
+        # Use the corrected discover method
+        discover_results = self.discover_movies_by_genre_with_fallback(genre_string, target_language, page)
+        
+        if not discover_results or not discover_results.get('results'):
+            log.info("No results from discover API")
+            return None, False
+
+        # Process the results
+        movies_to_check = [movie for movie in discover_results['results'] if movie['id'] != movie_id]
+        
+        # Classify straight from discover's genre_ids; details are only fetched
+        # (concurrently, consumed in discover order) for movies that lack them
+        matches = self.classify_genre_matches(
+            self._iter_candidate_genres(movies_to_check[:30]),  # Limit API calls
+            original_genre_ids
+        )
+        return matches, page < (discover_results.get('total_pages') or page)
+
+    def _similar_fill(self, movie_id, target_language):
+        """TMDb's /similar list for topping up a short first page"""
+        return self.cache.get_or_load(
+            f"tmdb_similar_{movie_id}_{target_language or 'all'}",
+            lambda: self.get_similar_movies(movie_id, target_language))
+
+    @staticmethod
+    def iter_genre_matches(candidates, original_genre_ids):
+        """Yield ('exact', movie) as each exact genre match is confirmed, then ('similar', movie) for >=50% overlaps"""
+        exact_count = 0
+        similar_matches = []
+
+        for movie, movie_genre_ids in candidates:
+            if movie_genre_ids:
+                movie_genre_ids = sorted(movie_genre_ids)
+                
+                if movie_genre_ids == original_genre_ids:
+                    exact_count += 1
+                    yield 'exact', movie
+                else:
+                    # Check for significant genre overlap (at least 50% of genres match)
+                    overlap = len(set(movie_genre_ids) & set(original_genre_ids))
+                    if overlap >= len(original_genre_ids) * 0.5:
+                        similar_matches.append(movie)
+            
+            # Early exit if we have enough exact matches
+            if exact_count >= 20:
+                break
+
+        # Similar ones go after every exact match
+        for movie in similar_matches:
+            yield 'similar', movie
+
+    @staticmethod
+    def classify_genre_matches(candidates, original_genre_ids):
+        """Exact genre matches first, then >=50% overlaps, from (movie, genre_ids) pairs in order"""
+        return [movie for _, movie in MovieRecommender.iter_genre_matches(candidates, original_genre_ids)]
+
+    @staticmethod
+    def fill_from_similar(final_results, similar_movies, movie_id, page=1, more=False):
+        """Top up ranked results from TMDb's /similar payload and build the response.
+
+        more says whether the ranked source has another page; total_pages
+        only counts pages known to exist.
+        """
+        if len(final_results) < 20 and similar_movies and similar_movies.get('results'):
+            # Add unique movies from similar endpoint
+            existing_ids = {movie['id'] for movie in final_results}
+            existing_ids.add(movie_id)  # Exclude original movie
+            
+            for movie in similar_movies['results']:
+                if movie['id'] not in existing_ids:
+                    final_results.append(movie)
+                    if len(final_results) >= 20:
+                        break
+
+        more = more and page < SIMILAR_MAX_PAGES
+
+        # Prepare final response
+        return with_next_cursor({
+            'results': final_results[:20],
+            'total_results': len(final_results[:20]),
+            'total_pages': page + 1 if more else page,
+            'page': page
+        }, SIMILAR_MAX_PAGES)
+
+    def get_similar_by_content(self, movie_id, target_language=None, page=1):
+        """Get movies closest to this one in the content embedding index"""
+        if self.content_index is None:
+            return None
+        cache_key = f"similar_content_{movie_id}_{target_language or 'all'}{page_suffix(page)}"
+        return _with_cursor(self.cache.get_or_load(
+            cache_key, lambda: self._build_similar_by_content(movie_id, target_language, page)), SIMILAR_MAX_PAGES)
+
+    def _build_similar_by_content(self, movie_id, target_language, page=1):
+        # Movies not indexed yet are embedded on the fly from their details
+        movie_details = None
+        if movie_id not in self.content_index.row_of_id:
+            movie_details = self.cached_movie_details(movie_id)
+            if not movie_details:
+                return None
+        return self.content_index.recommend(movie_id, movie_details, target_language, page=page)
+
+    def cached_movie_details(self, movie_id):
+        """Get movie details, going through the details_ cache entry"""
+        detail_key = f"details_{movie_id}"
+        return self.cache.get_or_load(detail_key, lambda: self.get_movie_details(movie_id))
+
+    def iter_movie_details(self, movie_ids, deadline=FANOUT_DEADLINE):
+        """Yield (movie_id, details) for many movies: cached ones at once, the rest as they arrive.
+
+        Misses are fetched concurrently on the worker pool through the
+        rate-limited client. Movies that fail, or are still pending when the
+        deadline passes, are yielded with details of None.
+        """
+        futures = {}
+        for movie_id in movie_ids:
+            if f"details_{movie_id}" in self.cache:
+                yield movie_id, self.cached_movie_details(movie_id)
+            else:
+                future = self.executor.submit(contextvars.copy_context().run, self.cached_movie_details, movie_id)
+                futures[future] = movie_id
+        pending = set(futures)
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                pending.discard(future)
+                try:
+                    details = future.result()
+                except Exception as e:
+                    log.warning("Exception fetching details for movie %s: %s", futures[future], e)
+                    details = None
+                yield futures[future], details
+        except FuturesTimeoutError:
+            log.warning("Deadline exceeded waiting for details of %d movies", len(pending))
+            for future in pending:
+                yield futures[future], None
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _iter_candidate_genres(self, movies, deadline=FANOUT_DEADLINE):
+        """Yield (movie, genre_ids) in input order.
+
+        genre_ids come from the discover payload when present; otherwise the
+        movie's details are fetched in parallel. Fetches still pending when the
+        consumer stops iterating are cancelled, and once the deadline passes the
+        remaining movies are yielded with genre_ids of None.
+        """
+        expires_at = time.monotonic() + deadline
+        futures = [
+            None if movie.get('genre_ids') is not None
+            else self.executor.submit(contextvars.copy_context().run, self.cached_movie_details, movie['id'])
+            for movie in movies
+        ]
+        self._count('detail_calls_avoided', futures.count(None))
+        try:
+            for movie, future in zip(movies, futures):
+                if future is None:
+                    yield movie, movie['genre_ids']
+                    continue
+
+                remaining = expires_at - time.monotonic()
+                try:
+                    movie_detail = future.result(timeout=max(remaining, 0))
+                except FuturesTimeoutError:
+                    log.warning("Deadline exceeded waiting for details of movie %s", movie['id'])
+                    movie_detail = None
+                except Exception as e:
+                    log.warning("Exception fetching details for movie %s: %s", movie['id'], e)
+                    movie_detail = None
+
+                if movie_detail and movie_detail.get('genres'):
+                    yield movie, [g['id'] for g in movie_detail['genres']]
+                else:
+                    yield movie, None
+        finally:
+            for future in futures:
+                if future is not None:
+                    future.cancel()
+
+    def _count(self, name, amount=1):
+        with self._counters_lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def stats(self):
+        """Recommender counters, cache statistics and per-endpoint transport stats"""
+        with self._counters_lock:
+            counters = dict(self.counters)
+        return {'counters': counters, 'cache': self.cache.stats(), 'tmdb': self.client.stats()}
+
+    def get_movie_details(self, movie_id):
+        """Get detailed information about a movie"""
+        movie_url = f"{self.base_url}/movie/{movie_id}"
+        movie_params = {
+            'api_key': self.api_key,
+            'language': 'en-US',
+            'append_to_response': 'credits,videos,keywords'
+        }
+        
+        try:
+            response = self.client.get(movie_url, params=movie_params)
+            if response.status_code == 200:
+                return project_details(response.json())
+            else:
+                _log_upstream_failure(f"Movie details {movie_id}", response)
+                return None
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            log.warning("Exception getting movie details for %s: %s", movie_id, e)
+            return None
+
+    def get_genres(self):
+        """Get list of all genres"""
+        return self.genres.get()
+
+    def genre_names(self):
+        """Genre id -> name map"""
+        return self.genres.names()
+
+    def _fetch_genres(self):
+        url = f"{self.base_url}/genre/movie/list"
+        params = {
+            'api_key': self.api_key,
+            'language': 'en-US'
+        }
+
+        try:
+            response = self.client.get(url, params=params)
+            if response.status_code == 200:
+                return response.json().get('genres', [])
+            else:
+                _log_upstream_failure('get_genres', response)
+                return []
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            log.warning("Exception in get_genres: %s", e)
+            return []
+
+    def search_person(self, person_name):
+        """Search for a person (actor/director) by name"""
+        url = f"{self.base_url}/search/person"
+        params = {
+            'api_key': self.api_key,
+            'query': person_name,
+            'include_adult': False
+        }
+    
+        try:
+            response = self.client.get(url, params=params)
+            if response.status_code == 200:
+                data = project_people_page(response.json())
+                log.debug("Person search results: %d found", len(data['results']))
+                return data
+            else:
+                _log_upstream_failure('Person search', response)
+                return None
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            log.warning("Error in search_person: %s", e)
+            return None
+
+    def get_movies_by_actor(self, person_id):
+        """Get movies featuring a specific actor"""
+        cache_key = f"actor_credits_{person_id}"
+        return self.cache.get_or_load(cache_key, lambda: self._fetch_movies_by_actor(person_id))
+
+    def _fetch_movies_by_actor(self, person_id):
+        url = f"{self.base_url}/person/{person_id}/movie_credits"
+        params = {
+            'api_key': self.api_key,
+            'language': 'en-US'
+        }
+    
+        try:
+            response = self.client.get(url, params=params)
+            if response.status_code == 200:
+                data = project_credits(response.json())
+                log.debug("Movie credits found: %d movies", len(data['cast']))
+                return data
+            else:
+                _log_upstream_failure('Movie credits', response)
+                return None
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            log.warning("Error in get_movies_by_actor: %s", e)
+            return None
+
+    def get_popular_movies(self, page=1):
+        """One page of TMDb's currently popular movies"""
+        url = f"{self.base_url}/movie/popular"
+        params = {'api_key': self.api_key, 'language': 'en-US', 'page': page}
+
+        try:
+            response = self.client.get(url, params=params)
+            if response.status_code == 200:
+                return project_movie_page(response.json())['results']
+            _log_upstream_failure('Popular movies', response)
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            log.warning("Error in get_popular_movies: %s", e)
+        return []
+
+    def get_popular_people(self, page=1):
+        """One page of TMDb's currently popular people"""
+        url = f"{self.base_url}/person/popular"
+        params = {'api_key': self.api_key, 'language': 'en-US', 'page': page}
+
+        try:
+            response = self.client.get(url, params=params)
+            if response.status_code == 200:
+                return project_people_page(response.json())['results']
+            _log_upstream_failure('Popular people', response)
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            log.warning("Error in get_popular_people: %s", e)
+        return []
+
+
+class AsyncMovieRecommender:
+    """asyncio counterpart of MovieRecommender with the same method surface.
+
+    Every TMDb call is a coroutine on a shared httpx client, so one event loop
+    can serve many concurrent requests. The cache, catalog and content index
+    can be shared with a sync MovieRecommender; concurrent misses on the same
+    key within the loop are coalesced onto one task.
+    """
+
+    def __init__(self, api_key, client=None, cache=None, catalog=None, content_index=None, genres=None):
+        self.api_key = api_key
+        self.base_url = BASE_URL
+        self.client = client or AsyncTMDbClient(self.base_url)
+        self.cache = cache if cache is not None else TTLCache()
+        self.catalog = catalog
+        self.content_index = content_index
+        self.genres = genres  # a GenreStore, normally the sync recommender's
+        self._inflight = {}  # cache key -> asyncio.Task
+        self._background = set()  # fire-and-forget tasks, held until they finish
+        self.counters = {}
+
+    def _count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def stats(self):
+        """Recommender counters, cache statistics and per-endpoint transport stats"""
+        return {'counters': dict(self.counters), 'cache': self.cache.stats(), 'tmdb': self.client.stats()}
+
+    async def _on_cache(self, method, *args):
+        """Call a cache method, in a worker thread when it may block on the SQLite disk tier"""
+        if self.cache.disk is None:
+            return method(*args)
+        return await asyncio.to_thread(method, *args)
+
+    async def _get_or_load(self, key, loader):
+        """Async single-flight over the shared cache; loader is a coroutine function"""
+        # Fresh in-memory entries never touch the disk tier, so they are read inline
+        value = self.cache.get(key) if key in self.cache else await self._on_cache(self.cache.get, key)
+        if value is not None:
+            return value
+        task = self._inflight.get(key)
+        if task is None:
+            async def load():
+                try:
+                    loaded = await loader()
+                except RateLimitExceeded as e:
+                    stale = await self._on_cache(self.cache.get_stale, key) if e.allow_stale else None
+                    if stale is None:
+                        raise
+                    return stale
+                if loaded:
+                    await self._on_cache(self.cache.set, key, loaded)
+                return loaded
+            task = self._inflight[key] = asyncio.ensure_future(load())
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _get_json(self, url, params, label, project=None):
+        try:
+            response = await self.client.get(url, params=params)
+            if response.status_code == 200:
+                return project(response.json()) if project else response.json()
+            _log_upstream_failure(label, response)
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            log.warning("Error in %s: %s", label, e)
+        return None
+
+    async def search_movie_by_name(self, movie_name, language="en"):
+        """Search for movies by name"""
+        params = {
+            'api_key': self.api_key,
+            'query': movie_name,
+            'language': language,
+            'include_adult': False
+        }
+        return await self._get_or_load(
+            f"search_movie_{movie_name}_{language}",
+            lambda: self._get_json(f"{self.base_url}/search/movie", params,
+                                   'search_movie_by_name', project_movie_page))
+
+    async def get_similar_movies(self, movie_id, target_language=None):
+        """Get similar movies based on movie ID"""
+        params = {'api_key': self.api_key, 'language': 'en-US', 'page': 1}
+        return await self._get_json(f"{self.base_url}/movie/{movie_id}/similar", params,
+                                    'get_similar_movies', project_movie_page)
+
+    async def discover_movies_by_genre_flexible(self, genre_ids, language="en", page=1):
+        """Discover movies by genre with fallback to popular movies if not enough found"""
+        params = {
+            'api_key': self.api_key,
+            'with_genres': genre_ids,
+            'sort_by': 'popularity.desc',
+            'include_adult': False,
+            'page': page
+        }
+        if language:
+            params['with_original_language'] = language
+        return _with_cursor(await self._get_or_load(
+            f"discover_{genre_ids}_{language or 'all'}{page_suffix(page)}",
+            lambda: self._get_json(f"{self.base_url}/discover/movie", params,
+                                   'discover_movies_by_genre_flexible',
+                                   lambda data: with_next_cursor(project_movie_page(data)))))
+
+    def prefetch_discover_page(self, genre_ids, language, page):
+        """Load a discover page into the cache on the event loop unless it is already there"""
+        if page > MAX_DISCOVER_PAGE or f"discover_{genre_ids}_{language or 'all'}{page_suffix(page)}" in self.cache:
+            return
+        self._count('discover_pages_prefetched')
+        task = asyncio.ensure_future(self.discover_movies_by_genre_flexible(genre_ids, language, page))
+        self._background.add(task)  # the loop only keeps a weak reference
+        task.add_done_callback(self._prefetch_done)
+
+    def _prefetch_done(self, task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.debug("Prefetch failed: %s", task.exception())
+
+    async def discover_movies_by_genre_with_fallback(self, genre_ids, language="en"):
+        """Discover movies by genre with fallback strategy"""
+        results = await self.discover_movies_by_genre_flexible(genre_ids, language)
+        if results and len(results.get('results', [])) >= 10:
+            return results
+
+        results_no_lang = await self.discover_movies_by_genre_flexible(genre_ids, "")
+        if results_no_lang and len(results_no_lang.get('results', [])) > 0:
+            return results_no_lang
+
+        if ',' in str(genre_ids):
+            first_genre = str(genre_ids).split(',')[0]
+            return await self.discover_movies_by_genre_flexible(first_genre, "") or {'results': []}
+        return {'results': []}
+
+    async def get_movie_details(self, movie_id):
+        """Get detailed information about a movie"""
+        params = {
+            'api_key': self.api_key,
+            'language': 'en-US',
+            'append_to_response': 'credits,videos,keywords'
+        }
+        return await self._get_or_load(
+            f"details_{movie_id}",
+            lambda: self._get_json(f"{self.base_url}/movie/{movie_id}", params,
+                                   'get_movie_details', project_details))
+
+    async def get_similar_by_genre(self, movie_id, target_language=None):
+        """Get movies with exactly the same genres first, then similar movies to reach 20 total"""
+        return await self._get_or_load(
+            f"similar_genre_{movie_id}_{target_language or 'all'}",
+            lambda: self._build_similar_by_genre(movie_id, target_language))
+
+    async def _build_similar_by_genre(self, movie_id, target_language):
+        movie_details = await self.get_movie_details(movie_id)
+        if not movie_details or not movie_details.get('genres'):
+            log.info("No movie details or genres found for movie_id: %s", movie_id)
+            return None
+
+        original_genre_ids = sorted([genre['id'] for genre in movie_details['genres']])
+        genre_string = ','.join(str(gid) for gid in original_genre_ids)
+
+        final_results = None
+        if self.catalog is not None:
+            final_results, more = MovieRecommender.rank_catalog_candidates(
+                self.catalog, movie_id, original_genre_ids, target_language)
+        if not final_results:
+            discover_results = await self.discover_movies_by_genre_with_fallback(genre_string, target_language)
+            if not discover_results or not discover_results.get('results'):
+                log.info("No results from discover API")
+                return None
+            more = 1 < (discover_results.get('total_pages') or 1)
+            candidates = [movie for movie in discover_results['results'] if movie['id'] != movie_id][:30]
+
+            # Fetch details only for candidates whose genre_ids are missing, all at once
+            missing = [movie for movie in candidates if movie.get('genre_ids') is None]
+            self._count('detail_calls_avoided', len(candidates) - len(missing))
+            fetched = await self._fetch_candidate_genres(missing)
+            pairs = [
+                (movie, movie['genre_ids'] if movie.get('genre_ids') is not None else fetched.get(movie['id']))
+                for movie in candidates
+            ]
+            final_results = MovieRecommender.classify_genre_matches(pairs, original_genre_ids)
+
+        similar_movies = None
+        if len(final_results) < 20:
+            similar_movies = await self._get_or_load(
+                f"tmdb_similar_{movie_id}_{target_language or 'all'}",
+                lambda: self.get_similar_movies(movie_id, target_language))
+        return MovieRecommender.fill_from_similar(final_results, similar_movies, movie_id, more=more)
+
+    async def _fetch_candidate_genres(self, movies, deadline=FANOUT_DEADLINE):
+        """movie id -> genre ids from details fetched concurrently; movies still pending at the deadline are left out"""
+        if not movies:
+            return {}
+        tasks = {asyncio.ensure_future(self.get_movie_details(movie['id'])): movie['id'] for movie in movies}
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        if pending:
+            log.warning("Deadline exceeded waiting for details of %d movies", len(pending))
+            for task in pending:
+                task.cancel()  # the shielded cache loads carry on and are cached for next time
+        fetched = {}
+        for task in done:
+            if task.exception() is not None:
+                log.warning("Exception fetching details for movie %s: %s", tasks[task], task.exception())
+            elif task.result() and task.result().get('genres'):
+                fetched[tasks[task]] = [g['id'] for g in task.result()['genres']]
+        return fetched
+
+    async def get_similar_by_content(self, movie_id, target_language=None):
+        """Get movies closest to this one in the content embedding index"""
+        if self.content_index is None:
+            return None
+        return await self._get_or_load(
+            f"similar_content_{movie_id}_{target_language or 'all'}",
+            lambda: self._build_similar_by_content(movie_id, target_language))
+
+    async def _build_similar_by_content(self, movie_id, target_language):
+        movie_details = None
+        if movie_id not in self.content_index.row_of_id:
+            movie_details = await self.get_movie_details(movie_id)
+            if not movie_details:
+                return None
+        return self.content_index.recommend(movie_id, movie_details, target_language)
+
+    async def get_genres(self):
+        """Get list of all genres, from the GenreStore shared with the sync recommender when there is one"""
+        if self.genres is not None:
+            # Only the store's first load waits on TMDb, so run it off the loop
+            return await asyncio.to_thread(self.genres.get)
+        params = {'api_key': self.api_key, 'language': 'en-US'}
+        async def load():
+            data = await self._get_json(f"{self.base_url}/genre/movie/list", params, 'get_genres')
+            return data.get('genres', []) if data else []
+        return await self._get_or_load('genres_en-US', load) or []
+
+    async def search_person(self, person_name):
+        """Search for a person (actor/director) by name"""
+        params = {'api_key': self.api_key, 'query': person_name, 'include_adult': False}
+        return await self._get_json(f"{self.base_url}/search/person", params,
+                                    'search_person', project_people_page)
+
+    async def get_movies_by_actor(self, person_id):
+        """Get movies featuring a specific actor"""
+        params = {'api_key': self.api_key, 'language': 'en-US'}
+        return await self._get_or_load(
+            f"actor_credits_{person_id}",
+            lambda: self._get_json(f"{self.base_url}/person/{person_id}/movie_credits", params,
+                                   'get_movies_by_actor', project_credits))
+
+    async def close(self):
+        await self.client.close()
+
+
+# Offline catalog snapshot used to answer /browse_movies without TMDb
+CATALOG_PATH = os.environ.get('CATALOG_PATH', 'catalog.npz')
+CATALOG_LANGUAGES = ['en', 'hi', 'es', 'fr', 'de', 'ja', 'ko', 'zh', 'bn', 'kn', 'mr', 'te', 'ta']
+CATALOG_PAGES_PER_LANGUAGE = 25
+CATALOG_PAGE_SIZE = 20
+
+
+class MovieCatalog:
+    """Columnar snapshot of discover results with a genre -> rows inverted index.
+
+    Rows are stored in popularity.desc order, so every posting list in the
+    inverted index is already ranked the way /discover/movie ranks results.
+    Genres are packed into a per-row bitmask; genre_bits maps bit -> genre id.
+    """
+
+    COLUMNS = ('ids', 'titles', 'genre_masks', 'languages', 'popularity',
+               'vote_average', 'poster_paths', 'release_dates', 'genre_bits')
+
+    def __init__(self, ids, titles, genre_masks, languages, popularity,
+                 vote_average, poster_paths, release_dates, genre_bits):
+        self.ids = ids
+        self.titles = titles
+        self.genre_masks = genre_masks
+        self.languages = languages
+        self.popularity = popularity
+        self.vote_average = vote_average
+        self.poster_paths = poster_paths
+        self.release_dates = release_dates
+        self.genre_bits = genre_bits
+        self.bit_of_genre = {int(gid): bit for bit, gid in enumerate(genre_bits)}
+
+        # Inverted index: genre id -> row numbers (popularity order)
+        self.genre_index = {
+            int(gid): np.flatnonzero(genre_masks & np.uint64(1 << bit))
+            for bit, gid in enumerate(genre_bits)
+        }
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_movies(cls, movies):
+        """Build a snapshot from TMDb discover result dicts"""
+        movies = sorted(movies, key=lambda m: m.get('popularity', 0), reverse=True)
+        genre_bits = sorted({gid for m in movies for gid in m.get('genre_ids', [])})
+        if len(genre_bits) > 64:
+            raise ValueError(f"Too many distinct genres for a 64-bit mask: {len(genre_bits)}")
+        bit_of_genre = {gid: bit for bit, gid in enumerate(genre_bits)}
+
+        masks = np.zeros(len(movies), dtype=np.uint64)
+        for row, movie in enumerate(movies):
+            mask = 0
+            for gid in movie.get('genre_ids', []):
+                mask |= 1 << bit_of_genre[gid]
+            masks[row] = mask
+
+        return cls(
+            ids=np.array([m['id'] for m in movies], dtype=np.int64),
+            titles=np.array([m.get('title') or '' for m in movies], dtype=str),
+            genre_masks=masks,
+            languages=np.array([m.get('original_language') or '' for m in movies], dtype=str),
+            popularity=np.array([m.get('popularity') or 0 for m in movies], dtype=np.float32),
+            vote_average=np.array([m.get('vote_average') or 0 for m in movies], dtype=np.float32),
+            poster_paths=np.array([m.get('poster_path') or '' for m in movies], dtype=str),
+            release_dates=np.array([m.get('release_date') or '' for m in movies], dtype=str),
+            genre_bits=np.array(genre_bits, dtype=np.int64),
+        )
+
+    @classmethod
+    def ingest(cls, recommender, languages=CATALOG_LANGUAGES, pages=CATALOG_PAGES_PER_LANGUAGE):
+        """Bulk-fetch popular movies per language from /discover/movie"""
+        url = f"{recommender.base_url}/discover/movie"
+        movies = {}
+        for language in languages:
+            for page in range(1, pages + 1):
+                params = {
+                    'api_key': recommender.api_key,
+                    'sort_by': 'popularity.desc',
+                    'include_adult': False,
+                    'with_original_language': language,
+                    'page': page
+                }
+                response = recommender.client.get(url, params=params)
+                if response.status_code != 200:
+                    log.warning("Catalog ingest failed for %s page %d: %s", language, page, response.status_code)
+                    break
                 data = response.json()
-                return data
-            else:
-                print(f"API error: {response.status_code} - {response.text}")
-                return None
-                
+                for movie in data.get('results', []):
+                    movies[movie['id']] = movie
+                if page >= data.get('total_pages', 0):
+                    break
+            log.info("Catalog ingest: %s done, %d movies so far", language, len(movies))
+        return cls.from_movies(movies.values())
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, **{name: getattr(self, name) for name in self.COLUMNS})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(**{name: data[name] for name in cls.COLUMNS})
+
+    @classmethod
+    def load_if_exists(cls, path):
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            return cls.load(path)
         except Exception as e:
-            print(f"Exception in discover_movies_by_genre_flexible: {e}")
+            log.error("Could not load catalog snapshot %s: %s", path, e)
             return None
 
-    def discover_movies_by_genre_with_fallback(self, genre_ids, language="en"):
-        """Discover movies by genre with fallback strategy"""
-        
-        # First try exact match with language
-        results = self.discover_movies_by_genre_flexible(genre_ids, language)
-        
-        if results and len(results.get('results', [])) >= 10:
-            return results
-        
-        # If not enough results, try without language filter
-        results_no_lang = self.discover_movies_by_genre_flexible(genre_ids, "")
-        
-        if results_no_lang and len(results_no_lang.get('results', [])) > 0:
-            return results_no_lang
-        
-        # If still not enough, get popular movies from the first genre
-        if ',' in str(genre_ids):
-            first_genre = str(genre_ids).split(',')[0]
-            fallback_results = self.discover_movies_by_genre_flexible(first_genre, "")
-            return fallback_results or {'results': []}
-        
-        return {'results': []}
+    def match_rows(self, genre_ids, language=None):
+        """Rows having all the given genres (and language), in popularity order"""
+        try:
+            bits = [self.bit_of_genre[int(gid)] for gid in str(genre_ids).split(',') if gid.strip()]
+        except (KeyError, ValueError):
+            return np.empty(0, dtype=np.intp)
+        if not bits:
+            return np.empty(0, dtype=np.intp)
 
-    def get_similar_by_genre(self, movie_id, target_language=None):
-        """Get movies with exactly the same genres first, then similar movies to reach 20 total - Optimized hybrid version"""
+        mask = np.uint64(sum(1 << bit for bit in bits))
+        # Start from the shortest posting list, then filter on the full mask
+        rows = min((self.genre_index[int(self.genre_bits[bit])] for bit in bits), key=len)
+        rows = rows[(self.genre_masks[rows] & mask) == mask]
+        if language:
+            rows = rows[self.languages[rows] == language]
+        return rows
 
-        # Create cache key
-        cache_key = f"similar_genre_{movie_id}_{target_language or 'all'}"
+    def movie(self, row):
+        """A discover-style movie dict for one snapshot row"""
+        mask = int(self.genre_masks[row])
+        return {
+            'id': int(self.ids[row]),
+            'title': str(self.titles[row]),
+            'genre_ids': [int(gid) for bit, gid in enumerate(self.genre_bits) if mask >> bit & 1],
+            'original_language': str(self.languages[row]),
+            'popularity': round(float(self.popularity[row]), 3),
+            'vote_average': round(float(self.vote_average[row]), 1),
+            'poster_path': str(self.poster_paths[row]) or None,
+            'release_date': str(self.release_dates[row]),
+        }
 
-        # Check cache first
-        if hasattr(self, 'cache') and cache_key in self.cache:
-            return self.cache[cache_key]
+    def similar_by_genres(self, genre_ids, k=20, exclude_id=None, language=None):
+        """Rank every catalog movie against a genre set in one vectorized pass.
 
-        # Initialize cache if it doesn't exist
-        if not hasattr(self, 'cache'):
-            self.cache = {}
+        Exact genre-set matches come first, then movies sharing at least half
+        of the genres, ordered by Jaccard similarity. Rows are stored by
+        popularity, so row order breaks ties. Returns up to k movie dicts.
+        """
+        genre_ids = {int(gid) for gid in genre_ids}
+        if not genre_ids or len(self) == 0:
+            return []
+        known_bits = [self.bit_of_genre[gid] for gid in genre_ids if gid in self.bit_of_genre]
+        unknown = len(genre_ids) - len(known_bits)
+        target = np.uint64(sum(1 << bit for bit in known_bits))
 
-        # Get the movie details to extract genres (with caching)
-        movie_details_key = f"details_{movie_id}"
-        if movie_details_key in self.cache:
-            movie_details = self.cache[movie_details_key]
-        else:
-            movie_details = self.get_movie_details(movie_id)
-            if movie_details:
-                self.cache[movie_details_key] = movie_details
+        inter = np.bitwise_count(self.genre_masks & target).astype(np.float32)
+        union = np.bitwise_count(self.genre_masks | target).astype(np.float32) + unknown
+        exact = (self.genre_masks == target) & (unknown == 0)
+        jaccard = inter / np.maximum(union, 1)
 
-        if not movie_details or not movie_details.get('genres'):
-            print(f"No movie details or genres found for movie_id: {movie_id}")
-            return None
+        eligible = exact | (inter >= len(genre_ids) * 0.5)
+        eligible &= self.genre_masks != 0
+        if exclude_id is not None:
+            eligible &= self.ids != exclude_id
+        if language:
+            eligible &= self.languages == language
 
-        # Extract and sort genre IDs
-        original_genre_ids = sorted([genre['id'] for genre in movie_details['genres']])
-        genre_string = ','.join(str(gid) for gid in original_genre_ids)
-        
-        print(f"Original movie genres: {genre_string}")  # Debug
+        rows = np.flatnonzero(eligible)
+        order = np.lexsort((rows, -jaccard[rows], ~exact[rows]))
+        return [self.movie(row) for row in rows[order[:k]]]
 
-        # Use the corrected discover method
-        discover_results = self.discover_movies_by_genre_with_fallback(genre_string, target_language)
-        
-        if not discover_results or not discover_results.get('results'):
-            print("No results from discover API")
+    def discover(self, genre_ids, language=None, page=1):
+        """Answer a discover query from the snapshot; None when nothing matches"""
+        rows = self.match_rows(genre_ids, language)
+        if len(rows) == 0:
             return None
+        start = (page - 1) * CATALOG_PAGE_SIZE
+        return {
+            'page': page,
+            'results': [self.movie(row) for row in rows[start:start + CATALOG_PAGE_SIZE]],
+            'total_results': int(len(rows)),
+            'total_pages': int((len(rows) + CATALOG_PAGE_SIZE - 1) // CATALOG_PAGE_SIZE),
+        }
 
-        exact_matches = []
-        similar_matches = []
+# Content-based recommender: hashed feature vectors in a memory-mapped matrix
+CONTENT_INDEX_DIR = os.environ.get('CONTENT_INDEX_DIR', 'content_index')
+CONTENT_DIM = 1024
+CONTENT_TOP_CAST = 5
+CONTENT_FIELD_WEIGHTS = {
+    'genre': 1.0,
+    'cast': 0.6,
+    'director': 0.8,
+    'keyword': 0.7,
+    'language': 0.5,
+    'decade': 0.4,
+    'overview': 0.6,
+}
+OVERVIEW_STOPWORDS = frozenset(
+    'the and for with that this from his her their they them who when where while into '
+    'after before about over under when what which will would must have has had are was '
+    'were been being but not all one two its out off own than then there these those only '
+    'film movie story life new'.split()
+)
 
-        # Process the results
-        movies_to_check = [movie for movie in discover_results['results'] if movie['id'] != movie_id]
-        
-        for movie in movies_to_check[:30]:  # Limit API calls
-            # Check cache for movie details first
-            detail_key = f"details_{movie['id']}"
-            if detail_key in self.cache:
-                movie_detail = self.cache[detail_key]
-            else:
-                movie_detail = self.get_movie_details(movie['id'])
-                if movie_detail:
-                    self.cache[detail_key] = movie_detail
-            
-            if movie_detail and movie_detail.get('genres'):
-                movie_genre_ids = sorted([g['id'] for g in movie_detail['genres']])
-                
-                if movie_genre_ids == original_genre_ids:
-                    exact_matches.append(movie)
-                else:
-                    # Check for significant genre overlap (at least 50% of genres match)
-                    overlap = len(set(movie_genre_ids) & set(original_genre_ids))
-                    if overlap >= len(original_genre_ids) * 0.5:
-                        similar_matches.append(movie)
-            
-            # Early exit if we have enough exact matches
-            if len(exact_matches) >= 20:
-                break
 
-        # Combine results: exact matches first, then similar ones
-        final_results = exact_matches + similar_matches
+class ContentIndex:
+    """Brute-force cosine index over content feature vectors.
 
-        # If still not enough, get more from TMDB's similar endpoint
-        if len(final_results) < 20:
-            similar_cache_key = f"tmdb_similar_{movie_id}_{target_language or 'all'}"
-            
-            if similar_cache_key in self.cache:
-                similar_movies = self.cache[similar_cache_key]
-            else:
-                similar_movies = self.get_similar_movies(movie_id, target_language)
-                if similar_movies:
-                    self.cache[similar_cache_key] = similar_movies
-            
-            if similar_movies and similar_movies.get('results'):
-                # Add unique movies from similar endpoint
-                existing_ids = {movie['id'] for movie in final_results}
-                existing_ids.add(movie_id)  # Exclude original movie
-                
-                for movie in similar_movies['results']:
-                    if movie['id'] not in existing_ids:
-                        final_results.append(movie)
-                        if len(final_results) >= 20:
-                            break
+    Each movie is embedded by feature-hashing its genres, top cast, director,
+    keywords, original language, release decade and TF-IDF weighted overview
+    words into CONTENT_DIM signed buckets, one L2-normalised float32 row per
+    movie. Rows live in a memory-mapped file and are scored with a single
+    matrix-vector product. Hashing keeps the feature space fixed, so new
+    movies can be appended without rebuilding existing rows.
+    """
 
-        # Prepare final response
-        result = {
-            'results': final_results[:20],
-            'total_results': len(final_results[:20]),
-            'total_pages': 1,
-            'page': 1
+    def __init__(self, path=CONTENT_INDEX_DIR, dim=CONTENT_DIM):
+        self.path = path
+        self.dim = dim
+        self.ids = np.empty(0, dtype=np.int64)
+        self.movies = []  # discover-style dicts, one per row
+        self.languages = np.empty(0, dtype=str)  # original_language per row, for filtering
+        self.doc_freq = np.zeros(dim, dtype=np.float32)  # overview bucket document frequencies
+        self.n_docs = 0
+        self.matrix = np.empty((0, dim), dtype=np.float32)
+        self.row_of_id = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    # -- feature extraction -------------------------------------------------
+
+    @staticmethod
+    def _bucket(token, dim):
+        h = zlib.crc32(token.encode('utf-8'))
+        return h % dim, (1.0 if h & 0x80000000 else -1.0)
+
+    @staticmethod
+    def _overview_tokens(details):
+        words = re.findall(r"[a-z]{3,}", (details.get('overview') or '').lower())
+        return [w for w in words if w not in OVERVIEW_STOPWORDS]
+
+    def _fields(self, details):
+        """Tokens per field for one movie details payload"""
+        credits = details.get('credits') or {}
+        keywords = (details.get('keywords') or {}).get('keywords') or []
+        year = (details.get('release_date') or '')[:4]
+        return {
+            'genre': [f"g:{g['id']}" for g in details.get('genres') or []],
+            'cast': [f"p:{c['id']}" for c in (credits.get('cast') or [])[:CONTENT_TOP_CAST]],
+            'director': [f"p:{c['id']}" for c in credits.get('crew') or [] if c.get('job') == 'Director'],
+            'keyword': [f"k:{k['id']}" for k in keywords],
+            'language': [f"l:{details['original_language']}"] if details.get('original_language') else [],
+            'decade': [f"d:{year[:3]}"] if year.isdigit() else [],
+            'overview': [f"w:{w}" for w in self._overview_tokens(details)],
         }
 
-        # Cache the final result
-        self.cache[cache_key] = result
-        
-        print(f"Final results count: {len(result['results'])}")  # Debug
+    def _overview_buckets(self, details):
+        return {self._bucket(f"w:{w}", self.dim)[0] for w in self._overview_tokens(details)}
 
-        return result
+    def vectorize(self, details):
+        """Embed one movie details payload as a unit-length float32 vector"""
+        vec = np.zeros(self.dim, dtype=np.float32)
+        idf = np.log((1.0 + self.n_docs) / (1.0 + self.doc_freq)) + 1.0
+        for field, tokens in self._fields(details).items():
+            if not tokens:
+                continue
+            part = np.zeros(self.dim, dtype=np.float32)
+            for token in tokens:
+                bucket, sign = self._bucket(token, self.dim)
+                part[bucket] += sign * (idf[bucket] if field == 'overview' else 1.0)
+            norm = np.linalg.norm(part)
+            if norm:
+                vec += part * (CONTENT_FIELD_WEIGHTS[field] / norm)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
 
-    def get_movie_details(self, movie_id):
-        """Get detailed information about a movie"""
-        movie_url = f"{self.base_url}/movie/{movie_id}"
-        movie_params = {
-            'api_key': self.api_key,
-            'language': 'en-US',
-            'append_to_response': 'credits,videos'
+    @staticmethod
+    def summary(details):
+        """The discover-style fields the result grid needs"""
+        return {
+            'id': details['id'],
+            'title': details.get('title'),
+            'genre_ids': [g['id'] for g in details.get('genres') or []],
+            'original_language': details.get('original_language'),
+            'popularity': details.get('popularity'),
+            'vote_average': details.get('vote_average'),
+            'poster_path': details.get('poster_path'),
+            'release_date': details.get('release_date'),
         }
-        
-        try:
-            response = requests.get(movie_url, params=movie_params)
-            if response.status_code == 200:
-                return response.json()
+
+    # -- building and incremental updates -----------------------------------
+
+    def add(self, details_list):
+        """Add or refresh movies in memory; call save() to persist"""
+        details_list = [d for d in details_list if d and d.get('id')]
+        for details in details_list:
+            if details['id'] not in self.row_of_id:
+                self.doc_freq[list(self._overview_buckets(details))] += 1
+                self.n_docs += 1
+
+        new_rows, new_ids = [], []
+        updated = False
+        for details in details_list:
+            vec = self.vectorize(details)
+            row = self.row_of_id.get(details['id'])
+            if row is None:
+                self.row_of_id[details['id']] = len(self.ids) + len(new_ids)
+                new_rows.append(vec)
+                new_ids.append(details['id'])
+                self.movies.append(self.summary(details))
             else:
-                print(f"Error getting movie details for {movie_id}: {response.status_code}")
-                return None
-        except Exception as e:
-            print(f"Exception getting movie details for {movie_id}: {e}")
-            return None
+                if not self.matrix.flags.writeable:
+                    self.matrix = np.array(self.matrix)
+                self.matrix[row] = vec
+                self.movies[row] = self.summary(details)
+                updated = True
 
-    def get_genres(self):
-        """Get list of all genres"""
-        url = f"{self.base_url}/genre/movie/list"
-        params = {
-            'api_key': self.api_key,
-            'language': 'en-US'
-        }
+        if new_rows:
+            self.matrix = np.vstack([self.matrix, np.array(new_rows, dtype=np.float32)])
+            self.ids = np.concatenate([self.ids, np.array(new_ids, dtype=np.int64)])
+        if updated:
+            self.languages = self._languages_of(self.movies)
+        elif new_rows:
+            self.languages = np.concatenate([self.languages, self._languages_of(self.movies[-len(new_rows):])])
+        return len(new_rows)
 
+    @staticmethod
+    def _languages_of(movies):
+        return np.array([movie.get('original_language') or '' for movie in movies], dtype=str)
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        vectors_path = os.path.join(self.path, 'vectors.f32')
+        tmp_path = vectors_path + '.tmp'
+        np.ascontiguousarray(self.matrix, dtype=np.float32).tofile(tmp_path)
+        os.replace(tmp_path, vectors_path)
+        np.save(os.path.join(self.path, 'ids.npy'), self.ids)
+        np.save(os.path.join(self.path, 'doc_freq.npy'), self.doc_freq)
+        with open(os.path.join(self.path, 'meta.json'), 'w') as f:
+            json.dump({'dim': self.dim, 'n_docs': self.n_docs, 'movies': self.movies}, f)
+
+    @classmethod
+    def load(cls, path=CONTENT_INDEX_DIR):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        index = cls(path, dim=meta['dim'])
+        index.ids = np.load(os.path.join(path, 'ids.npy'))
+        index.doc_freq = np.load(os.path.join(path, 'doc_freq.npy'))
+        index.n_docs = meta['n_docs']
+        index.movies = meta['movies']
+        index.languages = cls._languages_of(index.movies)
+        index.row_of_id = {int(mid): row for row, mid in enumerate(index.ids)}
+        if len(index.ids):
+            index.matrix = np.memmap(os.path.join(path, 'vectors.f32'), dtype=np.float32,
+                                     mode='r', shape=(len(index.ids), index.dim))
+        return index
+
+    @classmethod
+    def load_if_exists(cls, path=CONTENT_INDEX_DIR):
+        if not path or not os.path.exists(os.path.join(path, 'meta.json')):
+            return None
         try:
-            print(f"Making request to: {url}")  # Debug
-            print(f"With params: {params}")  # Debug
-            response = requests.get(url, params=params)
-            print(f"Response status: {response.status_code}")  # Debug
-            print(f"Response text: {response.text[:200]}...")  # Debug first 200 chars
-        
-            if response.status_code == 200:
-                data = response.json()
-                print(f"JSON data: {data}")  # Debug
-                return data.get('genres', [])
-            else:
-                print(f"API error: {response.text}")
-                return []
+            return cls.load(path)
         except Exception as e:
-            print(f"Exception in get_genres: {e}")
+            log.error("Could not load content index %s: %s", path, e)
+            return None
+
+    # -- queries --------------------------------------------------------------
+
+    def recommend(self, movie_id, details=None, language=None, k=20, page=1):
+        """/search_similar-style response for a movie; details are needed only if it is not indexed"""
+        row = self.row_of_id.get(movie_id)
+        query_vec = np.asarray(self.matrix[row]) if row is not None else self.vectorize(details)
+        # One extra match tells whether another page follows
+        matches = self.similar(query_vec, k=k * page + 1, exclude_id=movie_id, language=language)
+        more = len(matches) > k * page and page < SIMILAR_MAX_PAGES
+        matches = matches[k * (page - 1):k * page]
+        if not matches:
+            return None
+        return with_next_cursor({
+            'results': [dict(movie, score=round(score, 4)) for movie, score in matches],
+            'total_results': len(matches),
+            'total_pages': page + 1 if more else page,
+            'page': page,
+            'mode': 'content'
+        }, SIMILAR_MAX_PAGES)
+
+    def similar(self, query_vec, k=20, exclude_id=None, language=None):
+        """Top-k (movie, score) by cosine similarity, preferring the given language"""
+        if len(self.ids) == 0:
             return []
-    def search_person(self, person_name):
-        """Search for a person (actor/director) by name"""
-        url = f"{self.base_url}/search/person"
-        params = {
-            'api_key': self.api_key,
-            'query': person_name,
-            'include_adult': False
-        }
-    
-        try:
-            response = requests.get(url, params=params)
-            print(f"Person search response status: {response.status_code}")
-            if response.status_code == 200:
-                data = response.json()
-                print(f"Person search results: {len(data.get('results', []))} found")
-                return data
-            else:
-                print(f"Person search failed: {response.status_code} - {response.text}")
+        scores = self.matrix @ query_vec
+        if exclude_id is not None and exclude_id in self.row_of_id:
+            scores[self.row_of_id[exclude_id]] = -np.inf
+
+        if language:
+            in_language = self.languages == language
+            if np.count_nonzero(in_language) >= 10:
+                scores = np.where(in_language, scores, -np.inf)
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.movies[row], float(scores[row])) for row in top if np.isfinite(scores[row])]
+
+# Local autocomplete for /search_suggestions
+SUGGESTIONS_PER_KIND = 5
+AUTOCOMPLETE_MAX_ENTRIES = 50000  # least popular entries are dropped past this
+AUTOCOMPLETE_MERGE_EVERY = 256  # live additions held unsorted before being merged in
+
+
+class AutocompleteIndex:
+    """Popularity-weighted prefix index over movie titles and person names.
+
+    Entries live in parallel arrays sorted by lower-cased name, so a prefix
+    query is two binary searches plus a top-N pick over the matching slice.
+    Live additions collect in a short unsorted list that is merged in one
+    pass, trimming the index back to max_entries by popularity.
+    """
+
+    def __init__(self, max_entries=AUTOCOMPLETE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._keys = []     # lower-cased names, sorted
+        self._entries = []  # (weight, kind, name, year) aligned with _keys
+        self._ids = []      # (kind, id) aligned with _keys
+        self._pending = []  # (key, entry, (kind, id)) not merged yet
+        self._seen = set()  # (kind, id) indexed or pending
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys) + len(self._pending)
+
+    def add(self, kind, item_id, name, weight=0, year=''):
+        if not name or (kind, item_id) in self._seen:
+            return
+        with self._lock:
+            if (kind, item_id) in self._seen:
+                return
+            self._seen.add((kind, item_id))
+            self._pending.append((name.lower(), (float(weight or 0), kind, name, year), (kind, item_id)))
+            if len(self._pending) >= AUTOCOMPLETE_MERGE_EVERY:
+                self._merge()
+
+    def _merge(self):
+        rows = list(zip(self._keys, self._entries, self._ids))
+        rows += self._pending
+        self._pending = []
+        if len(rows) > self.max_entries:
+            rows = heapq.nlargest(self.max_entries, rows, key=lambda row: row[1][0])
+            self._seen = {row[2] for row in rows}  # dropped names can come back from TMDb
+        rows.sort(key=lambda row: row[0])  # two sorted runs when nothing was dropped
+        self._keys = [key for key, _, _ in rows]
+        self._entries = [entry for _, entry, _ in rows]
+        self._ids = [ids for _, _, ids in rows]
+
+    def add_movies(self, movies):
+        for movie in movies:
+            year = movie.get('release_date', '')[:4] if movie.get('release_date') else ''
+            self.add('movie', movie['id'], movie.get('title'), movie.get('popularity'), year)
+
+    def add_people(self, people):
+        for person in people:
+            self.add('actor', person['id'], person.get('name'), person.get('popularity'))
+
+    def search(self, prefix, kind, limit=SUGGESTIONS_PER_KIND):
+        """Most popular entries of one kind whose name starts with prefix"""
+        prefix = prefix.lower()
+        with self._lock:
+            lo = bisect.bisect_left(self._keys, prefix)
+            hi = bisect.bisect_left(self._keys, prefix + '\U0010ffff', lo)
+            matches = [entry for entry in self._entries[lo:hi] if entry[1] == kind]
+            matches += [entry for key, entry, _ in self._pending if entry[1] == kind and key.startswith(prefix)]
+        return heapq.nlargest(limit, matches, key=lambda entry: entry[0])
+
+    @classmethod
+    def from_catalog(cls, snapshot):
+        index = cls()
+        if snapshot is not None:
+            entries = sorted(
+                (str(title).lower(), (float(pop), 'movie', str(title), str(date)[:4]), int(mid))
+                for mid, title, pop, date in zip(snapshot.ids, snapshot.titles,
+                                                 snapshot.popularity, snapshot.release_dates)
+                if title
+            )
+            index._keys = [key for key, _, _ in entries]
+            index._entries = [entry for _, entry, _ in entries]
+            index._ids = [('movie', mid) for _, _, mid in entries]
+            index._seen = set(index._ids)
+            if len(entries) > index.max_entries:
+                with index._lock:
+                    index._merge()
+        return index
+
+
+# Poster proxy: TMDb images fetched once and kept in a content-addressed disk cache
+IMAGE_BASE_URL = os.environ.get('TMDB_IMAGE_BASE_URL', 'https://image.tmdb.org/t/p')
+POSTER_CACHE_DIR = os.environ.get('POSTER_CACHE_DIR', 'poster_cache')
+POSTER_CACHE_MAX_BYTES = 512 * 1024 * 1024
+POSTER_SIZES = ('w92', 'w154', 'w185', 'w300', 'w342', 'w500', 'w780', 'original')
+POSTER_GRID_SIZE = 'w300'  # what the results grids show
+POSTER_PATH_PATTERN = re.compile(r'/?[A-Za-z0-9_-]+\.(?:jpg|jpeg|png|webp|svg)')
+POSTER_MAX_AGE = 365 * 24 * 3600
+POSTER_TOUCH_INTERVAL = 60  # seconds between LRU timestamp writes for one poster
+POSTER_PREFETCH_WORKERS = 4
+
+
+class PosterCache:
+    """TMDb poster images on local disk, evicted least-recently-used.
+
+    Image bytes live under objects/<sha256 prefix>/<sha256>, so identical
+    images are stored once; a SQLite index maps (size, path) to a digest and
+    tracks last use. Each poster is fetched through the pooled TMDb session
+    at most once at a time, and result grids can prefetch theirs in the
+    background. The directory and index are created on first use, and
+    worker processes may share them.
+    """
+
+    def __init__(self, root=POSTER_CACHE_DIR, client=None, max_bytes=POSTER_CACHE_MAX_BYTES,
+                 base_url=IMAGE_BASE_URL, prefetch_workers=POSTER_PREFETCH_WORKERS):
+        self.root = root
+        self.client = client
+        self.max_bytes = max_bytes
+        self.base_url = base_url
+        self.executor = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix='poster-prefetch')
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        self._opened = False
+        self._inflight = {}  # key -> _InFlight
+        self._touched = {}   # key -> last LRU timestamp written; guarded by _lock
+        self._claimed = set()  # keys queued for prefetch; guarded by _lock
+        self._bytes = 0  # as of the last store or eviction; other workers add to the same index
+        self._stats = {'hits': 0, 'misses': 0, 'fetch_errors': 0, 'evictions': 0, 'prefetched': 0}
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            with self._open_lock:
+                if not self._opened:
+                    os.makedirs(os.path.join(self.root, 'objects'), exist_ok=True)
+                conn = sqlite3.connect(os.path.join(self.root, 'index.sqlite3'), timeout=5, isolation_level=None)
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('PRAGMA synchronous=NORMAL')
+                if not self._opened:
+                    conn.execute(
+                        'CREATE TABLE IF NOT EXISTS posters ('
+                        'key TEXT PRIMARY KEY, digest TEXT NOT NULL, size INTEGER NOT NULL, '
+                        'content_type TEXT NOT NULL, last_used REAL NOT NULL)'
+                    )
+                    self._bytes = self._stored_bytes(conn)
+                    self._opened = True
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _stored_bytes(conn):
+        """Bytes indexed by every worker sharing the directory"""
+        return conn.execute('SELECT COALESCE(SUM(size), 0) FROM posters').fetchone()[0]
+
+    @staticmethod
+    def key(size, poster_path):
+        return f"{size}/{poster_path.lstrip('/')}"
+
+    def object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+
+    def _lookup(self, key):
+        row = self._connect().execute(
+            'SELECT digest, content_type FROM posters WHERE key = ?', (key,)).fetchone()
+        if row is None or not os.path.exists(self.object_path(row[0])):
+            return None
+        now = time.time()
+        with self._lock:
+            touch = now - self._touched.get(key, 0) > POSTER_TOUCH_INTERVAL
+            if touch:
+                self._touched[key] = now
+        if touch:
+            self._connect().execute('UPDATE posters SET last_used = ? WHERE key = ?', (now, key))
+        return row
+
+    def get(self, size, poster_path):
+        """(file path, content type, digest) for a poster, fetching it on a miss; None if TMDb has none"""
+        key = self.key(size, poster_path)
+        row = self._lookup(key)
+        with self._lock:
+            self._stats['hits' if row else 'misses'] += 1
+        if row is None:
+            row = self._fetch_once(key)
+            if row is None:
                 return None
+        digest, content_type = row
+        return self.object_path(digest), content_type, digest
+
+    def _fetch_once(self, key):
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _InFlight()
+        if not leader:
+            flight.done.wait()
+            return flight.value
+        try:
+            flight.value = self._fetch(key)
+            return flight.value
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    def _fetch(self, key):
+        try:
+            response = self.client.get_image(f"{self.base_url}/{key}")
         except Exception as e:
-            print(f"Error in search_person: {e}")
+            log.warning("Poster fetch failed for %s: %s", key, e)
+            response = None
+        if response is None or response.status_code != 200 or not response.content:
+            with self._lock:
+                self._stats['fetch_errors'] += 1
             return None
+        body = response.content
+        content_type = response.headers.get('Content-Type', 'image/jpeg')
+        digest = hashlib.sha256(body).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(body)
+            os.replace(tmp, path)
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO posters (key, digest, size, content_type, last_used) VALUES (?, ?, ?, ?, ?)',
+            (key, digest, len(body), content_type, now))
+        stored = self._stored_bytes(conn)
+        with self._lock:
+            self._touched[key] = now
+            self._bytes = stored
+        if stored > self.max_bytes:
+            self._evict()
+        return digest, content_type
 
-    def get_movies_by_actor(self, person_id):
-        """Get movies featuring a specific actor"""
-        url = f"{self.base_url}/person/{person_id}/movie_credits"
-        params = {
-            'api_key': self.api_key,
-            'language': 'en-US'
-        }
-    
+    def _evict(self):
+        """Drop least recently used posters until the cache is 90% full"""
+        if not self._evict_lock.acquire(blocking=False):
+            return  # another thread is already making room
         try:
-            response = requests.get(url, params=params)
-            print(f"Movie credits response status: {response.status_code}")
-            if response.status_code == 200:
-                data = response.json()
-                print(f"Movie credits found: {len(data.get('cast', []))} movies")
-                return data
-            else:
-                print(f"Movie credits failed: {response.status_code} - {response.text}")
-                return None
+            self._evict_lru()
+        finally:
+            self._evict_lock.release()
+
+    def _evict_lru(self):
+        conn = self._connect()
+        target = self.max_bytes * 0.9
+        stored = self._stored_bytes(conn)  # other workers sharing the directory store posters too
+        with self._lock:
+            self._bytes = stored
+        for key, digest, size in conn.execute(
+                'SELECT key, digest, size FROM posters ORDER BY last_used').fetchall():
+            if stored <= target:
+                break
+            if conn.execute('DELETE FROM posters WHERE key = ?', (key,)).rowcount == 0:
+                continue  # already gone, e.g. evicted by another worker sharing the directory
+            if conn.execute('SELECT 1 FROM posters WHERE digest = ? LIMIT 1', (digest,)).fetchone() is None:
+                try:
+                    os.remove(self.object_path(digest))
+                except OSError:
+                    pass
+            stored -= size
+            with self._lock:
+                self._touched.pop(key, None)
+                self._bytes = stored
+                self._stats['evictions'] += 1
+
+    def prefetch(self, movies, size=POSTER_GRID_SIZE):
+        """Fill the cache in the background for every poster in a result list"""
+        for movie in movies or []:
+            poster_path = movie.get('poster_path')
+            if not poster_path or not POSTER_PATH_PATTERN.fullmatch(poster_path):
+                continue
+            key = self.key(size, poster_path)
+            with self._lock:
+                if key in self._touched or key in self._claimed or key in self._inflight:
+                    continue
+                self._claimed.add(key)
+                self._stats['prefetched'] += 1
+            self.executor.submit(self._prefetch_one, key)
+
+    def _prefetch_one(self, key):
+        try:
+            self._lookup(key) or self._fetch_once(key)
         except Exception as e:
-            print(f"Error in get_movies_by_actor: {e}")
-            return None
+            log.debug("Poster prefetch failed for %s: %s", key, e)
+        finally:
+            # A stored poster is in _touched now; a failed one may be retried by a later grid
+            with self._lock:
+                self._claimed.discard(key)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, bytes=self._bytes, max_bytes=self.max_bytes)
+
+
+# Cache warm-up after a deploy (`flask warm-cache`, or WARMUP_ON_START=1 for servers)
+WARMUP_ON_START = os.environ.get('WARMUP_ON_START', '') == '1'
+WARMUP_TOP_MOVIES = 100
+WARMUP_TOP_PEOPLE = 40
+WARMUP_LANGUAGES = ['en', 'hi', 'es', 'fr', 'ja']
+WARMUP_WORKERS = 4  # well below FANOUT_WORKERS so user traffic keeps most of the rate budget
+WARMUP_READY_SHARE = float(os.environ.get('WARMUP_READY_SHARE', '0.8'))  # /ready flips once this share is done
+WARMUP_REPORT_EVERY = 0.1  # print progress every 10% of tasks
+WARMUP_RATE_LIMIT_RETRIES = 3  # waits on a rate-limited call before the task counts as failed
+
+
+class CacheWarmer:
+    """Pre-populates the recommender cache with what the first users will ask for.
+
+    Genres, details and similar-by-genre lists for the most popular movies
+    (in each of WARMUP_LANGUAGES) and filmographies of popular people are
+    loaded on a small worker pool. Every TMDb call still goes through the
+    rate limiter; warm-up tasks wait out a shed token a few times before
+    they are given up as failed.
+    """
+
+    def __init__(self, recommender, top_movies=WARMUP_TOP_MOVIES, top_people=WARMUP_TOP_PEOPLE,
+                 languages=WARMUP_LANGUAGES, workers=WARMUP_WORKERS, ready_share=WARMUP_READY_SHARE,
+                 autocomplete=None):
+        self.recommender = recommender
+        self.autocomplete = autocomplete  # fed the popular movies and people fetched for the plan
+        self.top_movies = top_movies
+        self.top_people = top_people
+        self.languages = languages
+        self.workers = workers
+        self.ready_share = ready_share
+        self.state = 'idle'  # idle | running | done
+        self.planned = 0
+        self.completed = 0
+        self.failed = 0
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._ready.set()  # nothing to wait for until a warm-up starts
+
+    def popular_movie_ids(self):
+        """Most popular movie ids, from the catalog snapshot when there is one"""
+        catalog = self.recommender.catalog
+        if catalog is not None and len(catalog):
+            top = np.argsort(-catalog.popularity, kind='stable')[:self.top_movies]
+            return [int(catalog.ids[row]) for row in top]
+        ids = []
+        for page in itertools.count(1):
+            try:
+                movies = self._call(self.recommender.get_popular_movies, page)
+            except RateLimitExceeded:
+                log.warning("Warm-up: rate limited listing popular movies, keeping %d", len(ids))
+                return ids[:self.top_movies]
+            if self.autocomplete is not None:
+                self.autocomplete.add_movies(movies)
+            ids += [movie['id'] for movie in movies if movie['id'] not in ids]
+            if not movies or len(ids) >= self.top_movies:
+                return ids[:self.top_movies]
+
+    def popular_person_ids(self):
+        ids = []
+        for page in itertools.count(1):
+            try:
+                people = self._call(self.recommender.get_popular_people, page)
+            except RateLimitExceeded:
+                log.warning("Warm-up: rate limited listing popular people, keeping %d", len(ids))
+                return ids[:self.top_people]
+            if self.autocomplete is not None:
+                self.autocomplete.add_people(people)
+            ids += [person['id'] for person in people if person['id'] not in ids]
+            if not people or len(ids) >= self.top_people:
+                return ids[:self.top_people]
+
+    def plan(self):
+        """(label, function, args) for every warm-up task, most valuable first"""
+        movie_ids = self.popular_movie_ids() if self.top_movies else []
+        person_ids = self.popular_person_ids() if self.top_people else []
+        tasks = [('genres', self.recommender.get_genres, ())]
+        tasks += [(f"details {movie_id}", self.recommender.cached_movie_details, (movie_id,))
+                  for movie_id in movie_ids]
+        tasks += [(f"similar {movie_id} {language}", self.recommender.get_similar_by_genre, (movie_id, language))
+                  for language in self.languages for movie_id in movie_ids]
+        tasks += [(f"actor {person_id}", self.recommender.get_movies_by_actor, (person_id,))
+                  for person_id in person_ids]
+        return tasks
+
+    @staticmethod
+    def _call(function, *args):
+        for attempt in itertools.count():
+            try:
+                return function(*args)
+            except RateLimitExceeded as e:
+                if attempt >= WARMUP_RATE_LIMIT_RETRIES:
+                    raise
+                time.sleep(e.retry_after)
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def _task_done(self, ok):
+        with self._lock:
+            self.completed += 1
+            if not ok:
+                self.failed += 1
+            completed, planned, failed = self.completed, self.planned, self.failed
+        if completed >= planned * self.ready_share:
+            self._ready.set()
+        step = max(1, int(planned * WARMUP_REPORT_EVERY))
+        if completed % step == 0 or completed == planned:
+            log.info("Warm-up: %d/%d tasks (%d%%), %d failed", completed, planned, completed * 100 // planned, failed)
 
+    def _run_task(self, label, function, args):
+        try:
+            ok = bool(self._call(function, *args))
+        except Exception as e:
+            log.warning("Warm-up task %s failed: %s", label, e)
+            ok = False
+        self._task_done(ok)
+
+    def run(self):
+        """Run the whole warm-up in the calling thread; returns the final progress"""
+        with self._lock:
+            if self.state == 'running':
+                raise RuntimeError('warm-up already running')
+            self.state = 'running'
+            self.planned = self.completed = self.failed = 0
+            self.started_at, self.finished_at = time.time(), None
+        self._ready.clear()
+        try:
+            tasks = self.plan()
+            with self._lock:
+                self.planned = len(tasks)
+            log.info("Warm-up: %d tasks on %d workers", len(tasks), self.workers)
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='cache-warmup') as pool:
+                for label, function, args in tasks:
+                    pool.submit(self._run_task, label, function, args)
+        finally:
+            with self._lock:
+                self.state = 'done'
+                self.finished_at = time.time()
+            self._ready.set()
+        return self.progress()
+
+    def start(self):
+        """Run the warm-up on a background thread; /ready reports 503 until enough of it is done"""
+        self._ready.clear()
+        thread = threading.Thread(target=self.run, name='cache-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def progress(self):
+        with self._lock:
+            progress = {'state': self.state, 'planned': self.planned, 'completed': self.completed,
+                        'failed': self.failed, 'ready_share': self.ready_share}
+            if self.started_at is not None:
+                progress['elapsed'] = round((self.finished_at or time.time()) - self.started_at, 1)
+        progress['ready'] = self.ready
+        return progress
 
 
 # Initialize the recommender
-recommender = MovieRecommender(API_KEY)
+catalog = MovieCatalog.load_if_exists(CATALOG_PATH)
+content_index = ContentIndex.load_if_exists(CONTENT_INDEX_DIR)
+recommender = MovieRecommender(API_KEY, catalog=catalog, content_index=content_index)
+autocomplete = AutocompleteIndex.from_catalog(catalog)
+warmer = CacheWarmer(recommender, autocomplete=autocomplete)
+posters = PosterCache(POSTER_CACHE_DIR, client=recommender.client)
+if WARMUP_ON_START:
+    warmer.start()
 
-# Common CSS styles for all pages
-COMMON_STYLES = """
-    
-        <style>
-            body { font-family: Arial, sans-serif; margin: 0; padding: 20px; background: linear-gradient(135deg, #1a1a1a 0%, #2d1b1b 100%); color: #ffffff; }
-            .container { max-width: 1200px; margin: 0 auto; }
-            .navbar { background: linear-gradient(135deg, #cc0000 0%, #660000 100%); padding: 15px; border-radius: 10px; margin-bottom: 20px; box-shadow: 0 4px 15px rgba(204, 0, 0, 0.3); }
-            .navbar a { color: white; text-decoration: none; margin-right: 20px; font-weight: bold; transition: all 0.3s ease; }
-            .navbar a:hover { text-decoration: underline; transform: translateY(-2px); }
-            .navbar a.active { background-color: rgba(255,255,255,0.2); padding: 8px 15px; border-radius: 5px; box-shadow: 0 2px 8px rgba(0,0,0,0.3); }
-            .search-box { background: linear-gradient(135deg, #2a2a2a 0%, #1f1f1f 100%); padding: 20px; border-radius: 10px; margin-bottom: 20px; border: 1px solid #cc0000; box-shadow: 0 4px 15px rgba(0,0,0,0.5); }
-            .movie-grid { display: grid; grid-template-columns: repeat(auto-fill, minmax(200px, 1fr)); gap: 20px; }
-            .movie-card { background: linear-gradient(135deg, #2a2a2a 0%, #1f1f1f 100%); border-radius: 10px; padding: 15px; box-shadow: 0 4px 15px rgba(0,0,0,0.7); cursor: pointer; transition: all 0.3s ease; border: 1px solid #444; }
-            .movie-card:hover { transform: translateY(-8px); box-shadow: 0 8px 25px rgba(204, 0, 0, 0.4); border-color: #cc0000; }
-            .movie-poster { width: 100%; height: 300px; object-fit: cover; border-radius: 5px; }
-            .movie-title { font-weight: bold; margin: 10px 0 5px 0; color: #ffffff; }
-            .movie-year { color: #cccccc; font-size: 14px; }
-            .movie-rating { color: #ff6b35; font-weight: bold; }
-            input, select, button { padding: 12px; margin: 5px; border: 1px solid #cc0000; border-radius: 5px; background-color: #2a2a2a; color: #ffffff; }
-            input:focus, select:focus { outline: none; border-color: #ff4444; box-shadow: 0 0 8px rgba(204, 0, 0, 0.3); }
-            button { background: linear-gradient(135deg, #cc0000 0%, #990000 100%); color: white; cursor: pointer; font-weight: bold; transition: all 0.3s ease; }
-            button:hover { background: linear-gradient(135deg, #ff0000 0%, #cc0000 100%); transform: translateY(-2px); box-shadow: 0 4px 15px rgba(204, 0, 0, 0.4); }
-            .modal { display: none; position: fixed; z-index: 1000; left: 0; top: 0; width: 100%; height: 100%; background-color: rgba(0,0,0,0.8); }
-            .modal-content { background: linear-gradient(135deg, #2a2a2a 0%, #1f1f1f 100%); margin: 5% auto; padding: 20px; border-radius: 10px; width: 80%; max-width: 800px; max-height: 80%; overflow-y: auto; border: 1px solid #cc0000; box-shadow: 0 8px 25px rgba(0,0,0,0.9); }
-            .close { color: #cc0000; float: right; font-size: 28px; font-weight: bold; cursor: pointer; transition: color 0.3s ease; }
-            .close:hover { color: #ff4444; }
-            .movie-detail-poster { width: 200px; height: 300px; object-fit: cover; float: left; margin-right: 20px; border-radius: 10px; }
-            .movie-details { overflow: hidden; color: #ffffff; }
-            .genre-tag { background: linear-gradient(135deg, #cc0000 0%, #990000 100%); color: white; padding: 5px 10px; margin: 5px; border-radius: 15px; display: inline-block; font-size: 12px; }
-            .cast-member { display: inline-block; margin: 5px; padding: 5px 10px; background-color: #333333; border-radius: 5px; color: #ffffff; border: 1px solid #555; }
-            .page-header { background: linear-gradient(135deg, #2a2a2a 0%, #1f1f1f 100%); padding: 20px; border-radius: 10px; margin-bottom: 20px; text-align: center; border: 1px solid #cc0000; box-shadow: 0 4px 15px rgba(0,0,0,0.5); }
-            .search-result-header { background: linear-gradient(135deg, #330000 0%, #1a0000 100%); padding: 15px; border-radius: 10px; margin-bottom: 20px; border: 1px solid #cc0000; }
-            .page-header h1, .search-result-header h3 { color: #ffffff; }
-            .page-header p, .search-result-header p { color: #cccccc; }
-            small { color: #cccccc; }
-            .search-suggestions {
-                position: absolute;
-                background: #2a2a2a;
-                border: 1px solid #cc0000;
-                border-radius: 5px;
-                max-height: 200px;
-                overflow-y: auto;
-                z-index: 1000;
-                width: 100%;
-                margin-top: 2px;
-            }
-            .suggestion-item {
-                padding: 10px;
-                cursor: pointer;
-                border-bottom: 1px solid #444;
-                color: white;
-            }
-            .suggestion-item:hover {
-                background: #cc0000;
-            }
-            .suggestion-item:last-child {
-                border-bottom: none;
-            }
-            
-            #loader {
-                border: 8px solid #f3f3f3;
-                border-top: 8px solid #3498db;
-                border-radius: 50%;
-                width: 60px;
-                height: 60px;
-                animation: spin 1s linear infinite;
-                position: fixed;
-                top: 50%;
-                left: 50%;
-                transform: translate(-50%, -50%);
-                z-index: 1000;
-            }
 
-            @keyframes spin {
-                0% { transform: rotate(0deg); }
-                100% { transform: rotate(360deg); }
-            }
-        
+# Pages are rendered once at import; shared CSS/JS is served from static/ under
+# content-hashed names so browsers can cache it for a year
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+STATIC_TYPES = {'.css': 'text/css', '.js': 'text/javascript', '.svg': 'image/svg+xml', '.png': 'image/png',
+                '.ico': 'image/x-icon'}
+
 
-        </style>
+class StaticAssets:
+    """Files under static/, read once and published under fingerprinted names.
 
+    url('css/common.css') returns e.g. /static/css/common.3f2a9c1b7d4e.css;
+    the content hash changes whenever the file does, so the fingerprinted
+    name can be cached forever. The plain name is still served, revalidated
+    on every use.
     """
 
+    def __init__(self, root=STATIC_DIR):
+        self.root = root
+        self._files = {}  # served name -> (body, mimetype, etag, immutable)
+        self._urls = {}   # plain name -> fingerprinted URL
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    body = f.read()
+                digest = hashlib.sha256(body).hexdigest()[:12]
+                stem, ext = os.path.splitext(name)
+                mimetype = STATIC_TYPES.get(ext, 'application/octet-stream')
+                self._files[name] = (body, mimetype, digest, False)
+                self._files[f"{stem}.{digest}{ext}"] = (body, mimetype, digest, True)
+                self._urls[name] = f"/static/{stem}.{digest}{ext}"
+
+    def url(self, name):
+        return self._urls[name]
+
+    def response(self, name):
+        entry = self._files.get(name)
+        if entry is None:
+            return None
+        body, mimetype, etag, immutable = entry
+        response = Response(body, mimetype=mimetype)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = (
+            f"public, max-age={STATIC_IMMUTABLE_MAX_AGE}, immutable" if immutable else 'no-cache')
+        return response.make_conditional(request)
+
+
+class Page:
+    """A page rendered once to bytes, served with a strong ETag.
+
+    Pages are revalidated on every load ('no-cache') because they carry the
+    fingerprinted asset URLs of the current deploy; an unchanged page costs
+    a 304 and no body.
+    """
+
+    def __init__(self, html):
+        self.body = html.encode('utf-8')
+        self.etag = hashlib.sha256(self.body).hexdigest()[:16]
+
+    def response(self):
+        response = Response(self.body, mimetype='text/html')
+        response.set_etag(self.etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+
+
+static_assets = StaticAssets()
+PAGE_ASSETS = (f'<link rel="stylesheet" href="{static_assets.url("css/common.css")}">\n'
+               f'    <script src="{static_assets.url("js/common.js")}"></script>')
+
 # HOME PAGE - Search by Movie Name (FIXED VERSION)
 HOME_PAGE = f"""
 <!DOCTYPE html>
 <html>
 <head>
     <title>Movie Recommender - Find Similar Movies</title>
-    {COMMON_STYLES}
+    {PAGE_ASSETS}
 </head>
 <body>
     <div class="container">
@@ -451,132 +3150,107 @@ HOME_PAGE = f"""
     </div>
 
     <script>
-        function searchSimilarMovies() {{
-            const movieName = document.getElementById('movieName').value.trim();
-            const language = document.getElementById('language').value;
-            
-            if (!movieName) {{
-                alert('Please enter a movie name');
-                return;
-            }}
-            
-            // Show loading
-            document.getElementById('results').innerHTML = '<div style="text-align: center; padding: 50px;"><h3>🔍 Searching for similar movies...</h3></div>';
-            
-            fetch(`/search_similar?movie_name=${{encodeURIComponent(movieName)}}&language=${{language}}`)
-                .then(response => response.json())
-                .then(data => displaySimilarResults(data, movieName))
-                .catch(error => {{
-                    console.error('Error:', error);
-                    document.getElementById('results').innerHTML = '<div style="text-align: center; padding: 50px; color: red;"><h3>❌ Error occurred while searching. Please try again.</h3></div>';
-                }});
-        }}
+        let currentSearchId = 0;
 
-        function displaySimilarResults(data, searchedMovie) {{
-            const resultsDiv = document.getElementById('results');
+        function searchSimilarMovies() {{
+            const movieName = document.getElementById('movieName').value.trim();
+            const language = document.getElementById('language').value;
             
-            if (!data.results || data.results.length === 0) {{
-                resultsDiv.innerHTML = `
-                    <div style="text-align: center; padding: 50px; color: #666;">
-                        <h3>😔 No similar movies found for "${{searchedMovie}}"</h3>
-                        <p>Try searching for a more popular movie or check the spelling.</p>
-                    </div>
-                `;
+            if (!movieName) {{
+                alert('Please enter a movie name');
                 return;
             }}
             
-            let html = `
-                <div class="search-result-header">
-                    <h3>🎯 Movies Similar to "${{searchedMovie}}"</h3>
-                    <p>Found ${{data.results.length}} similar movies based on genre, themes, and style</p>
-                </div>
-                <div class="movie-grid">
-            `;
+            // Show loading
+            document.getElementById('results').innerHTML = '<div style="text-align: center; padding: 50px;"><h3>🔍 Searching for similar movies...</h3></div>';
             
-            data.results.forEach(movie => {{
-                const posterPath = movie.poster_path ? 
-                    `https://image.tmdb.org/t/p/w300${{movie.poster_path}}` : 
-                    'https://via.placeholder.com/300x450?text=No+Image';
-                
-                const releaseYear = movie.release_date ? new Date(movie.release_date).getFullYear() : 'Unknown';
-                const rating = movie.vote_average ? movie.vote_average.toFixed(1) : 'N/A';
-                
-                html += `
-                    <div class="movie-card" onclick="showMovieDetails(${{movie.id}})">
-                        <img src="${{posterPath}}" alt="${{movie.title}}" class="movie-poster">
-                        <div class="movie-title">${{movie.title}}</div>
-                        <div class="movie-year">${{releaseYear}}</div>
-                        <div class="movie-rating">⭐ ${{rating}}/10</div>
-                    </div>
-                `;
+            // Cards are added as the server confirms them instead of after the whole search;
+            // the closing event carries the cursor for the pages after the first
+            const searchId = ++currentSearchId;
+            const state = similarState = {{
+                query: `movie_name=${{encodeURIComponent(movieName)}}&language=${{language}}`,
+                nextCursor: null,
+                loading: true,
+                seen: new Set(),
+                grid: null
+            }};
+            readNdjson(`/search_similar?${{state.query}}&stream=1`, event => {{
+                if (searchId !== currentSearchId) return;  // a newer search replaced this one
+                if (event.event === 'results') {{
+                    if (!state.grid) state.grid = startSimilarResults(movieName);
+                    addSimilarMovies(event.results, state);
+                }} else if (event.event === 'done' && !state.grid) {{
+                    showNoSimilarResults(movieName);
+                }} else if (event.event === 'done') {{
+                    setSimilarCursor(event.next_cursor, state);
+                }}
+            }}).catch(error => {{
+                console.error('Error:', error);
+                if (searchId !== currentSearchId || state.grid) return;
+                document.getElementById('results').innerHTML = '<div style="text-align: center; padding: 50px; color: red;"><h3>❌ Error occurred while searching. Please try again.</h3></div>';
             }});
-            
-            html += '</div>';
-            resultsDiv.innerHTML = html;
         }}
 
-        // Movie details and modal functions
-        function showMovieDetails(movieId) {{
-            fetch(`/movie_details/${{movieId}}`)
+        // Infinite scroll over the later pages, one request at a time
+        let similarState = null;
+        const moreSimilarObserver = new IntersectionObserver(entries => {{
+            if (entries.some(entry => entry.isIntersecting)) loadMoreSimilarResults();
+        }}, {{ rootMargin: '600px' }});
+
+        function loadMoreSimilarResults() {{
+            const state = similarState;
+            if (!state || state.loading || !state.nextCursor) return;
+            state.loading = true;
+            fetch(`/search_similar?${{state.query}}&cursor=${{encodeURIComponent(state.nextCursor)}}`)
                 .then(response => response.json())
-                .then(movie => {{
-                    if (!movie || movie.error) {{
-                        alert('Could not load movie details');
-                        return;
-                    }}
-                    
-                    const posterPath = movie.poster_path ? 
-                        `https://image.tmdb.org/t/p/w300${{movie.poster_path}}` : 
-                        'https://via.placeholder.com/200x300?text=No+Image';
-                    
-                    const genres = movie.genres ? movie.genres.map(g => `<span class="genre-tag">${{g.name}}</span>`).join('') : '';
-                    const cast = movie.credits && movie.credits.cast ? 
-                        movie.credits.cast.slice(0, 10).map(actor => `<span class="cast-member">${{actor.name}}</span>`).join('') : 
-                        'Cast information not available';
-                    
-                    const trailer = movie.videos && movie.videos.results ? 
-                        movie.videos.results.find(v => v.type === 'Trailer' && v.site === 'YouTube') : null;
-                    
-                    const trailerHtml = trailer ? 
-                        `<p><strong>Trailer:</strong> <a href="https://www.youtube.com/watch?v=${{trailer.key}}" target="_blank">Watch on YouTube</a></p>` : 
-                        '<p><strong>Trailer:</strong> Not available</p>';
-                    
-                    const runtime = movie.runtime ? `${{movie.runtime}} minutes` : 'Unknown';
-                    const releaseDate = movie.release_date || 'Unknown';
-                    const rating = movie.vote_average ? movie.vote_average.toFixed(1) : 'N/A';
-                    
-                    document.getElementById('movieDetails').innerHTML = `
-                        <img src="${{posterPath}}" alt="${{movie.title}}" class="movie-detail-poster">
-                        <div class="movie-details">
-                            <h2>${{movie.title}}</h2>
-                            <p><strong>Overview:</strong> ${{movie.overview || 'No description available'}}</p>
-                            <p><strong>Release Date:</strong> ${{releaseDate}}</p>
-                            <p><strong>Runtime:</strong> ${{runtime}}</p>
-                            <p><strong>Rating:</strong> ⭐ ${{rating}}/10</p>
-                            <p><strong>Genres:</strong> ${{genres}}</p>
-                            ${{trailerHtml}}
-                            <p><strong>Cast:</strong></p>
-                            <div>${{cast}}</div>
-                        </div>
-                    `;
-                    
-                    document.getElementById('movieModal').style.display = 'block';
+                .then(data => {{
+                    if (state !== similarState) return;  // a newer search replaced this one
+                    addSimilarMovies(data.results || [], state);
+                    setSimilarCursor(data.next_cursor, state);
                 }})
                 .catch(error => {{
                     console.error('Error:', error);
-                    alert('Error loading movie details');
+                    state.loading = false;
                 }});
         }}
 
-        function closeModal() {{
-            document.getElementById('movieModal').style.display = 'none';
+        function addSimilarMovies(movies, state) {{
+            const fresh = movies.filter(movie => !state.seen.has(movie.id));
+            fresh.forEach(movie => state.seen.add(movie.id));
+            appendMovieCards(state.grid, fresh);
+            document.getElementById('similarCount').textContent =
+                `Found ${{state.seen.size}} similar movies based on genre, themes, and style`;
         }}
-        
-        window.onclick = function(event) {{
-            const modal = document.getElementById('movieModal');
-            if (event.target == modal) {{
-                modal.style.display = 'none';
-            }}
+
+        function setSimilarCursor(cursor, state) {{
+            state.nextCursor = cursor || null;
+            state.loading = false;
+            const more = document.getElementById('similarMore');
+            more.textContent = state.nextCursor ? 'Loading more movies...' : '';
+            // Re-observing fires again if the end of the grid is still on screen
+            moreSimilarObserver.unobserve(more);
+            if (state.nextCursor) moreSimilarObserver.observe(more);
+        }}
+
+        function showNoSimilarResults(searchedMovie) {{
+            document.getElementById('results').innerHTML = `
+                <div style="text-align: center; padding: 50px; color: #666;">
+                    <h3>😔 No similar movies found for "${{searchedMovie}}"</h3>
+                    <p>Try searching for a more popular movie or check the spelling.</p>
+                </div>
+            `;
+        }}
+
+        function startSimilarResults(searchedMovie) {{
+            document.getElementById('results').innerHTML = `
+                <div class="search-result-header">
+                    <h3>🎯 Movies Similar to "${{searchedMovie}}"</h3>
+                    <p id="similarCount"></p>
+                </div>
+                <div class="movie-grid" id="similarGrid"></div>
+                <div id="similarMore" style="text-align: center; padding: 20px; color: #999;"></div>
+            `;
+            return document.getElementById('similarGrid');
         }}
 
         // Allow Enter key to search
@@ -647,7 +3321,7 @@ BROWSE_PAGE = f"""
 <html>
 <head>
     <title>Movie Recommender - Browse by Genre</title>
-    {COMMON_STYLES}
+    {PAGE_ASSETS}
     <style>
         .genre-selection {{ margin: 20px 0; }}
         .genre-chips {{ display: flex; flex-wrap: wrap; gap: 10px; margin: 15px 0; }}
@@ -843,16 +3517,67 @@ BROWSE_PAGE = f"""
             const genreIds = selectedGenres.map(g => g.id).join(',');
             const genreNames = selectedGenres.map(g => g.name).join(', ');
             
-            fetch(`/browse_movies?language=${{language}}&genres=${{genreIds}}`)
-                .then(response => response.json())
-                .then(data => displayBrowseResults(data, selectedLanguage, genreNames))
+            const state = browseState = {{
+                query: `language=${{language}}&genres=${{genreIds}}`,
+                nextCursor: null,
+                loading: true,
+                seen: new Set(),
+                grid: null
+            }};
+            fetchBrowsePage(state.query)
+                .then(data => displayBrowseResults(data, state, selectedLanguage, genreNames))
                 .catch(error => {{
                     console.error('Error:', error);
                     document.getElementById('results').innerHTML = '<div style="text-align: center; padding: 50px; color: red;"><h3>❌ Error occurred while browsing. Please try again.</h3></div>';
                 }});
         }}
 
-        function displayBrowseResults(data, language, genres) {{
+        // Infinite scroll: pages are requested once per selection and cursor, one at a time
+        let browseState = null;
+        const browsePages = new Map();
+        const moreObserver = new IntersectionObserver(entries => {{
+            if (entries.some(entry => entry.isIntersecting)) loadMoreBrowseResults();
+        }}, {{ rootMargin: '600px' }});
+
+        function fetchBrowsePage(query) {{
+            if (!browsePages.has(query)) {{
+                const request = fetch(`/browse_movies?${{query}}`).then(response => response.json());
+                request.catch(() => browsePages.delete(query));  // let a failed page be retried
+                browsePages.set(query, request);
+            }}
+            return browsePages.get(query);
+        }}
+
+        function loadMoreBrowseResults() {{
+            const state = browseState;
+            if (!state || state.loading || !state.nextCursor) return;
+            state.loading = true;
+            fetchBrowsePage(`${{state.query}}&cursor=${{encodeURIComponent(state.nextCursor)}}`)
+                .then(data => addBrowsePage(data, state))
+                .catch(error => {{
+                    console.error('Error:', error);
+                    state.loading = false;
+                }});
+        }}
+
+        function addBrowsePage(data, state) {{
+            if (state !== browseState) return;  // the selection changed meanwhile
+            const fresh = (data.results || []).filter(movie => !state.seen.has(movie.id));
+            fresh.forEach(movie => state.seen.add(movie.id));
+            appendMovieCards(state.grid, fresh);
+            state.nextCursor = data.next_cursor || null;
+            state.loading = false;
+
+            document.getElementById('browseCount').textContent = `Showing ${{state.seen.size}} movies matching your selection`;
+            const more = document.getElementById('browseMore');
+            more.textContent = state.nextCursor ? 'Loading more movies...' : '';
+            // Re-observing fires again if the end of the grid is still on screen
+            moreObserver.unobserve(more);
+            if (state.nextCursor) moreObserver.observe(more);
+        }}
+
+        function displayBrowseResults(data, state, language, genres) {{
+            if (state !== browseState) return;
             const resultsDiv = document.getElementById('results');
             
             if (!data.results || data.results.length === 0) {{
@@ -865,98 +3590,16 @@ BROWSE_PAGE = f"""
                 return;
             }}
             
-            let html = `
+            resultsDiv.innerHTML = `
                 <div class="search-result-header">
                     <h3>🎯 ${{language}} Movies: ${{genres}}</h3>
-                    <p>Found ${{data.results.length}} movies matching your selection</p>
+                    <p id="browseCount"></p>
                 </div>
-                <div class="movie-grid">
+                <div class="movie-grid" id="browseGrid"></div>
+                <div id="browseMore" style="text-align: center; padding: 20px; color: #999;"></div>
             `;
-            
-            data.results.forEach(movie => {{
-                const posterPath = movie.poster_path ? 
-                    `https://image.tmdb.org/t/p/w300${{movie.poster_path}}` : 
-                    'https://via.placeholder.com/300x450?text=No+Image';
-                
-                const releaseYear = movie.release_date ? new Date(movie.release_date).getFullYear() : 'Unknown';
-                const rating = movie.vote_average ? movie.vote_average.toFixed(1) : 'N/A';
-                
-                html += `
-                    <div class="movie-card" onclick="showMovieDetails(${{movie.id}})">
-                        <img src="${{posterPath}}" alt="${{movie.title}}" class="movie-poster">
-                        <div class="movie-title">${{movie.title}}</div>
-                        <div class="movie-year">${{releaseYear}}</div>
-                        <div class="movie-rating">⭐ ${{rating}}/10</div>
-                    </div>
-                `;
-            }});
-            
-            html += '</div>';
-            resultsDiv.innerHTML = html;
-        }}
-
-        // Movie details and modal functions
-        function showMovieDetails(movieId) {{
-            fetch(`/movie_details/${{movieId}}`)
-                .then(response => response.json())
-                .then(movie => {{
-                    if (!movie || movie.error) {{
-                        alert('Could not load movie details');
-                        return;
-                    }}
-                    
-                    const posterPath = movie.poster_path ? 
-                        `https://image.tmdb.org/t/p/w300${{movie.poster_path}}` : 
-                        'https://via.placeholder.com/200x300?text=No+Image';
-                    
-                    const genres = movie.genres ? movie.genres.map(g => `<span class="genre-tag">${{g.name}}</span>`).join('') : '';
-                    const cast = movie.credits && movie.credits.cast ? 
-                        movie.credits.cast.slice(0, 10).map(actor => `<span class="cast-member">${{actor.name}}</span>`).join('') : 
-                        'Cast information not available';
-                    
-                    const trailer = movie.videos && movie.videos.results ? 
-                        movie.videos.results.find(v => v.type === 'Trailer' && v.site === 'YouTube') : null;
-                    
-                    const trailerHtml = trailer ? 
-                        `<p><strong>Trailer:</strong> <a href="https://www.youtube.com/watch?v=${{trailer.key}}" target="_blank">Watch on YouTube</a></p>` : 
-                        '<p><strong>Trailer:</strong> Not available</p>';
-                    
-                    const runtime = movie.runtime ? `${{movie.runtime}} minutes` : 'Unknown';
-                    const releaseDate = movie.release_date || 'Unknown';
-                    const rating = movie.vote_average ? movie.vote_average.toFixed(1) : 'N/A';
-                    
-                    document.getElementById('movieDetails').innerHTML = `
-                        <img src="${{posterPath}}" alt="${{movie.title}}" class="movie-detail-poster">
-                        <div class="movie-details">
-                            <h2>${{movie.title}}</h2>
-                            <p><strong>Overview:</strong> ${{movie.overview || 'No description available'}}</p>
-                            <p><strong>Release Date:</strong> ${{releaseDate}}</p>
-                            <p><strong>Runtime:</strong> ${{runtime}}</p>
-                            <p><strong>Rating:</strong> ⭐ ${{rating}}/10</p>
-                            <p><strong>Genres:</strong> ${{genres}}</p>
-                            ${{trailerHtml}}
-                            <p><strong>Cast:</strong></p>
-                            <div>${{cast}}</div>
-                        </div>
-                    `;
-                    
-                    document.getElementById('movieModal').style.display = 'block';
-                }})
-                .catch(error => {{
-                    console.error('Error:', error);
-                    alert('Error loading movie details');
-                }});
-        }}
-
-        function closeModal() {{
-            document.getElementById('movieModal').style.display = 'none';
-        }}
-        
-        window.onclick = function(event) {{
-            const modal = document.getElementById('movieModal');
-            if (event.target == modal) {{
-                modal.style.display = 'none';
-            }}
+            state.grid = document.getElementById('browseGrid');
+            addBrowsePage(data, state);
         }}
     </script>
 </body>
@@ -967,7 +3610,7 @@ ACTORS_PAGE = f"""
 <html>
 <head>
     <title>Movie Recommender - Find Movies by Actor</title>
-    {COMMON_STYLES}
+    {PAGE_ASSETS}
 </head>
 <body>
     <div class="container">
@@ -1051,7 +3694,7 @@ ACTORS_PAGE = f"""
             
             data.results.forEach(movie => {{
                 const posterPath = movie.poster_path ? 
-                    `https://image.tmdb.org/t/p/w300${{movie.poster_path}}` : 
+                    `/poster/w300${{movie.poster_path}}` : 
                     'https://via.placeholder.com/300x450?text=No+Image';
                 
                 const releaseYear = movie.release_date ? new Date(movie.release_date).getFullYear() : 'Unknown';
@@ -1073,70 +3716,6 @@ ACTORS_PAGE = f"""
             resultsDiv.innerHTML = html;
         }}
 
-        // Movie details and modal functions
-        function showMovieDetails(movieId) {{
-            fetch(`/movie_details/${{movieId}}`)
-                .then(response => response.json())
-                .then(movie => {{
-                    if (!movie || movie.error) {{
-                        alert('Could not load movie details');
-                        return;
-                    }}
-                    
-                    const posterPath = movie.poster_path ? 
-                        `https://image.tmdb.org/t/p/w300${{movie.poster_path}}` : 
-                        'https://via.placeholder.com/200x300?text=No+Image';
-                    
-                    const genres = movie.genres ? movie.genres.map(g => `<span class="genre-tag">${{g.name}}</span>`).join('') : '';
-                    const cast = movie.credits && movie.credits.cast ? 
-                        movie.credits.cast.slice(0, 10).map(actor => `<span class="cast-member">${{actor.name}}</span>`).join('') : 
-                        'Cast information not available';
-                    
-                    const trailer = movie.videos && movie.videos.results ? 
-                        movie.videos.results.find(v => v.type === 'Trailer' && v.site === 'YouTube') : null;
-                    
-                    const trailerHtml = trailer ? 
-                        `<p><strong>Trailer:</strong> <a href="https://www.youtube.com/watch?v=${{trailer.key}}" target="_blank">Watch on YouTube</a></p>` : 
-                        '<p><strong>Trailer:</strong> Not available</p>';
-                    
-                    const runtime = movie.runtime ? `${{movie.runtime}} minutes `: 'Unknown';
-                    const releaseDate = movie.release_date || 'Unknown';
-                    const rating = movie.vote_average ? movie.vote_average.toFixed(1) : 'N/A';
-                    
-                    document.getElementById('movieDetails').innerHTML =` 
-                        <img src="${{posterPath}}" alt="${{movie.title}}" class="movie-detail-poster">
-                        <div class="movie-details">
-                            <h2>${{movie.title}}</h2>
-                            <p><strong>Overview:</strong> ${{movie.overview || 'No description available'}}</p>
-                            <p><strong>Release Date:</strong> ${{releaseDate}}</p>
-                            <p><strong>Runtime:</strong> ${{runtime}}</p>
-                            <p><strong>Rating:</strong> ⭐ ${{rating}}/10</p>
-                            <p><strong>Genres:</strong> ${{genres}}</p>
-                            ${{trailerHtml}}
-                            <p><strong>Cast:</strong></p>
-                            <div>${{cast}}</div>
-                        </div>
-                    `;
-                    
-                    document.getElementById('movieModal').style.display = 'block';
-                }})
-                .catch(error => {{
-                    console.error('Error:', error);
-                    alert('Error loading movie details');
-                }});
-        }}
-
-        function closeModal() {{
-            document.getElementById('movieModal').style.display = 'none';
-        }}
-        
-        window.onclick = function(event) {{
-            const modal = document.getElementById('movieModal');
-            if (event.target == modal) {{
-                modal.style.display = 'none';
-            }}
-        }}
-
         // Search suggestions functionality
         let debounceTimeout;
 document.getElementById('actorName').addEventListener('input', function(e) {{
@@ -1212,38 +3791,280 @@ document.getElementById('actorName').addEventListener('input', function(e) {{
 </body>
 </html>
 """  
+
+PAGES = {'home': Page(HOME_PAGE), 'browse': Page(BROWSE_PAGE), 'actors': Page(ACTORS_PAGE)}
+
+
+# JSON responses: bodies serialized and compressed once per cached payload, with ETags and 304s
+COMPRESS_MIN_BYTES = 1024  # smaller bodies are sent as-is
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+JSON_BODY_MEMO_SIZE = 1024  # payload objects whose encoded bodies are kept
+CONTENT_ENCODING_SUFFIXES = {'br': '-br', 'gzip': '-gz'}
+
+
+class EncodedBody:
+    """One serialized payload, its content hash and lazily built compressed variants"""
+
+    __slots__ = ('body', 'etag', 'variants')
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()[:20]
+        self.variants = {}
+
+
+class JsonResponder:
+    """Turns payloads into JSON responses without redoing work for cached ones.
+
+    Cached payloads are the same object on every hit, so the encoded body is
+    memoized per object: a repeat request costs a dict lookup, a matching
+    If-None-Match gets a 304 without serializing anything, and each content
+    coding is compressed at most once per payload version. Payloads built per
+    request pass memoize=False and are encoded every time.
+    """
+
+    def __init__(self, memo_size=JSON_BODY_MEMO_SIZE, min_bytes=COMPRESS_MIN_BYTES):
+        self.memo_size = memo_size
+        self.min_bytes = min_bytes
+        self._memo = OrderedDict()  # id(payload) -> (payload, EncodedBody); holding payload pins its id
+        self._lock = threading.Lock()
+
+    def encode(self, payload, memoize=True):
+        if memoize:
+            with self._lock:
+                entry = self._memo.get(id(payload))
+                if entry is not None and entry[0] is payload:
+                    self._memo.move_to_end(id(payload))
+                    return entry[1]
+        encoded = EncodedBody(app.json.dumps(payload).encode('utf-8'))
+        if memoize:
+            with self._lock:
+                self._memo[id(payload)] = (payload, encoded)
+                while len(self._memo) > self.memo_size:
+                    self._memo.popitem(last=False)
+        return encoded
+
+    @staticmethod
+    def negotiate(accept_encoding):
+        """Best content coding the client accepts: br, then gzip, else None"""
+        accepted = {}
+        for part in (accept_encoding or '').lower().split(','):
+            coding, _, params = part.strip().partition(';')
+            quality = 1.0
+            if params.strip().startswith('q='):
+                try:
+                    quality = float(params.strip()[2:])
+                except ValueError:
+                    quality = 0.0
+            accepted[coding.strip()] = quality
+        for coding in ('br', 'gzip'):
+            if coding == 'br' and brotli is None:
+                continue
+            if accepted.get(coding, accepted.get('*', 0)) > 0:
+                return coding
+        return None
+
+    def _variant(self, encoded, coding):
+        body = encoded.variants.get(coding)
+        if body is None:
+            if coding == 'br':
+                body = brotli.compress(encoded.body, quality=BROTLI_QUALITY)
+            else:
+                body = gzip.compress(encoded.body, compresslevel=GZIP_LEVEL, mtime=0)
+            encoded.variants[coding] = body
+        return body
+
+    def prepare(self, payload, accept_encoding=None, if_none_match=None, memoize=True):
+        """(status, body, headers) for payload; status is 304 when the client's ETag still matches"""
+        encoded = self.encode(payload, memoize)
+        coding = self.negotiate(accept_encoding) if len(encoded.body) >= self.min_bytes else None
+        etag = f'"{encoded.etag}{CONTENT_ENCODING_SUFFIXES.get(coding, "")}"'
+        headers = [('ETag', etag), ('Vary', 'Accept-Encoding')]
+        if if_none_match and self._matches(if_none_match, encoded.etag):
+            return 304, b'', headers
+        body = encoded.body
+        if coding is not None:
+            body = self._variant(encoded, coding)
+            headers.append(('Content-Encoding', coding))
+        return 200, body, headers + [('Content-Type', 'application/json')]
+
+    @staticmethod
+    def _matches(if_none_match, etag):
+        # Any coding's variant of the same payload version counts as a match
+        if if_none_match.strip() == '*':
+            return True
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag.startswith('W/'):
+                tag = tag[2:]
+            tag = tag.strip('"')
+            for suffix in CONTENT_ENCODING_SUFFIXES.values():
+                if tag.endswith(suffix):
+                    tag = tag[:-len(suffix)]
+            if tag == etag:
+                return True
+        return False
+
+    def response(self, payload, memoize=True):
+        """Flask response for payload, negotiated against the current request"""
+        status, body, headers = self.prepare(payload, request.headers.get('Accept-Encoding'),
+                                             request.headers.get('If-None-Match'), memoize)
+        return Response(body, status=status, headers=headers)
+
+
+json_responder = JsonResponder()
+
+
 # Flask Routes
+@app.before_request
+def _begin_request_trace():
+    # Unmatched paths share one label so scanners cannot blow up metric cardinality
+    g.request_trace = RequestTrace.begin(request.url_rule.rule if request.url_rule else '<unmatched>',
+                                         request.method)
+
+@app.after_request
+def _finish_request_trace(response):
+    trace, token = g.pop('request_trace', (None, None))
+    if trace is not None and response.is_streamed:
+        # The body is produced after this hook returns; record the request once it is sent
+        trace.detach(token)
+        status = response.status_code
+        response.call_on_close(lambda: trace.finish(None, status))
+    elif trace is not None:
+        trace.finish(token, response.status_code)
+    return response
+
+def _streamed_response(chunks, mimetype):
+    """Streamed response whose generator runs in the request's context, so its TMDb calls reach the trace"""
+    context = contextvars.copy_context()
+
+    def run():
+        while True:
+            try:
+                chunk = context.run(next, chunks)
+            except StopIteration:
+                return
+            yield chunk
+
+    return Response(stream_with_context(run()), mimetype=mimetype)
+
+def _rate_limited_response(e, payload):
+    """503 with Retry-After when TMDb budget is exhausted and nothing stale could be served"""
+    if isinstance(payload, dict):
+        payload = dict(payload, error='Too many requests right now, please try again shortly')
+    response = jsonify(payload)
+    response.status_code = 503
+    response.headers['Retry-After'] = _retry_after_seconds(e)
+    return response
+
+def _retry_after_seconds(e):
+    """Retry-After header value for a RateLimitExceeded: whole seconds, at least one"""
+    return str(max(1, int(e.retry_after + 0.999)))
+
 @app.route('/')
 def home():
     """Home page - Search similar movies by name"""
-    return render_template_string(HOME_PAGE)
+    return PAGES['home'].response()
 
 @app.route('/browse')
 def browse():
     """Browse page - Search by language and genre"""
-    return render_template_string(BROWSE_PAGE)
+    return PAGES['browse'].response()
 
 @app.route('/get_genres')
 def get_genres():
     """Get list of all genres for dropdown"""
     try:
-        print("get_genres route called")  # Debug
-        genres = recommender.get_genres()
-        print(f"Genres returned from recommender: {genres}")  # Debug
-        print(f"Number of genres: {len(genres) if genres else 0}")  # Debug
-        return jsonify(genres or [])
+        genres, etag = recommender.genres.versioned()
+        if not genres:
+            return jsonify([])
+        response = jsonify(genres)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = (
+            f"public, max-age={GENRES_BROWSER_MAX_AGE}, s-maxage={GENRES_CDN_MAX_AGE}")
+        return response.make_conditional(request)
     except Exception as e:
-        print(f"Exception in get_genres route: {e}")
+        log.exception("Exception in get_genres route")
         return jsonify([])
+def _ndjson_line(payload):
+    return json.dumps(payload) + '\n'
+
+def _similar_stream(movie_name, language, mode):
+    """NDJSON events for a streamed /search_similar: result batches as they are confirmed, then a
+    summary carrying the page's next_cursor"""
+    total = 0
+    error = None
+    answer = None
+    try:
+        search_results = recommender.search_movie_by_name(movie_name, language)
+        if search_results and search_results['results']:
+            first_movie_id = search_results['results'][0]['id']
+            batches = None
+            if mode == 'content':
+                answer = recommender.get_similar_by_content(first_movie_id, language)
+                if answer and answer['results']:
+                    batches = iter([('content', answer['results'])])
+            if batches is None:
+                batches = recommender.iter_similar_by_genre(first_movie_id, language)
+            while True:
+                try:
+                    match, movies = next(batches)
+                except StopIteration as finished:
+                    answer = finished.value or answer  # the genre search returns its assembled page
+                    break
+                posters.prefetch(movies)
+                total += len(movies)
+                yield _ndjson_line({'event': 'results', 'match': match, 'results': movies})
+            if not total:
+                error = 'No similar movies found'
+        else:
+            error = 'Movie not found'
+    except RateLimitExceeded:
+        error = 'Too many requests right now, please try again shortly'
+    except Exception as e:
+        log.exception("Error in streamed search_similar")
+        error = str(e)
+    summary = {'event': 'done', 'total_results': total}
+    if total and answer:
+        summary.update(page=answer.get('page') or 1, total_pages=answer.get('total_pages') or 1,
+                       next_cursor=answer.get('next_cursor'))
+    if error:
+        summary['error'] = error
+    yield _ndjson_line(summary)
+
+def _requested_page(args):
+    """Page asked for by ?cursor= (a previous next_cursor) or ?page=; ValueError if malformed"""
+    if args.get('cursor'):
+        return decode_cursor(args['cursor'])
+    page = int(args.get('page', 1))
+    if page < 1:
+        raise ValueError(f"Invalid page: {page}")
+    return page
+
 @app.route('/search_similar')
 def search_similar():
-    """Search for movies similar to the given movie name"""
+    """Search for movies similar to the given movie name; ?stream=1 sends NDJSON events as results are found"""
     movie_name = request.args.get('movie_name', '')
     language = request.args.get('language', 'en')
+    mode = request.args.get('mode', 'genre')
     
     try:
         if not movie_name:
             return jsonify({'results': [], 'error': 'Movie name is required'})
+        try:
+            page = _requested_page(request.args)
+        except ValueError:
+            return jsonify({'results': [], 'error': 'Invalid page or cursor'})
+        if page > SIMILAR_MAX_PAGES:
+            return jsonify({'results': [], 'error': f'At most {SIMILAR_MAX_PAGES} pages of similar movies'})
+
+        # Streaming covers the first page; later pages are plain JSON
+        streamed = request.args.get('stream') == '1' or 'application/x-ndjson' in request.headers.get('Accept', '')
+        if streamed and page == 1:
+            response = _streamed_response(_similar_stream(movie_name, language, mode), 'application/x-ndjson')
+            response.headers['X-Accel-Buffering'] = 'no'  # let proxies pass each line through
+            return response
         
         # First, search for the movie
         search_results = recommender.search_movie_by_name(movie_name, language)
@@ -1252,22 +4073,69 @@ def search_similar():
             first_movie_id = search_results['results'][0]['id']
             
             # Get similar movies (don't filter by language for similar movies)
-            similar_movies = recommender.get_similar_by_genre(first_movie_id, language)
+            similar_movies = None
+            if mode == 'content':
+                similar_movies = recommender.get_similar_by_content(first_movie_id, language, page)
+            # Content results past their last page do not continue into the genre list
+            if not similar_movies and (mode != 'content' or page == 1):
+                similar_movies = recommender.get_similar_by_genre(first_movie_id, language, page)
             
             if similar_movies and similar_movies['results']:
-                return jsonify(similar_movies)
+                posters.prefetch(similar_movies['results'])
+                return json_responder.response(similar_movies)
             else:
                 return jsonify({'results': [], 'error': 'No similar movies found'})
         else:
             return jsonify({'results': [], 'error': 'Movie not found'})
             
+    except RateLimitExceeded as e:
+        return _rate_limited_response(e, {'results': []})
     except Exception as e:
-        print(f"Error in search_similar: {e}")
+        log.exception("Error in search_similar")
         return jsonify({'results': [], 'error': str(e)})
 @app.route('/actors')
 def actors_page():
     """Actor search page"""
-    return render_template_string(ACTORS_PAGE)
+    return PAGES['actors'].response()
+
+def _best_person_match(people, actor_name):
+    """Find the most popular/relevant person among search results"""
+    best_match = None
+    for person in people:
+        # Skip if person doesn't have profile path (likely not famous)
+        if not person.get('profile_path'):
+            continue
+            
+        # Prefer exact name matches
+        if person['name'].lower() == actor_name.lower():
+            best_match = person
+            break
+            
+        # Otherwise pick the most popular one
+        if not best_match or person.get('popularity', 0) > best_match.get('popularity', 0):
+            best_match = person
+    
+    # Fallback to first result if no good match found
+    return best_match or people[0]
+
+def _actor_movies_response(best_match, movie_credits):
+    """Well-rated movies with posters from an actor's credits, most popular first"""
+    # Filter out movies with very low ratings or no ratings
+    valid_movies = [
+        movie for movie in movie_credits['cast'] 
+        if movie.get('vote_average', 0) > 3.0 and movie.get('poster_path')
+    ]
+    
+    # Sort by popularity and vote average
+    movies = sorted(valid_movies, 
+                  key=lambda x: (x.get('popularity', 0) * x.get('vote_average', 0)), 
+                  reverse=True)
+    
+    return {
+        'results': movies[:20],  # Limit to top 20
+        'actor_name': best_match['name'],
+        'actor_id': best_match['id']
+    }
 
 @app.route('/search_actor')
 def search_actor():
@@ -1282,53 +4150,22 @@ def search_actor():
         person_results = recommender.search_person(actor_name)
         
         if person_results and person_results['results']:
-            # Find the most popular/relevant person
-            best_match = None
-            for person in person_results['results']:
-                # Skip if person doesn't have profile path (likely not famous)
-                if not person.get('profile_path'):
-                    continue
-                    
-                # Prefer exact name matches
-                if person['name'].lower() == actor_name.lower():
-                    best_match = person
-                    break
-                    
-                # Otherwise pick the most popular one
-                if not best_match or person.get('popularity', 0) > best_match.get('popularity', 0):
-                    best_match = person
-            
-            # Fallback to first result if no good match found
-            if not best_match:
-                best_match = person_results['results'][0]
-            
-            person_id = best_match['id']
+            best_match = _best_person_match(person_results['results'], actor_name)
             
             # Get movies for this actor
-            movie_credits = recommender.get_movies_by_actor(person_id)
+            movie_credits = recommender.get_movies_by_actor(best_match['id'])
             
             if movie_credits and movie_credits['cast']:
-                # Filter out movies with very low ratings or no ratings
-                valid_movies = [
-                    movie for movie in movie_credits['cast'] 
-                    if movie.get('vote_average', 0) > 3.0 and movie.get('poster_path')
-                ]
-                
-                # Sort by popularity and vote average
-                movies = sorted(valid_movies, 
-                              key=lambda x: (x.get('popularity', 0) * x.get('vote_average', 0)), 
-                              reverse=True)
-                
-                return jsonify({
-                    'results': movies[:20],  # Limit to top 20
-                    'actor_name': best_match['name'],
-                    'actor_id': person_id
-                })
+                results = _actor_movies_response(best_match, movie_credits)
+                posters.prefetch(results['results'])
+                return json_responder.response(results, memoize=False)
         
         return jsonify({'results': [], 'error': 'Actor not found'})
         
+    except RateLimitExceeded as e:
+        return _rate_limited_response(e, {'results': []})
     except Exception as e:
-        print(f"Error in search_actor: {e}")
+        log.exception("Error in search_actor")
         return jsonify({'results': [], 'error': str(e)})
 
 @app.route('/browse_movies')
@@ -1340,23 +4177,91 @@ def browse_movies():
     try:
         if not language or not genres:
             return jsonify({'results': [], 'error': 'Both language and genres are required'})
+        try:
+            page = _requested_page(request.args)
+        except ValueError:
+            return jsonify({'results': [], 'error': 'Invalid page or cursor'})
         
-        results = recommender.discover_movies_by_genre_flexible(genres, language)
-        return jsonify(results or {'results': []})
+        # Serve from the offline snapshot; TMDb only when it has nothing
+        results = catalog.discover(genres, language, page) if catalog is not None else None
+        if results is not None:
+            posters.prefetch(results['results'])
+            return json_responder.response(with_next_cursor(results), memoize=False)
+        if page > MAX_DISCOVER_PAGE:
+            return jsonify({'results': []})
+        results = recommender.discover_movies_by_genre_flexible(genres, language, page)
+        if not results:
+            return jsonify({'results': []})
+        posters.prefetch(results['results'])
+        # The next page is usually asked for next, so have it cached by then
+        if results.get('next_cursor'):
+            recommender.prefetch_discover_page(genres, language, page + 1)
+        return json_responder.response(results)
         
+    except RateLimitExceeded as e:
+        return _rate_limited_response(e, {'results': []})
     except Exception as e:
-        print(f"Error in browse_movies: {e}")
+        log.exception("Error in browse_movies")
         return jsonify({'results': [], 'error': str(e)})
 @app.route('/movie_details/<int:movie_id>')
 def movie_details(movie_id):
     """Get detailed information about a specific movie"""
     try:
-        details = recommender.get_movie_details(movie_id)
-        return jsonify(details or {'error': 'Movie not found'})
+        details = recommender.cached_movie_details(movie_id)
+        return json_responder.response(details) if details else jsonify({'error': 'Movie not found'})
+    except RateLimitExceeded as e:
+        return _rate_limited_response(e, {})
     except Exception as e:
-        print(f"Error getting movie details: {e}")
+        log.exception("Error getting movie details")
         return jsonify({'error': str(e)})
 
+MAX_BATCH_IDS = 50
+
+def _batch_movie_ids():
+    """Movie ids from ?ids=1,2,3 or a JSON body {"ids": [...]}, deduplicated in order"""
+    if request.method == 'POST':
+        body = request.get_json(silent=True)
+        if body is None:
+            return []
+        if not isinstance(body, dict) or not isinstance(body.get('ids', []), list):
+            raise TypeError("expected a JSON object whose ids are a list")
+        raw = body.get('ids', [])
+    else:
+        raw = [part for part in request.args.get('ids', '').split(',') if part.strip()]
+    return list(dict.fromkeys(int(movie_id) for movie_id in raw))
+
+@app.route('/movie_details/batch', methods=['GET', 'POST'])
+def movie_details_batch():
+    """Details for many movies in one round trip; ?stream=1 sends NDJSON lines in completion order"""
+    try:
+        movie_ids = _batch_movie_ids()
+    except (TypeError, ValueError):
+        return jsonify({'results': [], 'error': 'ids must be movie ids'})
+    if not movie_ids:
+        return jsonify({'results': [], 'error': 'ids are required'})
+    if len(movie_ids) > MAX_BATCH_IDS:
+        return jsonify({'results': [], 'error': f'At most {MAX_BATCH_IDS} ids per batch'})
+
+    if request.args.get('stream') == '1' or 'application/x-ndjson' in request.headers.get('Accept', ''):
+        def lines():
+            for movie_id, details in recommender.iter_movie_details(movie_ids):
+                line = {'id': movie_id, 'details': details} if details else {
+                    'id': movie_id, 'error': 'Movie not found'}
+                yield _ndjson_line(line)
+        return _streamed_response(lines(), 'application/x-ndjson')
+
+    found = dict(recommender.iter_movie_details(movie_ids))
+    return json_responder.response({
+        'results': [found[movie_id] for movie_id in movie_ids if found.get(movie_id)],
+        'missing': [movie_id for movie_id in movie_ids if not found.get(movie_id)],
+    }, memoize=False)
+
+
+def _format_suggestions(movies, actors):
+    """Suggestion dicts from autocomplete entries, movies first"""
+    suggestions = [{'title': title, 'type': 'movie', 'year': year} for _, _, title, year in movies]
+    suggestions += [{'title': name, 'type': 'actor'} for _, _, name, _ in actors]
+    return suggestions
 
 @app.route('/search_suggestions')
 def search_suggestions():
@@ -1367,35 +4272,349 @@ def search_suggestions():
         return jsonify([])
     
     try:
-        suggestions = []
-        
-        # Search movies
-        movie_results = recommender.search_movie_by_name(query)
-        if movie_results and movie_results['results']:
-            filtered_movies = [movie for movie in movie_results['results'] if movie['title'].lower().startswith(query.lower())]
-            for movie in filtered_movies[:5]:
-
-                suggestions.append({
-                    'title': movie['title'],
-                    'type': 'movie',
-                    'year': movie.get('release_date', '')[:4] if movie.get('release_date') else ''
-                })
+        # Search movies locally; ask TMDb only for long-tail prefixes and remember what it returns
+        movies = autocomplete.search(query, 'movie')
+        if len(movies) < SUGGESTIONS_PER_KIND:
+            movie_results = recommender.search_movie_by_name(query)
+            if movie_results and movie_results['results']:
+                autocomplete.add_movies(movie_results['results'])
+                movies = autocomplete.search(query, 'movie')
         
-        # Search actors
-        actor_results = recommender.search_person(query)
-        if actor_results and actor_results['results']:
-            filtered_actors = [actor for actor in actor_results['results'] if actor['name'].lower().startswith(query.lower())]
-            for actor in actor_results['results'][:5]:  # Top 5 actors
-                suggestions.append({
-                    'title': actor['name'],
-                    'type': 'actor'
-                })
+        # Search actors the same way
+        actors = autocomplete.search(query, 'actor')
+        if len(actors) < SUGGESTIONS_PER_KIND:
+            actor_results = recommender.search_person(query)
+            if actor_results and actor_results['results']:
+                autocomplete.add_people(actor_results['results'])
+                actors = autocomplete.search(query, 'actor')
         
+        suggestions = _format_suggestions(movies, actors)
         return jsonify(suggestions[:10])  # Limit to 10 total suggestions
         
+    except RateLimitExceeded as e:
+        return _rate_limited_response(e, [])
     except Exception as e:
         return jsonify([])
 
+@app.route('/static/<path:filename>')
+def static_file(filename):
+    """Shared CSS/JS; fingerprinted names are cached for a year"""
+    response = static_assets.response(filename)
+    if response is None:
+        abort(404)
+    return response
+
+@app.route('/poster/<size>/<path:poster_path>')
+def poster(size, poster_path):
+    """A TMDb poster from the local cache; Range and conditional requests are answered from disk"""
+    if size not in POSTER_SIZES or not POSTER_PATH_PATTERN.fullmatch(poster_path):
+        abort(404)
+    found = posters.get(size, poster_path)
+    if found is None:
+        abort(404)
+    path, content_type, digest = found
+    # The digest names the bytes, so the ETag never changes and the URL can be cached for good
+    response = send_file(path, mimetype=content_type, conditional=True, etag=digest, max_age=POSTER_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/ready')
+def ready():
+    """Readiness probe: 503 until enough of the startup cache warm-up has finished"""
+    progress = warmer.progress()
+    response = jsonify(progress)
+    if not progress['ready']:
+        response.status_code = 503
+    return response
+
+CACHE_COUNTERS = {
+    'evictions': 'Entries evicted to stay within the byte budget',
+    'expirations': 'Lookups that found only an expired entry',
+    'coalesced': 'Misses that waited on another caller\'s in-flight load',
+    'disk_hits': 'Memory misses answered by the disk tier',
+    'stale_hits': 'Expired entries served because TMDb was rate limited',
+    'stale_served': 'Expired entries served while refreshing in the background',
+}
+
+def _cache_metric_lines():
+    stats = recommender.cache.stats()
+    prefix = f"{METRICS_PREFIX}_cache"
+    lines = metric_lines(f"{prefix}_requests_total", 'counter', 'Cache lookups by result',
+                         [({'result': 'hit'}, stats['hits']), ({'result': 'miss'}, stats['misses'])])
+    for name, help_text in CACHE_COUNTERS.items():
+        lines += metric_lines(f"{prefix}_{name}_total", 'counter', help_text, [({}, stats[name])])
+    lines += metric_lines(f"{prefix}_entries", 'gauge', 'Entries held in memory', [({}, stats['entries'])])
+    lines += metric_lines(f"{prefix}_bytes", 'gauge', 'Approximate bytes held in memory', [({}, stats['bytes'])])
+    if 'refresh_queue_depth' in stats:
+        lines += metric_lines(f"{prefix}_refresh_queue_depth", 'gauge', 'Background refreshes waiting to run',
+                              [({}, stats['refresh_queue_depth'])])
+    return lines
+
+def _rate_limit_metric_lines():
+    stats = recommender.client.rate_limiter.stats()
+    return metric_lines(f"{METRICS_PREFIX}_rate_limit_tokens_total", 'counter',
+                        'Rate limiter decisions: granted, queued (waited) or rejected; backoffs after a 429',
+                        [({'result': name}, count) for name, count in sorted(stats.items())])
+
+def _recommender_metric_lines():
+    with recommender._counters_lock:
+        counters = dict(recommender.counters)
+    return metric_lines(f"{METRICS_PREFIX}_detail_calls_avoided_total", 'counter',
+                        'Detail fetches skipped because discover already had genre_ids',
+                        [({}, counters.get('detail_calls_avoided', 0))])
+
+def _poster_metric_lines():
+    stats = posters.stats()
+    prefix = f"{METRICS_PREFIX}_poster_cache"
+    lines = metric_lines(f"{prefix}_requests_total", 'counter', 'Poster lookups by result',
+                         [({'result': 'hit'}, stats['hits']), ({'result': 'miss'}, stats['misses'])])
+    lines += metric_lines(f"{prefix}_fetch_errors_total", 'counter', 'Posters TMDb could not supply',
+                          [({}, stats['fetch_errors'])])
+    lines += metric_lines(f"{prefix}_evictions_total", 'counter', 'Posters evicted to stay within the byte budget',
+                          [({}, stats['evictions'])])
+    lines += metric_lines(f"{prefix}_bytes", 'gauge', 'Poster bytes held on disk', [({}, stats['bytes'])])
+    return lines
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text exposition of route, TMDb, cache and rate limiter metrics"""
+    body = metrics.render((_cache_metric_lines, _rate_limit_metric_lines, _recommender_metric_lines,
+                           _poster_metric_lines))
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+
+# Async execution mode: an ASGI app (e.g. `uvicorn app:asgi_app`) that serves the
+# TMDb-heavy JSON routes from coroutines on one event loop and hands every other
+# route to the Flask app. The sync Flask app above is unchanged.
+async_recommender = None
+flask_asgi = WsgiToAsgi(app) if WsgiToAsgi is not None else None
+
+
+async def search_similar_async(args):
+    movie_name = args.get('movie_name', '')
+    language = args.get('language', 'en')
+    mode = args.get('mode', 'genre')
+    if not movie_name:
+        return {'results': [], 'error': 'Movie name is required'}
+
+    search_results = await async_recommender.search_movie_by_name(movie_name, language)
+    if not search_results or not search_results['results']:
+        return {'results': [], 'error': 'Movie not found'}
+
+    first_movie_id = search_results['results'][0]['id']
+    similar_movies = None
+    if mode == 'content':
+        similar_movies = await async_recommender.get_similar_by_content(first_movie_id, language)
+    if not similar_movies:
+        similar_movies = await async_recommender.get_similar_by_genre(first_movie_id, language)
+    if similar_movies and similar_movies['results']:
+        return similar_movies
+    return {'results': [], 'error': 'No similar movies found'}
+
+
+async def search_actor_async(args):
+    actor_name = args.get('actor_name', '')
+    if not actor_name:
+        return {'results': [], 'error': 'Actor name is required'}
+
+    person_results = await async_recommender.search_person(actor_name)
+    if person_results and person_results['results']:
+        best_match = _best_person_match(person_results['results'], actor_name)
+        movie_credits = await async_recommender.get_movies_by_actor(best_match['id'])
+        if movie_credits and movie_credits['cast']:
+            return _actor_movies_response(best_match, movie_credits)
+    return {'results': [], 'error': 'Actor not found'}
+
+
+async def browse_movies_async(args):
+    language = args.get('language', '')
+    genres = args.get('genres', '')
+    if not language or not genres:
+        return {'results': [], 'error': 'Both language and genres are required'}
+    try:
+        page = _requested_page(args)
+    except ValueError:
+        return {'results': [], 'error': 'Invalid page or cursor'}
+
+    results = catalog.discover(genres, language, page) if catalog is not None else None
+    if results is not None:
+        return with_next_cursor(results)
+    if page > MAX_DISCOVER_PAGE:
+        return {'results': []}
+    results = await async_recommender.discover_movies_by_genre_flexible(genres, language, page)
+    if results and results.get('next_cursor'):
+        async_recommender.prefetch_discover_page(genres, language, page + 1)
+    return results or {'results': []}
+
+
+async def search_suggestions_async(args):
+    query = args.get('query', '')
+    if len(query) < 2:
+        return []
+
+    # Local prefix index first; missing movie and person lookups run concurrently
+    movies = autocomplete.search(query, 'movie')
+    actors = autocomplete.search(query, 'actor')
+    movie_results, actor_results = await asyncio.gather(
+        async_recommender.search_movie_by_name(query) if len(movies) < SUGGESTIONS_PER_KIND else asyncio.sleep(0),
+        async_recommender.search_person(query) if len(actors) < SUGGESTIONS_PER_KIND else asyncio.sleep(0)
+    )
+    if movie_results and movie_results['results']:
+        autocomplete.add_movies(movie_results['results'])
+        movies = autocomplete.search(query, 'movie')
+    if actor_results and actor_results['results']:
+        autocomplete.add_people(actor_results['results'])
+        actors = autocomplete.search(query, 'actor')
+    return _format_suggestions(movies, actors)[:10]
+
+
+ASYNC_ROUTES = {
+    '/search_similar': search_similar_async,
+    '/search_actor': search_actor_async,
+    '/browse_movies': browse_movies_async,
+    '/search_suggestions': search_suggestions_async,
+}
+
+
+def _wants_later_page(scope):
+    args = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+    return 'cursor' in args or args.get('page', '1') != '1'
+
+
+def _wants_stream(scope):
+    if ('stream', '1') in parse_qsl(scope.get('query_string', b'').decode('latin-1')):
+        return True
+    return any(name == b'accept' and b'application/x-ndjson' in value for name, value in scope.get('headers', []))
+
+
+async def _send_json(send, payload, status=200, scope=None, memoize=False, extra_headers=()):
+    if status == 200 and scope is not None:
+        request_headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']}
+        status, body, headers = json_responder.prepare(
+            payload, request_headers.get('accept-encoding'), request_headers.get('if-none-match'), memoize)
+        headers = [(name.lower().encode(), value.encode()) for name, value in headers]
+    else:
+        body = json.dumps(payload).encode('utf-8')
+        headers = [(b'content-type', b'application/json')]
+    headers += [(name.lower().encode(), value.encode()) for name, value in extra_headers]
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': headers + [(b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def asgi_app(scope, receive, send):
+    """ASGI entry point for the async execution mode"""
+    global async_recommender
+
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                async_recommender = AsyncMovieRecommender(
+                    API_KEY, cache=recommender.cache, catalog=catalog, content_index=content_index,
+                    genres=recommender.genres)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if async_recommender is not None:
+                    await async_recommender.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    handler = ASYNC_ROUTES.get(scope.get('path')) if scope['type'] == 'http' else None
+    if handler is search_similar_async and (_wants_stream(scope) or _wants_later_page(scope)):
+        # The Flask app streams and pages these; WsgiToAsgi forwards each line as a body chunk
+        handler = None
+    if handler is None:
+        await flask_asgi(scope, receive, send)
+        return
+
+    if async_recommender is None:  # server without lifespan support
+        async_recommender = AsyncMovieRecommender(
+            API_KEY, cache=recommender.cache, catalog=catalog, content_index=content_index,
+            genres=recommender.genres)
+    args = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+    trace, token = RequestTrace.begin(scope['path'], scope.get('method', 'GET'))
+    status = 200
+    extra_headers = []
+    try:
+        payload = await handler(args)
+    except RateLimitExceeded as e:
+        status = 503
+        extra_headers.append(('Retry-After', _retry_after_seconds(e)))
+        payload = [] if handler is search_suggestions_async else {
+            'results': [], 'error': 'Too many requests right now, please try again shortly'}
+    except Exception as e:
+        log.exception("Error in async %s", scope['path'])
+        payload = [] if handler is search_suggestions_async else {'results': [], 'error': str(e)}
+    if status == 200 and isinstance(payload, dict) and payload.get('results'):
+        posters.prefetch(payload['results'])
+    try:
+        # Only similar-movie lists come straight from the cache; other payloads are built per request
+        memoize = handler is search_similar_async and isinstance(payload, dict) and 'error' not in payload
+        await _send_json(send, payload, status=status, scope=scope, memoize=memoize, extra_headers=extra_headers)
+    finally:
+        trace.finish(token, status)
+
+
+@app.cli.command('build-catalog')
+@click.option('--pages', default=CATALOG_PAGES_PER_LANGUAGE, show_default=True, help='Discover pages per language')
+@click.option('--output', default=CATALOG_PATH, show_default=True, help='Snapshot file to write')
+def build_catalog(pages, output):
+    """Bulk-ingest popular movies into the offline catalog snapshot"""
+    snapshot = MovieCatalog.ingest(recommender, pages=pages)
+    snapshot.save(output)
+    click.echo(f"Wrote {len(snapshot)} movies to {output}")
+
+
+def _fetch_details_for_index(movie_ids):
+    """Fetch details for many movies on the recommender's worker pool"""
+    details = []
+    for done, movie_detail in enumerate(recommender.executor.map(recommender.cached_movie_details, movie_ids), 1):
+        if movie_detail:
+            details.append(movie_detail)
+        if done % 100 == 0:
+            log.info("Fetched details for %d/%d movies", done, len(movie_ids))
+    return details
+
+
+@app.cli.command('build-content-index')
+@click.option('--output', default=CONTENT_INDEX_DIR, show_default=True, help='Index directory to write')
+def build_content_index(output):
+    """Build the content embedding index for every movie in the catalog snapshot"""
+    if catalog is None:
+        raise click.ClickException(f"No catalog snapshot at {CATALOG_PATH}; run build-catalog first")
+    index = ContentIndex(output)
+    index.add(_fetch_details_for_index([int(mid) for mid in catalog.ids]))
+    index.save()
+    click.echo(f"Indexed {len(index)} movies into {output}")
+
+
+@app.cli.command('update-content-index')
+@click.argument('movie_ids', nargs=-1, type=int, required=True)
+def update_content_index(movie_ids):
+    """Add or refresh specific movies in the existing content index"""
+    index = ContentIndex.load_if_exists(CONTENT_INDEX_DIR) or ContentIndex(CONTENT_INDEX_DIR)
+    details = _fetch_details_for_index(list(movie_ids))
+    added = index.add(details)
+    index.save()
+    click.echo(f"Added {added} and refreshed {len(details) - added} movies; index now holds {len(index)}")
+
+
+@app.cli.command('warm-cache')
+@click.option('--movies', default=WARMUP_TOP_MOVIES, show_default=True, help='Popular movies to warm')
+@click.option('--people', default=WARMUP_TOP_PEOPLE, show_default=True, help='Popular people to warm')
+@click.option('--workers', default=WARMUP_WORKERS, show_default=True, help='Concurrent warm-up tasks')
+def warm_cache(movies, people, workers):
+    """Pre-populate the cache (use DISK_CACHE_PATH so servers on this host share it)"""
+    job = CacheWarmer(recommender, top_movies=movies, top_people=people, workers=workers)
+    progress = job.run()
+    click.echo(f"Warmed {progress['completed'] - progress['failed']} of {progress['planned']} entries "
+               f"in {progress['elapsed']}s")
+
 
 if __name__ == '__main__':
     print("🎬 Starting Multi-Page Movie Recommender...")
@@ -0,0 +1,302 @@
+"""Load benchmark for the JSON routes, against the fake TMDb server.
+
+Drives /search_similar, /search_actor, /browse_movies and /search_suggestions
+with a weighted mix of Zipf-distributed (popular-first) queries and reports
+throughput, p50/p95/p99 latency and upstream TMDb calls per request:
+
+    python bench/benchmark.py --spawn --duration 30 --concurrency 16 --output bench/results/head.json
+    python bench/benchmark.py --spawn --baseline bench/results/head.json  # exits 1 on a regression
+
+--spawn starts bench/fake_tmdb.py in-process and the app as a subprocess
+(`flask run`, or uvicorn with --server asgi). Without it, point --app-url and
+--tmdb-url at servers you started yourself; the app must use the fake via
+TMDB_BASE_URL (and TMDB_IMAGE_BASE_URL, or poster prefetch reaches the real
+image CDN). A spawned app gets both, and a throwaway POSTER_CACHE_DIR.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import fake_tmdb
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MIXES = {
+    'default': {'search_similar': 45, 'search_actor': 15, 'browse_movies': 20, 'search_suggestions': 20},
+    'typeahead': {'search_similar': 15, 'search_actor': 5, 'browse_movies': 10, 'search_suggestions': 70},
+    'browse': {'search_similar': 20, 'search_actor': 10, 'browse_movies': 60, 'search_suggestions': 10},
+}
+LANGUAGE_WEIGHTS = {'en': 60, 'hi': 15, 'es': 5, 'fr': 5, 'ja': 5, 'ko': 5, 'ta': 5}
+ZIPF_EXPONENT = 1.1
+READY_TIMEOUT = 120  # seconds to wait for a spawned app
+
+
+class Workload:
+    """Query pools built from the fake API's popular lists, sampled popular-first"""
+
+    def __init__(self, tmdb_url, pool_size=400, seed=7):
+        session = requests.Session()
+        movies, people = [], []
+        page = 1
+        while len(movies) < pool_size:
+            results = session.get(f"{tmdb_url}/3/movie/popular", params={'page': page}).json()['results']
+            if not results:
+                break
+            movies += results
+            page += 1
+        page = 1
+        while len(people) < pool_size // 2:
+            results = session.get(f"{tmdb_url}/3/person/popular", params={'page': page}).json()['results']
+            if not results:
+                break
+            people += results
+            page += 1
+        genres = session.get(f"{tmdb_url}/3/genre/movie/list").json()['genres']
+        self.titles = [movie['title'] for movie in movies]
+        self.names = [person['name'] for person in people]
+        self.genre_ids = [genre['id'] for genre in genres]
+        self.languages = list(LANGUAGE_WEIGHTS)
+        self.language_weights = list(LANGUAGE_WEIGHTS.values())
+        self.seed = seed
+
+    @staticmethod
+    def zipf_pick(rng, items):
+        # Inverse-CDF of a truncated power law: rank 1 is the most likely
+        rank = int(len(items) ** rng.random() ** ZIPF_EXPONENT) - 1
+        return items[min(max(rank, 0), len(items) - 1)]
+
+    def request(self, rng, route):
+        """(path, params) for one request of the given route"""
+        if route == 'search_similar':
+            language = rng.choices(self.languages, self.language_weights)[0]
+            return '/search_similar', {'movie_name': self.zipf_pick(rng, self.titles), 'language': language}
+        if route == 'search_actor':
+            return '/search_actor', {'actor_name': self.zipf_pick(rng, self.names)}
+        if route == 'browse_movies':
+            genres = sorted(rng.sample(self.genre_ids, rng.choice((1, 1, 2, 2, 3))))
+            language = rng.choices(self.languages, self.language_weights)[0]
+            return '/browse_movies', {'language': language, 'genres': ','.join(map(str, genres))}
+        source = self.titles if rng.random() < 0.7 else self.names
+        text = self.zipf_pick(rng, source)
+        return '/search_suggestions', {'query': text[:rng.randint(2, min(6, len(text)))]}
+
+
+def percentile(sorted_values, share):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(share * len(sorted_values)) - 1))]
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(latency for latency, _ in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+    }
+
+
+def run_load(app_url, workload, mix, concurrency, duration=None, total_requests=None, seed=7):
+    """Per-route [(latency, ok)] samples and the wall-clock time the run took"""
+    routes, weights = list(mix), list(mix.values())
+    samples = {route: [] for route in routes}
+    lock = threading.Lock()
+    issued = [0]
+    deadline = time.perf_counter() + duration if duration else None
+
+    def next_slot():
+        with lock:
+            if total_requests is not None and issued[0] >= total_requests:
+                return False
+            issued[0] += 1
+        return deadline is None or time.perf_counter() < deadline
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        session = requests.Session()
+        local = {route: [] for route in routes}
+        while next_slot():
+            route = rng.choices(routes, weights)[0]
+            path, params = workload.request(rng, route)
+            start = time.perf_counter()
+            try:
+                response = session.get(f"{app_url}{path}", params=params, timeout=30)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            local[route].append((time.perf_counter() - start, ok))
+        with lock:
+            for route, values in local.items():
+                samples[route] += values
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    return samples, time.perf_counter() - started
+
+
+def upstream_calls(tmdb_url):
+    return requests.get(f"{tmdb_url}/__stats").json()
+
+
+def git_version():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def spawn_app(server, port, tmdb_url, poster_dir, extra_env=None):
+    env = dict(os.environ, TMDB_BASE_URL=f"{tmdb_url}/3", TMDB_IMAGE_BASE_URL=f"{tmdb_url}/t/p",
+               POSTER_CACHE_DIR=poster_dir, LOG_REQUESTS='0', **(extra_env or {}))
+    if server == 'asgi':
+        command = [sys.executable, '-m', 'uvicorn', 'app:asgi_app', '--port', str(port), '--log-level', 'warning']
+    else:
+        command = [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--port', str(port),
+                   '--with-threads', '--no-reload', '--no-debugger']
+    process = subprocess.Popen(command, cwd=REPO_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    app_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + READY_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"App exited with status {process.returncode} before becoming ready")
+        try:
+            if requests.get(f"{app_url}/ready", timeout=1).status_code == 200:
+                return process, app_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise SystemExit(f"App did not become ready within {READY_TIMEOUT}s")
+
+
+def compare(result, baseline, tolerance):
+    """Human-readable regressions against a baseline result (empty when none)"""
+    regressions = []
+    for route, current in result['routes'].items():
+        before = baseline.get('routes', {}).get(route)
+        if not before or not before.get('requests') or not current['requests']:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if current[metric] > before[metric] * (1 + tolerance):
+                regressions.append(f"{route} {metric}: {before[metric]} -> {current[metric]}")
+        if current['throughput_rps'] < before['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{route} throughput_rps: {before['throughput_rps']} -> {current['throughput_rps']}")
+    before = baseline.get('upstream_calls_per_request')
+    now = result.get('upstream_calls_per_request')
+    if before is not None and now is not None and now > before * (1 + tolerance) + 0.01:
+        regressions.append(f"upstream_calls_per_request: {before} -> {now}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--spawn', action='store_true', help='Start the fake TMDb and the app for this run')
+    parser.add_argument('--server', choices=('flask', 'asgi'), default='flask', help='App server for --spawn')
+    parser.add_argument('--app-port', type=int, default=5055)
+    parser.add_argument('--tmdb-port', type=int, default=8765)
+    parser.add_argument('--app-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--tmdb-url', default='http://127.0.0.1:8765')
+    parser.add_argument('--latency-ms', type=float, default=40.0, help='Fake TMDb latency for --spawn')
+    parser.add_argument('--jitter-ms', type=float, default=15.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--mix', choices=sorted(MIXES), default='default')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds of measured load')
+    parser.add_argument('--requests', type=int, help='Stop after this many requests instead of --duration')
+    parser.add_argument('--warmup', type=int, default=200, help='Unmeasured requests sent first')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='Write the JSON result here')
+    parser.add_argument('--baseline', help='Earlier JSON result to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative regression')
+    args = parser.parse_args()
+
+    app_process = fake_server = poster_dir = None
+    app_url, tmdb_url = args.app_url, args.tmdb_url
+    try:
+        if args.spawn:
+            fake = fake_tmdb.FakeTMDb(fake_tmdb.generate_fixtures(seed=args.seed), args.latency_ms,
+                                      args.jitter_ms, args.error_rate, seed=args.seed)
+            fake_server = fake_tmdb.serve(fake, port=args.tmdb_port)
+            threading.Thread(target=fake_server.serve_forever, daemon=True).start()
+            tmdb_url = f"http://127.0.0.1:{args.tmdb_port}"
+            poster_dir = tempfile.mkdtemp(prefix='bench-posters-')
+            app_process, app_url = spawn_app(args.server, args.app_port, tmdb_url, poster_dir)
+
+        workload = Workload(tmdb_url, seed=args.seed)
+        mix = MIXES[args.mix]
+        if args.warmup:
+            run_load(app_url, workload, mix, args.concurrency, total_requests=args.warmup, seed=args.seed + 1)
+        calls_before = upstream_calls(tmdb_url)['total']
+        duration = None if args.requests else args.duration
+        samples, elapsed = run_load(app_url, workload, mix, args.concurrency, duration, args.requests, args.seed)
+        calls = upstream_calls(tmdb_url)['total'] - calls_before
+    finally:
+        if app_process is not None:
+            app_process.terminate()
+            app_process.wait()
+        if fake_server is not None:
+            fake_server.shutdown()
+        if poster_dir is not None:
+            shutil.rmtree(poster_dir, ignore_errors=True)
+
+    measured = sum(len(values) for values in samples.values())
+    result = {
+        'version': git_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'config': {key: getattr(args, key) for key in (
+            'server', 'mix', 'concurrency', 'duration', 'requests', 'warmup', 'seed',
+            'latency_ms', 'jitter_ms', 'error_rate')},
+        'elapsed_s': round(elapsed, 2),
+        'overall': summarize([sample for values in samples.values() for sample in values], elapsed),
+        'routes': {route: summarize(values, elapsed) for route, values in samples.items()},
+        'upstream_calls': calls,
+        'upstream_calls_per_request': round(calls / measured, 3) if measured else None,
+    }
+
+    print(f"{'route':<20}{'reqs':>8}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for route, stats in list(result['routes'].items()) + [('overall', result['overall'])]:
+        print(f"{route:<20}{stats['requests']:>8}{stats['errors']:>6}{stats['throughput_rps']:>9}"
+              f"{stats['p50_ms'] or 0:>9}{stats['p95_ms'] or 0:>9}{stats['p99_ms'] or 0:>9}")
+    print(f"Upstream TMDb calls per request: {result['upstream_calls_per_request']}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('config') != result['config']:
+            print(f"Warning: {args.baseline} was run with a different configuration: {baseline.get('config')}")
+        regressions = compare(result, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,379 @@
+"""Local stand-in for the TMDb API, for benchmarks and offline development.
+
+Serves the endpoints MovieRecommender uses from a fixture file (or from a
+deterministic synthetic data set) with configurable latency, 5xx and 429
+injection:
+
+    python bench/fake_tmdb.py serve --port 8765 --latency-ms 40 --jitter-ms 20 --error-rate 0.01
+    TMDB_BASE_URL=http://127.0.0.1:8765/3 python app.py
+
+Fixtures can be recorded once from the real API and replayed from then on:
+
+    TMDB_API_KEY=... python bench/fake_tmdb.py record --movies 400 --people 100 --output fixtures.json
+    python bench/fake_tmdb.py serve --fixtures fixtures.json
+
+Poster images are answered under /t/p/<size>/<path> with a fixed 1x1 GIF, so
+TMDB_IMAGE_BASE_URL=http://127.0.0.1:8765/t/p keeps poster prefetch offline too.
+
+GET /__stats returns call counts per endpoint; POST /__stats resets them.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TMDB_URL = 'https://api.themoviedb.org/3'
+PAGE_SIZE = 20
+POSTER_IMAGE = (b'GIF89a\x01\x00\x01\x00\x80\x00\x00\xff\xff\xff\x00\x00\x00!\xf9\x04\x01\x00\x00\x00\x00'
+                b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;')
+IMAGE_PATH = re.compile(r'^/t/p/[^/]+/[^/]+$')
+
+GENRES = [
+    (28, 'Action'), (12, 'Adventure'), (16, 'Animation'), (35, 'Comedy'), (80, 'Crime'),
+    (99, 'Documentary'), (18, 'Drama'), (10751, 'Family'), (14, 'Fantasy'), (36, 'History'),
+    (27, 'Horror'), (10402, 'Music'), (9648, 'Mystery'), (10749, 'Romance'), (878, 'Science Fiction'),
+    (10770, 'TV Movie'), (53, 'Thriller'), (10752, 'War'), (37, 'Western'),
+]
+LANGUAGES = ['en'] * 8 + ['hi'] * 3 + ['es', 'fr', 'de', 'ja', 'ko', 'zh', 'bn', 'kn', 'mr', 'te', 'ta']
+TITLE_WORDS = [
+    'Silent', 'River', 'Last', 'Night', 'Golden', 'City', 'Shadow', 'Storm', 'Broken', 'Crown',
+    'Midnight', 'Train', 'Lost', 'Garden', 'Iron', 'Heart', 'Red', 'Planet', 'Secret', 'Kingdom',
+    'Dark', 'Water', 'Second', 'Chance', 'Wild', 'Summer', 'Hidden', 'Valley', 'Final', 'Hour',
+    'Paper', 'Moon', 'Burning', 'Sky', 'Little', 'Things', 'Endless', 'Road', 'Glass', 'House',
+]
+FIRST_NAMES = ['Aarav', 'Maya', 'Lucas', 'Sofia', 'Kenji', 'Amara', 'Diego', 'Elena', 'Ravi', 'Chloe',
+               'Hugo', 'Priya', 'Noah', 'Yuna', 'Omar', 'Lena', 'Arjun', 'Ines', 'Felix', 'Zara']
+LAST_NAMES = ['Sharma', 'Walker', 'Moreau', 'Tanaka', 'Okafor', 'Garcia', 'Novak', 'Kim', 'Rossi',
+              'Iyer', 'Schmidt', 'Silva', 'Chen', 'Haddad', 'Larsen', 'Reddy', 'Dubois', 'Park']
+KEYWORDS = ['revenge', 'friendship', 'heist', 'time travel', 'small town', 'based on novel', 'robot',
+            'coming of age', 'road trip', 'dystopia', 'family', 'survival', 'detective', 'music', 'war']
+
+
+def summary(movie):
+    """The list-endpoint shape of a full movie details payload"""
+    result = {key: movie.get(key) for key in (
+        'id', 'title', 'original_title', 'overview', 'poster_path', 'backdrop_path', 'release_date',
+        'vote_average', 'vote_count', 'popularity', 'original_language', 'adult')}
+    result['genre_ids'] = [genre['id'] for genre in movie.get('genres', [])]
+    return result
+
+
+def generate_fixtures(movies=3000, people=600, seed=7):
+    """Deterministic synthetic fixtures with TMDb's response shapes"""
+    rng = random.Random(seed)
+    cast_pool = []
+    for person_id in range(1, people + 1):
+        cast_pool.append({
+            'id': person_id,
+            'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'popularity': round(rng.paretovariate(1.5) * 5, 3),
+            'profile_path': f"/p{person_id}.jpg" if rng.random() < 0.9 else None,
+            'known_for_department': 'Acting',
+        })
+    fixtures = {'genres': [{'id': gid, 'name': name} for gid, name in GENRES], 'movies': {},
+                'people': cast_pool, 'credits': {}}
+    credits = {person['id']: [] for person in cast_pool}
+    for movie_id in range(1, movies + 1):
+        title = ' '.join(rng.sample(TITLE_WORDS, rng.choice((1, 2, 2, 3))))
+        if rng.random() < 0.4:
+            title = 'The ' + title
+        genres = rng.sample(GENRES, rng.choice((1, 2, 2, 3, 3, 4)))
+        cast = sorted(rng.sample(cast_pool, 12), key=lambda person: -person['popularity'])
+        year = rng.randint(1970, 2025)
+        movie = {
+            'id': movie_id,
+            'title': title,
+            'original_title': title,
+            'overview': f"A story of {rng.choice(KEYWORDS)} and {rng.choice(KEYWORDS)} in a {title.lower()}.",
+            'poster_path': f"/m{movie_id}.jpg" if rng.random() < 0.95 else None,
+            'backdrop_path': f"/b{movie_id}.jpg",
+            'release_date': f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            'vote_average': round(rng.uniform(2.5, 9.0), 1),
+            'vote_count': rng.randint(5, 20000),
+            'popularity': round(rng.paretovariate(1.2) * 3, 3),
+            'original_language': rng.choice(LANGUAGES),
+            'adult': False,
+            'runtime': rng.randint(80, 180),
+            'genres': [{'id': gid, 'name': name} for gid, name in sorted(genres)],
+            'credits': {
+                'cast': [{'id': person['id'], 'name': person['name'], 'character': f"Role {order + 1}",
+                          'order': order, 'profile_path': person['profile_path']}
+                         for order, person in enumerate(cast)],
+                'crew': [{'id': cast_pool[rng.randrange(people)]['id'], 'name': f"Director {movie_id % 97}",
+                          'job': 'Director', 'department': 'Directing'}],
+            },
+            'videos': {'results': [{'type': 'Trailer', 'site': 'YouTube', 'key': f"yt{movie_id}"}]},
+            'keywords': {'keywords': [{'id': KEYWORDS.index(word), 'name': word}
+                                      for word in rng.sample(KEYWORDS, 3)]},
+        }
+        fixtures['movies'][str(movie_id)] = movie
+        for order, person in enumerate(cast):
+            credits[person['id']].append(dict(summary(movie), character=f"Role {order + 1}"))
+    fixtures['credits'] = {str(person_id): {'id': person_id, 'cast': cast} for person_id, cast in credits.items()}
+    return fixtures
+
+
+def record_fixtures(api_key, movies=400, people=100, base_url=TMDB_URL):
+    """Fetch a fixture set from the real TMDb API (popular movies and people)"""
+    import requests
+
+    session = requests.Session()
+
+    def get(path, **params):
+        for attempt in range(5):
+            response = session.get(f"{base_url}{path}", params=dict(params, api_key=api_key), timeout=10)
+            if response.status_code != 429:
+                response.raise_for_status()
+                return response.json()
+            time.sleep(float(response.headers.get('Retry-After', 1 + attempt)))
+        response.raise_for_status()
+
+    fixtures = {'genres': get('/genre/movie/list', language='en-US')['genres'], 'movies': {},
+                'people': [], 'credits': {}}
+    movie_ids = []
+    page = 1
+    while len(movie_ids) < movies:
+        results = get('/movie/popular', language='en-US', page=page)['results']
+        if not results:
+            break
+        movie_ids += [movie['id'] for movie in results if movie['id'] not in movie_ids]
+        page += 1
+    for done, movie_id in enumerate(movie_ids[:movies], 1):
+        fixtures['movies'][str(movie_id)] = get(f"/movie/{movie_id}", language='en-US',
+                                                append_to_response='credits,videos,keywords')
+        if done % 50 == 0:
+            print(f"Recorded {done}/{movies} movies")
+    page = 1
+    while len(fixtures['people']) < people:
+        results = get('/person/popular', language='en-US', page=page)['results']
+        if not results:
+            break
+        fixtures['people'] += [{key: person.get(key) for key in
+                                ('id', 'name', 'popularity', 'profile_path', 'known_for_department')}
+                               for person in results]
+        page += 1
+    fixtures['people'] = fixtures['people'][:people]
+    for person in fixtures['people']:
+        fixtures['credits'][str(person['id'])] = get(f"/person/{person['id']}/movie_credits", language='en-US')
+    return fixtures
+
+
+class FakeTMDb:
+    """Answers TMDb API paths from fixtures; thread-safe and read-only apart from counters"""
+
+    def __init__(self, fixtures, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, throttle_rate=0.0, seed=7):
+        self.genres = fixtures['genres']
+        self.movies = {int(movie_id): movie for movie_id, movie in fixtures['movies'].items()}
+        self.summaries = sorted((summary(movie) for movie in self.movies.values()),
+                                key=lambda movie: -(movie['popularity'] or 0))
+        self.people = sorted(fixtures['people'], key=lambda person: -(person['popularity'] or 0))
+        self.credits = {int(person_id): credits for person_id, credits in fixtures['credits'].items()}
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.calls = Counter()
+        self.images = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def page(results, params):
+        page = max(1, int(params.get('page', 1)))
+        total_pages = max(1, (len(results) + PAGE_SIZE - 1) // PAGE_SIZE)
+        return {'page': page, 'results': results[(page - 1) * PAGE_SIZE:page * PAGE_SIZE],
+                'total_pages': total_pages, 'total_results': len(results)}
+
+    def endpoint(self, path):
+        return re.sub(r'/\d+', '/{id}', path).strip('/')
+
+    def handle(self, path, params):
+        """(status, payload, headers) for one API call, after injected latency and failures"""
+        with self._lock:
+            self.calls[self.endpoint(path)] += 1
+            delay = max(0.0, self._rng.gauss(self.latency, self.jitter)) if self.latency or self.jitter else 0
+            roll = self._rng.random()
+        if delay:
+            time.sleep(delay)
+        if roll < self.throttle_rate:
+            return 429, {'status_code': 25, 'status_message': 'Request count over limit.'}, {'Retry-After': '1'}
+        if roll < self.throttle_rate + self.error_rate:
+            return 503, {'status_code': 11, 'status_message': 'Internal error.'}, {}
+        payload = self.route(path, params)
+        if payload is None:
+            return 404, {'status_code': 34, 'status_message': 'The resource you requested could not be found.'}, {}
+        return 200, payload, {}
+
+    def image(self, path):
+        """(status, body) for a poster request; counted apart from API calls"""
+        with self._lock:
+            self.images += 1
+        return (200, POSTER_IMAGE) if IMAGE_PATH.match(path) else (404, b'')
+
+    def route(self, path, params):
+        if path == '/genre/movie/list':
+            return {'genres': self.genres}
+        if path == '/movie/popular':
+            return self.page(self.summaries, params)
+        if path == '/person/popular':
+            return self.page(self.people, params)
+        if path == '/search/movie':
+            query = params.get('query', '').lower()
+            return self.page([movie for movie in self.summaries if query in movie['title'].lower()], params)
+        if path == '/search/person':
+            query = params.get('query', '').lower()
+            return self.page([person for person in self.people if query in person['name'].lower()], params)
+        if path == '/discover/movie':
+            return self.page(self.discover(params), params)
+        match = re.fullmatch(r'/movie/(\d+)(/similar)?', path)
+        if match:
+            movie = self.movies.get(int(match.group(1)))
+            if movie is None:
+                return None
+            return self.page(self.similar(movie), params) if match.group(2) else movie
+        match = re.fullmatch(r'/person/(\d+)/movie_credits', path)
+        if match:
+            return self.credits.get(int(match.group(1)))
+        return None
+
+    def discover(self, params):
+        with_genres = params.get('with_genres', '')
+        any_of = '|' in with_genres
+        wanted = {int(gid) for gid in re.split(r'[,|]', with_genres) if gid.strip().isdigit()}
+        language = params.get('with_original_language')
+        results = []
+        for movie in self.summaries:
+            if language and movie['original_language'] != language:
+                continue
+            genres = set(movie['genre_ids'])
+            if wanted and not (genres & wanted if any_of else wanted <= genres):
+                continue
+            results.append(movie)
+        return results
+
+    def similar(self, movie):
+        genres = {genre['id'] for genre in movie['genres']}
+        scored = [(len(genres & set(other['genre_ids'])), other) for other in self.summaries
+                  if other['id'] != movie['id']]
+        return [other for score, other in sorted(scored, key=lambda item: -item[0]) if score][:PAGE_SIZE * 5]
+
+
+def make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json;charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/__stats':
+                with fake._lock:
+                    calls, images = dict(fake.calls), fake.images
+                self.send_json(200, {'calls': calls, 'total': sum(calls.values()), 'images': images})
+                return
+            if url.path.startswith('/t/p/'):
+                status, body = fake.image(url.path)
+                self.send_response(status)
+                self.send_header('Content-Type', 'image/gif')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            if not url.path.startswith('/3/'):
+                self.send_json(404, {'status_message': 'not found'})
+                return
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            self.send_json(*fake.handle(url.path[2:], params))
+
+        def do_POST(self):
+            if urlparse(self.path).path == '/__stats':
+                with fake._lock:
+                    fake.calls.clear()
+                    fake.images = 0
+                self.send_json(200, {'calls': {}, 'total': 0, 'images': 0})
+            else:
+                self.send_json(404, {'status_message': 'not found'})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(fake, host='127.0.0.1', port=8765):
+    server = ThreadingHTTPServer((host, port), make_handler(fake))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('serve', help='Serve the fake API')
+    run.add_argument('--host', default='127.0.0.1')
+    run.add_argument('--port', type=int, default=8765)
+    run.add_argument('--fixtures', help='Fixture JSON (default: synthetic data)')
+    run.add_argument('--movies', type=int, default=3000, help='Synthetic movies when no --fixtures')
+    run.add_argument('--people', type=int, default=600, help='Synthetic people when no --fixtures')
+    run.add_argument('--seed', type=int, default=7)
+    run.add_argument('--latency-ms', type=float, default=0.0, help='Mean injected latency per call')
+    run.add_argument('--jitter-ms', type=float, default=0.0, help='Standard deviation of the latency')
+    run.add_argument('--error-rate', type=float, default=0.0, help='Share of calls answered with 503')
+    run.add_argument('--throttle-rate', type=float, default=0.0, help='Share of calls answered with 429')
+
+    rec = commands.add_parser('record', help='Record fixtures from the real TMDb API (needs TMDB_API_KEY)')
+    rec.add_argument('--movies', type=int, default=400)
+    rec.add_argument('--people', type=int, default=100)
+    rec.add_argument('--output', required=True)
+
+    gen = commands.add_parser('generate', help='Write the synthetic fixtures to a file')
+    gen.add_argument('--movies', type=int, default=3000)
+    gen.add_argument('--people', type=int, default=600)
+    gen.add_argument('--seed', type=int, default=7)
+    gen.add_argument('--output', required=True)
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        api_key = os.environ.get('TMDB_API_KEY')
+        if not api_key:
+            parser.error('set TMDB_API_KEY to record fixtures')
+        fixtures = record_fixtures(api_key, args.movies, args.people)
+    elif args.command == 'generate':
+        fixtures = generate_fixtures(args.movies, args.people, args.seed)
+    if args.command in ('record', 'generate'):
+        with open(args.output, 'w') as f:
+            json.dump(fixtures, f)
+        print(f"Wrote {len(fixtures['movies'])} movies and {len(fixtures['people'])} people to {args.output}")
+        return
+
+    if args.fixtures:
+        with open(args.fixtures) as f:
+            fixtures = json.load(f)
+    else:
+        fixtures = generate_fixtures(args.movies, args.people, args.seed)
+    fake = FakeTMDb(fixtures, args.latency_ms, args.jitter_ms, args.error_rate, args.throttle_rate, args.seed)
+    server = serve(fake, args.host, args.port)
+    print(f"Fake TMDb with {len(fake.movies)} movies on http://{args.host}:{args.port}/3")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
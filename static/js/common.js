@@ -0,0 +1,105 @@
+// Movie details modal shared by every page; each page provides #movieModal and #movieDetails
+function showMovieDetails(movieId) {
+    fetch(`/movie_details/${movieId}`)
+        .then(response => response.json())
+        .then(movie => {
+            if (!movie || movie.error) {
+                alert('Could not load movie details');
+                return;
+            }
+
+            const posterPath = movie.poster_path ?
+                `/poster/w300${movie.poster_path}` :
+                'https://via.placeholder.com/200x300?text=No+Image';
+
+            const genres = movie.genres ? movie.genres.map(g => `<span class="genre-tag">${g.name}</span>`).join('') : '';
+            const cast = movie.credits && movie.credits.cast ?
+                movie.credits.cast.slice(0, 10).map(actor => `<span class="cast-member">${actor.name}</span>`).join('') :
+                'Cast information not available';
+
+            const trailer = movie.videos && movie.videos.results ?
+                movie.videos.results.find(v => v.type === 'Trailer' && v.site === 'YouTube') : null;
+
+            const trailerHtml = trailer ?
+                `<p><strong>Trailer:</strong> <a href="https://www.youtube.com/watch?v=${trailer.key}" target="_blank">Watch on YouTube</a></p>` :
+                '<p><strong>Trailer:</strong> Not available</p>';
+
+            const runtime = movie.runtime ? `${movie.runtime} minutes` : 'Unknown';
+            const releaseDate = movie.release_date || 'Unknown';
+            const rating = movie.vote_average ? movie.vote_average.toFixed(1) : 'N/A';
+
+            document.getElementById('movieDetails').innerHTML = `
+                <img src="${posterPath}" alt="${movie.title}" class="movie-detail-poster">
+                <div class="movie-details">
+                    <h2>${movie.title}</h2>
+                    <p><strong>Overview:</strong> ${movie.overview || 'No description available'}</p>
+                    <p><strong>Release Date:</strong> ${releaseDate}</p>
+                    <p><strong>Runtime:</strong> ${runtime}</p>
+                    <p><strong>Rating:</strong> ⭐ ${rating}/10</p>
+                    <p><strong>Genres:</strong> ${genres}</p>
+                    ${trailerHtml}
+                    <p><strong>Cast:</strong></p>
+                    <div>${cast}</div>
+                </div>
+            `;
+
+            document.getElementById('movieModal').style.display = 'block';
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('Error loading movie details');
+        });
+}
+
+// Append result cards for a list of movies to a .movie-grid element
+function appendMovieCards(grid, movies) {
+    let html = '';
+    movies.forEach(movie => {
+        const posterPath = movie.poster_path ?
+            `/poster/w300${movie.poster_path}` :
+            'https://via.placeholder.com/300x450?text=No+Image';
+
+        const releaseYear = movie.release_date ? new Date(movie.release_date).getFullYear() : 'Unknown';
+        const rating = movie.vote_average ? movie.vote_average.toFixed(1) : 'N/A';
+
+        html += `
+            <div class="movie-card" onclick="showMovieDetails(${movie.id})">
+                <img src="${posterPath}" alt="${movie.title}" class="movie-poster">
+                <div class="movie-title">${movie.title}</div>
+                <div class="movie-year">${releaseYear}</div>
+                <div class="movie-rating">⭐ ${rating}/10</div>
+            </div>
+        `;
+    });
+    grid.insertAdjacentHTML('beforeend', html);
+}
+
+// Fetch a newline-delimited JSON stream and call onEvent with each object as soon as its line arrives
+function readNdjson(url, onEvent) {
+    return fetch(url).then(response => {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffered = '';
+        function pump() {
+            return reader.read().then(({ done, value }) => {
+                buffered += decoder.decode(value || new Uint8Array(), { stream: !done });
+                const lines = buffered.split('\n');
+                buffered = done ? '' : lines.pop();
+                lines.filter(line => line.trim()).forEach(line => onEvent(JSON.parse(line)));
+                return done ? undefined : pump();
+            });
+        }
+        return pump();
+    });
+}
+
+function closeModal() {
+    document.getElementById('movieModal').style.display = 'none';
+}
+
+window.onclick = function(event) {
+    const modal = document.getElementById('movieModal');
+    if (event.target == modal) {
+        modal.style.display = 'none';
+    }
+}
@@ -0,0 +1,87 @@
+"""Shared fixtures: app.py runs against bench/fake_tmdb.py through a requests adapter, never the network."""
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+from urllib.parse import parse_qsl, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'bench')]
+
+# Module-level state in app.py reads these at import time
+_scratch = tempfile.mkdtemp(prefix='movie-recommender-tests-')
+os.environ.setdefault('POSTER_CACHE_DIR', os.path.join(_scratch, 'posters'))
+os.environ.setdefault('CATALOG_PATH', os.path.join(_scratch, 'catalog.npz'))
+os.environ.setdefault('CONTENT_INDEX_DIR', os.path.join(_scratch, 'content_index'))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import app as movie_app  # noqa: E402
+from fake_tmdb import FakeTMDb, generate_fixtures  # noqa: E402
+
+
+class FakeTMDbAdapter(BaseAdapter):
+    """Answers API calls from a FakeTMDb and poster requests with a few bytes derived from the path"""
+
+    def __init__(self, fake):
+        super().__init__()
+        self.fake = fake
+        self.image_calls = []
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        if '/t/p/' in url.path:
+            self.image_calls.append(url.path)
+            name = url.path.rsplit('/', 1)[-1]
+            response.status_code = 404 if name.startswith('missing') else 200
+            response._content = b'\xff\xd8' + name.encode() * 64 if response.status_code == 200 else b''
+            response.headers['Content-Type'] = 'image/jpeg'
+            return response
+        status, payload, headers = self.fake.handle(url.path.split('/3', 1)[-1], dict(parse_qsl(url.query)))
+        response.status_code = status
+        response._content = json.dumps(payload).encode('utf-8')
+        response.headers['Content-Type'] = 'application/json;charset=utf-8'
+        response.headers.update(headers)
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(scope='session')
+def fake_tmdb():
+    fake = FakeTMDb(generate_fixtures(movies=800, people=60, seed=11))
+    adapter = FakeTMDbAdapter(fake)
+    session = movie_app.recommender.client.session
+    mounted = dict(session.adapters)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    yield adapter
+    session.adapters.update(mounted)
+
+
+@pytest.fixture
+def client(fake_tmdb):
+    movie_app.recommender.cache.clear()
+    return movie_app.app.test_client()
+
+
+@pytest.fixture
+def async_recommender(fake_tmdb):
+    """An AsyncMovieRecommender with a private cache whose httpx client is answered by the fake TMDb"""
+    httpx = pytest.importorskip('httpx')
+
+    def answer(request):
+        status, payload, headers = fake_tmdb.fake.handle(
+            request.url.path.split('/3', 1)[-1], dict(request.url.params))
+        return httpx.Response(status, json=payload, headers=headers)
+
+    client = movie_app.AsyncTMDbClient()
+    client.session = httpx.AsyncClient(transport=httpx.MockTransport(answer))
+    return movie_app.AsyncMovieRecommender(movie_app.API_KEY, client=client, cache=movie_app.TTLCache())
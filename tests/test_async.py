@@ -0,0 +1,51 @@
+import asyncio
+import threading
+
+import app as movie_app
+
+
+def _some_movie_id(fake_tmdb):
+    return fake_tmdb.fake.summaries[3]['id']
+
+
+def test_async_similar_matches_the_sync_answer(client, async_recommender, fake_tmdb):
+    movie_id = _some_movie_id(fake_tmdb)
+    expected = movie_app.recommender.get_similar_by_genre(movie_id, 'en')
+
+    async def run():
+        try:
+            return await async_recommender.get_similar_by_genre(movie_id, 'en')
+        finally:
+            await async_recommender.close()
+
+    answer = asyncio.run(run())
+    assert [movie['id'] for movie in answer['results']] == [movie['id'] for movie in expected['results']]
+    assert answer['next_cursor'] == expected['next_cursor']
+
+
+def test_candidate_details_stop_at_the_deadline(async_recommender, monkeypatch):
+    async def details(movie_id):
+        await asyncio.sleep(0 if movie_id == 1 else 5)
+        return {'id': movie_id, 'genres': [{'id': 28}]}
+
+    monkeypatch.setattr(async_recommender, 'get_movie_details', details)
+    fetched = asyncio.run(async_recommender._fetch_candidate_genres([{'id': 1}, {'id': 2}], deadline=0.2))
+    assert fetched == {1: [28]}
+
+
+def test_disk_tier_is_read_off_the_event_loop(async_recommender, tmp_path):
+    cache = movie_app.TTLCache(disk=movie_app.DiskCache(str(tmp_path / 'cache.sqlite3')))
+    cache.disk.set('discover_28_en', {'results': [1]}, 60)
+    async_recommender.cache = cache
+    threads = []
+    get = cache.get
+    cache.get = lambda key: threads.append(threading.get_ident()) or get(key)
+
+    async def run():
+        loop_thread = threading.get_ident()
+        value = await async_recommender._get_or_load('discover_28_en', None)
+        return loop_thread, value
+
+    loop_thread, value = asyncio.run(run())
+    assert value == {'results': [1]}
+    assert threads and loop_thread not in threads
@@ -0,0 +1,33 @@
+import app as movie_app
+
+
+def test_search_sees_pending_and_merged_entries():
+    index = movie_app.AutocompleteIndex()
+    index.add('movie', 1, 'Silent River', 10, '2001')
+    assert index.search('sil', 'movie') == [(10.0, 'movie', 'Silent River', '2001')]
+    last = movie_app.AUTOCOMPLETE_MERGE_EVERY
+    for item_id in range(2, last + 1):
+        index.add('movie', item_id, f'Silent {item_id}', item_id)
+    assert not index._pending and index._keys == sorted(index._keys)
+    assert [entry[2] for entry in index.search('silent', 'movie', limit=2)] == [f'Silent {last}', f'Silent {last - 1}']
+    assert index.search('silent r', 'movie')[0][2] == 'Silent River'
+
+
+def test_index_is_trimmed_to_its_most_popular_entries():
+    index = movie_app.AutocompleteIndex(max_entries=100)
+    for item_id in range(3 * movie_app.AUTOCOMPLETE_MERGE_EVERY):
+        index.add('actor', item_id, f'Actor {item_id}', item_id)
+    assert len(index) <= 100 + movie_app.AUTOCOMPLETE_MERGE_EVERY
+    assert min(entry[0] for entry in index._entries) >= 3 * movie_app.AUTOCOMPLETE_MERGE_EVERY - 100
+    assert ('actor', 0) not in index._seen  # dropped, so TMDb results can index it again
+    index.add('actor', 0, 'Actor 0', 0)
+    assert index.search('actor 0', 'actor')[0][2] == 'Actor 0'
+
+
+def test_warm_up_seeds_popular_people(fake_tmdb):
+    index = movie_app.AutocompleteIndex()
+    warmer = movie_app.CacheWarmer(movie_app.recommender, top_people=20, autocomplete=index)
+    person_ids = warmer.popular_person_ids()
+    top = fake_tmdb.fake.people[0]
+    assert top['id'] in person_ids
+    assert index.search(top['name'][:4], 'actor')[0][2] == top['name']
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+
+@pytest.mark.parametrize('body', [[201, 202], {'ids': '12'}, {'ids': {'201': True}}, 'ids', 12])
+def test_batch_rejects_bodies_that_are_not_an_id_list(client, body):
+    response = client.post('/movie_details/batch', json=body)
+    assert response.status_code == 200
+    assert response.get_json() == {'results': [], 'error': 'ids must be movie ids'}
+
+
+def test_batch_accepts_an_id_list(client):
+    response = client.post('/movie_details/batch', json={'ids': [201, '202', 201]})
+    assert [movie['id'] for movie in response.get_json()['results']] == [201, 202]
+
+
+def test_batch_requires_ids(client):
+    assert client.post('/movie_details/batch', json={}).get_json()['error'] == 'ids are required'
+    assert client.get('/movie_details/batch').get_json()['error'] == 'ids are required'
+
+
+def test_batch_get_rejects_non_numeric_ids(client):
+    assert client.get('/movie_details/batch?ids=201,abc').get_json()['error'] == 'ids must be movie ids'
+
+
+def test_streamed_batch_reports_unknown_movies(client):
+    response = client.get('/movie_details/batch?ids=201,999999&stream=1')
+    assert response.mimetype == 'application/x-ndjson'
+    lines = {line['id']: line for line in map(json.loads, response.get_data(as_text=True).splitlines())}
+    response.close()
+    assert lines[201]['details']['id'] == 201
+    assert lines[999999] == {'id': 999999, 'error': 'Movie not found'}
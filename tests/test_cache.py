@@ -0,0 +1,136 @@
+import threading
+import time
+
+import pytest
+
+import app as movie_app
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_entries_expire_by_kind():
+    cache = movie_app.TTLCache(ttls={'details': 60, 'discover': -1})
+    cache.set('details_1', {'id': 1})
+    cache.set('discover_28_en', {'results': []})
+    assert cache.get('details_1') == {'id': 1}
+    assert cache.get('discover_28_en') is None
+    assert cache.get_stale('discover_28_en') == {'results': []}
+    assert cache.ttl_for('search_movie_x_en') == cache.default_ttl
+
+
+def test_least_recently_used_entries_are_evicted_past_the_byte_budget():
+    cache = movie_app.TTLCache(max_bytes=100)
+    cache.set('details_1', 'a' * 40)
+    cache.set('details_2', 'b' * 40)
+    cache.get('details_1')
+    cache.set('details_3', 'c' * 40)
+    assert 'details_1' in cache and 'details_3' in cache and 'details_2' not in cache
+    assert cache.stats()['evictions'] == 1 and cache.stats()['bytes'] <= 100
+    cache.set('details_4', 'd' * 200)  # bigger than the whole budget: not cached
+    assert 'details_4' not in cache
+
+
+def test_concurrent_misses_share_one_load():
+    cache = movie_app.TTLCache()
+    calls = []
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return {'id': 1}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load('details_1', loader)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: cache.stats()['coalesced'] == 7)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and results == [{'id': 1}] * 8
+
+
+def test_loader_errors_reach_every_waiter_and_are_not_cached():
+    cache = movie_app.TTLCache()
+
+    def failing():
+        raise RuntimeError('upstream down')
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load('details_1', failing)
+    assert cache.get_or_load('details_1', lambda: None) is None
+    assert 'details_1' not in cache
+    assert cache.get_or_load('details_1', lambda: {'id': 1}) == {'id': 1}
+
+
+def test_disk_tier_is_shared_and_promoted(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    writer = movie_app.TTLCache(disk=movie_app.DiskCache(path))
+    reader = movie_app.TTLCache(disk=movie_app.DiskCache(path))
+    writer.set('details_1', {'id': 1, 'title': 'Road'})
+    assert reader.get('details_1') == {'id': 1, 'title': 'Road'}
+    assert reader.stats()['disk_hits'] == 1 and 'details_1' in reader  # now in memory too
+    writer.set('details_2', {'id': 2}, ttl=-1)
+    assert reader.get('details_2') is None
+    assert reader.get_stale('details_2') == {'id': 2}
+
+
+@pytest.mark.parametrize('payload', [b'not zlib', movie_app.zlib.compress(b'{"id": 1')])
+def test_corrupt_disk_rows_are_dropped_as_misses(tmp_path, payload):
+    disk = movie_app.DiskCache(str(tmp_path / 'cache.sqlite3'))
+    disk.set('details_1', {'id': 1}, ttl=60)
+    disk._connect().execute('UPDATE cache SET payload = ? WHERE key = ?', (payload, 'details_1'))
+    assert disk.get('details_1') is None
+    assert disk._connect().execute('SELECT COUNT(*) FROM cache').fetchone()[0] == 0
+    assert movie_app.TTLCache(disk=disk).get_or_load('details_1', lambda: {'id': 1}) == {'id': 1}
+
+
+def test_refresher_starts_with_the_first_refreshable_entry():
+    cache = movie_app.TTLCache(stale_while_revalidate=True)
+    cache.get_or_load('search_movie_road_en', lambda: {'results': [1]})
+    assert not cache.refresher._started
+    cache.get_or_load('details_1', lambda: {'id': 1})
+    assert cache.refresher._started
+
+
+def test_expired_entries_are_served_stale_and_refreshed():
+    cache = movie_app.TTLCache(stale_while_revalidate=True)
+    cache.set('details_1', {'id': 1, 'title': 'old'}, ttl=-1)
+    refreshed = threading.Event()
+
+    def loader():
+        refreshed.set()
+        return {'id': 1, 'title': 'new'}
+
+    assert cache.get_or_load('details_1', loader)['title'] == 'old'
+    assert refreshed.wait(5)
+    _wait_for(lambda: cache.get('details_1', {}).get('title') == 'new')
+    assert cache.stats()['stale_served'] == 1
+    assert cache._loaders['details_1'] is loader  # kept for refresh-ahead
+
+
+def test_entries_promoted_from_disk_get_a_loader(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    movie_app.TTLCache(disk=movie_app.DiskCache(path)).set('details_1', {'id': 1})
+    cache = movie_app.TTLCache(disk=movie_app.DiskCache(path), stale_while_revalidate=True)
+    loader = lambda: {'id': 1}  # noqa: E731
+    assert cache.get_or_load('details_1', loader) == {'id': 1}
+    assert cache._loaders['details_1'] is loader
+
+
+def test_hot_entries_near_expiry_are_offered_for_refresh():
+    cache = movie_app.TTLCache(ttls={'details': 100}, stale_while_revalidate=True)
+    loader = lambda: {'id': 1}  # noqa: E731
+    cache.get_or_load('details_1', loader)
+    cache.set('details_1', {'id': 1}, ttl=5)
+    cache.remember_loader('details_1', loader)
+    for _ in range(4):
+        cache.get_or_load('details_1', loader)
+    assert [key for key, _, _ in cache.hot_expiring(refresh_ahead=0.1, min_hits=3)] == ['details_1']
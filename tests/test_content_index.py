@@ -0,0 +1,31 @@
+import app as movie_app
+
+
+def _details(fake_tmdb, count):
+    return [fake_tmdb.fake.movies[movie_id] for movie_id in sorted(fake_tmdb.fake.movies)[:count]]
+
+
+def test_languages_follow_adds_and_updates(fake_tmdb, tmp_path):
+    index = movie_app.ContentIndex(str(tmp_path))
+    details = _details(fake_tmdb, 60)
+    index.add(details[:40])
+    index.add(details[40:])
+    assert list(index.languages) == [movie['original_language'] for movie in details]
+
+    changed = dict(details[3], original_language='zz')
+    index.add([changed])
+    assert index.languages[index.row_of_id[changed['id']]] == 'zz'
+    assert len(index.languages) == len(index.ids)
+
+
+def test_language_filter_uses_the_stored_languages(fake_tmdb, tmp_path):
+    index = movie_app.ContentIndex(str(tmp_path))
+    details = _details(fake_tmdb, 200)
+    index.add(details)
+    index.save()
+    loaded = movie_app.ContentIndex.load(str(tmp_path))
+    assert list(loaded.languages) == list(index.languages)
+
+    query = details[0]
+    matches = loaded.similar(loaded.vectorize(query), k=10, exclude_id=query['id'], language='en')
+    assert matches and all(movie['original_language'] == 'en' for movie, _ in matches)
@@ -0,0 +1,58 @@
+import asyncio
+
+import app as movie_app
+
+GENRES = [{'id': 28, 'name': 'Action'}, {'id': 35, 'name': 'Comedy'}]
+
+
+class Fetch:
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        answer = self.answers.pop(0) if len(self.answers) > 1 else self.answers[0]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+def test_failed_first_load_waits_for_the_retry_interval(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(movie_app.time, 'monotonic', lambda: clock[0])
+    fetch = Fetch(movie_app.RateLimitExceeded(1), GENRES)
+    store = movie_app.GenreStore(fetch)
+    assert store.get() == [] and store.get() == [] and store.names() == {}
+    assert fetch.calls == 1
+    clock[0] += movie_app.GENRES_RETRY_INTERVAL
+    assert store.get() == GENRES and store.names() == {28: 'Action', 35: 'Comedy'}
+    assert fetch.calls == 2
+
+
+def test_etag_follows_the_list():
+    store = movie_app.GenreStore(Fetch(GENRES))
+    _, etag = store.versioned()
+    assert etag == movie_app.GenreStore(Fetch(list(GENRES))).versioned()[1]
+    assert etag != movie_app.GenreStore(Fetch(GENRES[:1])).versioned()[1]
+
+
+def test_expired_list_is_served_while_it_refreshes(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(movie_app.time, 'monotonic', lambda: clock[0])
+    fetch = Fetch(GENRES, GENRES[:1])
+    store = movie_app.GenreStore(fetch, ttl=60)
+    assert store.get() == GENRES
+    clock[0] += 61
+    started = []
+    monkeypatch.setattr(movie_app.threading, 'Thread',
+                        lambda target, **kwargs: started.append(target) or type('T', (), {'start': lambda self: None})())
+    assert store.get() == GENRES  # still the old list
+    [refresh] = started
+    refresh()
+    assert store.get() == GENRES[:1]
+
+
+def test_async_recommender_shares_the_genre_store(async_recommender):
+    async_recommender.genres = movie_app.GenreStore(Fetch(GENRES))
+    assert asyncio.run(async_recommender.get_genres()) == GENRES
@@ -0,0 +1,118 @@
+import asyncio
+import json
+
+import pytest
+
+import app as movie_app
+
+
+def test_cursor_round_trip():
+    assert movie_app.decode_cursor(movie_app.encode_cursor(7)) == 7
+
+
+@pytest.mark.parametrize('cursor', ['', 'not-base64!', movie_app.encode_cursor(0),
+                                    'eyJwYWdlIjogIjIifQ', 'WzJd'])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        movie_app.decode_cursor(cursor)
+
+
+def test_next_cursor_stops_at_the_last_page():
+    assert movie_app.with_next_cursor({'page': 3, 'total_pages': 3})['next_cursor'] is None
+    assert movie_app.with_next_cursor({'page': 2, 'total_pages': 9}, max_pages=2)['next_cursor'] is None
+    following = movie_app.with_next_cursor({'page': 2, 'total_pages': 9})['next_cursor']
+    assert movie_app.decode_cursor(following) == 3
+
+
+def test_entries_cached_before_pagination_get_a_cursor():
+    cached = {'page': 1, 'total_pages': 4, 'results': [{'id': 1}]}
+    served = movie_app._with_cursor(cached)
+    assert movie_app.decode_cursor(served['next_cursor']) == 2
+    assert 'next_cursor' not in cached
+
+
+def test_browse_follows_cursors_without_repeats(client):
+    first = client.get('/browse_movies?language=en&genres=28').get_json()
+    assert first['results'] and first['next_cursor']
+    second = client.get(f"/browse_movies?language=en&genres=28&cursor={first['next_cursor']}").get_json()
+    assert second['page'] == 2
+    assert not {movie['id'] for movie in first['results']} & {movie['id'] for movie in second['results']}
+
+
+def test_browse_rejects_a_bad_cursor(client):
+    assert client.get('/browse_movies?language=en&genres=28&cursor=nope').get_json()['error'] == 'Invalid page or cursor'
+
+
+def test_similar_pages_are_capped(client):
+    too_far = movie_app.SIMILAR_MAX_PAGES + 1
+    response = client.get(f'/search_similar?movie_name=Road&page={too_far}').get_json()
+    assert response['results'] == [] and 'error' in response
+    response = client.get(f'/search_similar?movie_name=Road&cursor={movie_app.encode_cursor(too_far)}').get_json()
+    assert response['results'] == [] and 'error' in response
+
+
+def test_streamed_similar_summary_carries_the_page_cursor(client):
+    response = client.get('/search_similar?movie_name=Road&language=en&stream=1')
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    response.close()
+    done = events[-1]
+    assert done['event'] == 'done' and done['total_results'] > 0
+    assert done['page'] == 1
+    page = client.get('/search_similar?movie_name=Road&language=en').get_json()
+    assert done['next_cursor'] == page['next_cursor']
+    assert done['total_pages'] == page['total_pages']
+
+
+def test_async_prefetch_holds_its_task_and_caches_the_page(async_recommender):
+    async def run():
+        first = await async_recommender.discover_movies_by_genre_flexible('28', 'en')
+        assert first['next_cursor']
+        async_recommender.prefetch_discover_page('28', 'en', 2)
+        assert len(async_recommender._background) == 1
+        await asyncio.gather(*async_recommender._background)
+        await asyncio.sleep(0)
+        await async_recommender.close()
+
+    asyncio.run(run())
+    assert not async_recommender._background
+    assert async_recommender.counters['discover_pages_prefetched'] == 1
+    assert 'discover_28_en_p2' in async_recommender.cache
+
+
+def _short_first_page(recommender, fake_tmdb):
+    """A movie whose first similar page is topped up from /similar and has a second page"""
+    for movie in fake_tmdb.fake.summaries:
+        first = recommender.get_similar_by_genre(movie['id'], 'en')
+        if first and first['next_cursor'] and len(first['results']) < 20:
+            return movie['id']
+    pytest.skip('no movie with a short first page in the fixtures')
+
+
+def test_similar_pages_prefetch_the_next_discover_page(client, fake_tmdb, monkeypatch):
+    recommender = movie_app.recommender
+    monkeypatch.setattr(recommender, '_similar_fill', lambda *args: None)
+    movie_id = _short_first_page(recommender, fake_tmdb)
+    recommender.cache.clear()
+    prefetched = []
+    monkeypatch.setattr(recommender, 'prefetch_discover_page', lambda *args: prefetched.append(args))
+    recommender.get_similar_by_genre(movie_id, 'en')
+    [(genres, language, page)] = prefetched
+    assert page == 2
+    recommender.get_similar_by_genre(movie_id, 'en', 2)
+    assert f"discover_{genres}_{language or 'all'}_p2" in recommender.cache
+
+
+def test_later_similar_pages_skip_movies_the_first_page_filled_in(client, fake_tmdb, monkeypatch):
+    recommender = movie_app.recommender
+    monkeypatch.setattr(recommender, '_similar_fill', lambda *args: None)
+    movie_id = _short_first_page(recommender, fake_tmdb)
+    second = recommender.get_similar_by_genre(movie_id, 'en', 2)
+    recommender.cache.clear()
+
+    # /similar happens to list movies that discover ranks on page 2
+    monkeypatch.setattr(recommender, '_similar_fill', lambda *args: {'results': second['results']})
+    first = recommender.get_similar_by_genre(movie_id, 'en')
+    filled = {movie['id'] for movie in first['results']} & {movie['id'] for movie in second['results']}
+    assert filled
+    again = recommender.get_similar_by_genre(movie_id, 'en', 2)
+    assert not filled & {movie['id'] for movie in again['results']}
@@ -0,0 +1,77 @@
+import os
+
+import app as movie_app
+
+
+def _cache(tmp_path, **kwargs):
+    return movie_app.PosterCache(str(tmp_path), client=movie_app.recommender.client, **kwargs)
+
+
+def test_posters_are_fetched_once_and_stored_by_content(fake_tmdb, tmp_path):
+    cache = _cache(tmp_path)
+    calls = len(fake_tmdb.image_calls)
+    path, content_type, digest = cache.get('w300', '/one.jpg')
+    assert cache.get('w300', '/one.jpg') == (path, content_type, digest)
+    assert len(fake_tmdb.image_calls) == calls + 1
+    assert open(path, 'rb').read().startswith(b'\xff\xd8')
+    assert cache.get('w500', '/one.jpg')[2] == digest  # same bytes, one object
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+
+
+def test_missing_posters_are_not_cached(fake_tmdb, tmp_path):
+    cache = _cache(tmp_path)
+    assert cache.get('w300', '/missing.jpg') is None
+    assert cache.stats()['fetch_errors'] == 1
+
+
+def test_least_recently_used_posters_are_evicted(fake_tmdb, tmp_path):
+    cache = _cache(tmp_path, max_bytes=2000)
+    paths = [cache.get('w300', f'/p{number}.jpg')[0] for number in range(6)]
+    assert cache.stats()['bytes'] <= 2000
+    assert cache.stats()['evictions'] > 0
+    assert not os.path.exists(paths[0]) and os.path.exists(paths[-1])
+
+
+def test_workers_sharing_a_directory_evict_by_its_total_size(fake_tmdb, tmp_path):
+    first, second = _cache(tmp_path, max_bytes=2000), _cache(tmp_path, max_bytes=2000)
+    for number in range(3):
+        first.get('w300', f'/first{number}.jpg')
+    assert first.stats()['evictions'] == 0
+    second.get('w300', '/second0.jpg')
+    assert second.stats()['evictions'] > 0
+    assert second.stats()['bytes'] <= 2000
+
+
+def test_nothing_is_created_until_first_use(fake_tmdb, tmp_path):
+    root = tmp_path / 'posters'
+    cache = movie_app.PosterCache(str(root), client=movie_app.recommender.client)
+    assert not root.exists()
+    cache.get('w300', '/lazy.jpg')
+    assert (root / 'index.sqlite3').exists()
+
+
+def test_failed_prefetch_releases_its_claim(fake_tmdb, tmp_path):
+    cache = _cache(tmp_path)
+    cache.prefetch([{'poster_path': '/missing.jpg'}, {'poster_path': '/found.jpg'}, {'poster_path': 'bad path'}])
+    cache.executor.shutdown(wait=True)
+    assert cache.stats()['prefetched'] == 2
+    assert 'w300/missing.jpg' not in cache._touched
+    assert cache._touched['w300/found.jpg'] > 0
+    assert not cache._claimed
+
+
+def test_image_fetches_are_not_counted_as_api_calls(fake_tmdb, tmp_path):
+    cache = _cache(tmp_path)
+    trace, token = movie_app.RequestTrace.begin('/poster')
+    try:
+        cache.get('w300', '/traced.jpg')
+    finally:
+        movie_app.RequestTrace._current.reset(token)
+    assert trace.counts['tmdb_calls'] == 0
+
+
+def test_poster_route_serves_cached_bytes(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(movie_app, 'posters', _cache(tmp_path))
+    response = client.get('/poster/w300/route.jpg')
+    assert response.status_code == 200 and response.data.startswith(b'\xff\xd8')
+    assert client.get('/poster/w300/route.jpg', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
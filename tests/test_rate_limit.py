@@ -0,0 +1,160 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+import app as movie_app
+
+
+def _limiter(tmp_path=None, **kwargs):
+    kwargs.setdefault('rate', 50)
+    kwargs.setdefault('burst', 2)
+    return movie_app.RateLimiter(path=str(tmp_path / 'buckets.json') if tmp_path else None, **kwargs)
+
+
+def test_queue_waits_for_a_token():
+    limiter = _limiter(max_wait=1)
+    for _ in range(3):
+        limiter.acquire('key', 'queue')
+    assert limiter.stats() == {'granted': 3, 'queued': 1, 'rejected': 0, 'backoffs': 0}
+
+
+def test_queue_gives_up_after_max_wait():
+    limiter = _limiter(rate=0.1, burst=1, max_wait=0.5)
+    limiter.acquire('key', 'queue')
+    with pytest.raises(movie_app.RateLimitExceeded) as raised:
+        limiter.acquire('key', 'queue')
+    assert not raised.value.allow_stale and raised.value.retry_after > 0.5
+
+
+@pytest.mark.parametrize('policy, allow_stale', [('shed', False), ('stale', True)])
+def test_shed_and_stale_fail_at_once(policy, allow_stale):
+    limiter = _limiter(rate=0.1, burst=1)
+    limiter.acquire('key', policy)
+    with pytest.raises(movie_app.RateLimitExceeded) as raised:
+        limiter.acquire('key', policy)
+    assert raised.value.allow_stale is allow_stale
+    assert limiter.stats()['rejected'] == 1 and limiter.stats()['queued'] == 0
+
+
+def test_keys_have_separate_buckets():
+    limiter = _limiter(rate=0.1, burst=1)
+    limiter.acquire('one', 'shed')
+    limiter.acquire('two', 'shed')
+
+
+def test_backoff_honours_retry_after():
+    limiter = _limiter()
+    assert limiter.backoff('key', {'Retry-After': '3'}, attempt=0) == 3.0
+    assert limiter.bucket('key').take() == pytest.approx(3.0, abs=0.1)
+    assert limiter.backoff('other', {}, attempt=2) == movie_app.HTTP_BACKOFF_FACTOR * 4
+
+
+def test_async_acquire_follows_the_same_policy():
+    limiter = _limiter(rate=0.1, burst=1)
+    asyncio.run(limiter.acquire_async('key', 'shed'))
+    with pytest.raises(movie_app.RateLimitExceeded):
+        asyncio.run(limiter.acquire_async('key', 'shed'))
+
+
+def test_file_buckets_are_shared_between_limiters(tmp_path):
+    first, second = _limiter(tmp_path, rate=0.1, burst=1), _limiter(tmp_path, rate=0.1, burst=1)
+    first.acquire('key', 'shed')
+    with pytest.raises(movie_app.RateLimitExceeded):
+        second.acquire('key', 'shed')
+    assert 'key' not in (tmp_path / 'buckets.json').read_text()  # keys are stored hashed
+
+
+def test_async_file_buckets_are_used_off_the_event_loop(tmp_path, monkeypatch):
+    limiter = _limiter(tmp_path, rate=0.1, burst=1)
+    threads = []
+    for name in ('take', 'pause'):
+        original = getattr(movie_app.FileTokenBucket, name)
+
+        def record(bucket, *args, original=original):
+            threads.append(threading.current_thread())
+            return original(bucket, *args)
+        monkeypatch.setattr(movie_app.FileTokenBucket, name, record)
+
+    async def run():
+        await limiter.acquire_async('key', 'shed')
+        assert await limiter.backoff_async('key', {'Retry-After': '2'}, attempt=0) == 2.0
+        with pytest.raises(movie_app.RateLimitExceeded) as raised:
+            await limiter.acquire_async('key', 'shed')
+        assert raised.value.retry_after == pytest.approx(2.0, abs=0.1)
+
+    asyncio.run(run())
+    assert len(threads) == 3 and threading.main_thread() not in threads
+
+
+def test_stale_policy_serves_an_expired_entry():
+    cache = movie_app.TTLCache(stale_while_revalidate=False)
+    cache.set('discover_28_en', {'results': [1]}, ttl=-1)
+
+    def throttled():
+        raise movie_app.RateLimitExceeded(2, allow_stale=True)
+
+    assert cache.get_or_load('discover_28_en', throttled) == {'results': [1]}
+    with pytest.raises(movie_app.RateLimitExceeded):
+        cache.get_or_load('discover_35_en', throttled)
+
+
+def test_rate_limited_routes_send_retry_after(client, monkeypatch):
+    def throttled(*args):
+        raise movie_app.RateLimitExceeded(2.2)
+
+    monkeypatch.setattr(movie_app.recommender, 'search_person', throttled)
+    response = client.get('/search_actor?actor_name=Maya')
+    assert response.status_code == 503 and response.headers['Retry-After'] == '3'
+
+
+def test_asgi_rate_limited_responses_send_retry_after(monkeypatch):
+    async def throttled(args):
+        raise movie_app.RateLimitExceeded(0.2)
+
+    monkeypatch.setitem(movie_app.ASYNC_ROUTES, '/search_actor', throttled)
+    monkeypatch.setattr(movie_app, 'async_recommender', object())
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': '/search_actor',
+             'query_string': b'actor_name=Maya', 'headers': []}
+    asyncio.run(movie_app.asgi_app(scope, None, send))
+    start, body = sent
+    assert start['status'] == 503
+    assert (b'retry-after', b'1') in start['headers']
+    assert json.loads(body['body'])['results'] == []
+
+
+def test_refused_calls_are_not_recorded_as_tmdb_calls():
+    limiter = _limiter(rate=0.1, burst=1)
+    limiter.acquire('key', 'shed')
+    client = movie_app.TMDbClient('https://tmdb.test/3', rate_limiter=limiter, rate_limit_policy='shed')
+    inflight = dict(movie_app.metrics._upstream_inflight)
+    with pytest.raises(movie_app.RateLimitExceeded):
+        client.get('https://tmdb.test/3/movie/7', {'api_key': 'key'})
+    assert client.stats()['movie/{id}'] == {'count': 0, 'errors': 0, 'rate_limited': 1, 'total_time': 0.0,
+                                            'max_time': 0.0, 'avg_time': 0.0}
+    assert movie_app.metrics._upstream_inflight == inflight
+    assert 'tmdb_rate_limited_total{endpoint="movie/{id}"}' in movie_app.metrics.render()
+
+
+def test_async_refused_calls_are_not_recorded_as_tmdb_calls():
+    pytest.importorskip('httpx')
+    limiter = _limiter(rate=0.1, burst=1)
+    limiter.acquire('key', 'shed')
+    client = movie_app.AsyncTMDbClient('https://tmdb.test/3', rate_limiter=limiter, rate_limit_policy='shed')
+
+    async def run():
+        try:
+            await client.get('https://tmdb.test/3/discover/movie', {'api_key': 'key'})
+        finally:
+            await client.close()
+
+    with pytest.raises(movie_app.RateLimitExceeded):
+        asyncio.run(run())
+    stat = client.stats()['discover/movie']
+    assert stat['count'] == stat['errors'] == 0 and stat['rate_limited'] == 1
@@ -0,0 +1,101 @@
+import json
+
+import app as movie_app
+
+
+def _finished_traces(monkeypatch):
+    finished = []
+    finish = movie_app.RequestTrace.finish
+
+    def record(trace, token, status):
+        finished.append((trace.route, status, dict(trace.counts)))
+        return finish(trace, token, status)
+
+    monkeypatch.setattr(movie_app.RequestTrace, 'finish', record)
+    return finished
+
+
+def test_streamed_batch_is_traced_after_its_body(client, monkeypatch):
+    finished = _finished_traces(monkeypatch)
+    response = client.get('/movie_details/batch?ids=201,202,203&stream=1')
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    response.close()
+    assert {line['id'] for line in lines if 'id' in line} >= {201, 202, 203}
+    [(route, status, counts)] = [entry for entry in finished if entry[0] == '/movie_details/batch']
+    assert status == 200
+    assert counts['tmdb_calls'] == 3
+
+
+def test_streamed_similar_sends_batches_then_a_summary(client):
+    response = client.get('/search_similar?movie_name=Road&language=en&stream=1')
+    assert response.headers['X-Accel-Buffering'] == 'no'
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    response.close()
+    *batches, done = events
+    assert batches and all(event['event'] == 'results' and event['results'] for event in batches)
+    assert {event['match'] for event in batches} <= {'exact', 'similar', 'fill'}
+    streamed = [movie['id'] for event in batches for movie in event['results']]
+    assert len(streamed) == len(set(streamed)) == done['total_results']
+
+    # A second search is answered from the cached page in one batch
+    cached = [json.loads(line) for line in client.get(
+        '/search_similar?movie_name=Road&language=en&stream=1').get_data(as_text=True).splitlines()]
+    assert cached[0]['match'] == 'cached'
+    assert sorted(movie['id'] for movie in cached[0]['results']) == sorted(streamed)
+
+
+def test_streamed_similar_reports_a_missing_movie(client):
+    response = client.get('/search_similar?movie_name=zzzz-no-such-film&stream=1')
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    response.close()
+    assert events == [{'event': 'done', 'total_results': 0, 'error': 'Movie not found'}]
+
+
+def _similar_key(movie_id, language='en'):
+    return f'similar_genre_{movie_id}_{language}'
+
+
+def test_streamed_similar_shares_the_cache_entry_and_its_loader(client, fake_tmdb):
+    movie_id = fake_tmdb.fake.summaries[0]['id']
+    recommender = movie_app.recommender
+    streamed = list(recommender.iter_similar_by_genre(movie_id, 'en'))
+    assert streamed and streamed[0][0] != 'cached'
+    assert _similar_key(movie_id) in recommender.cache._loaders
+    assert recommender.get_similar_by_genre(movie_id, 'en')['results'] == [
+        movie for _, movies in streamed for movie in movies]
+
+
+def test_expired_streamed_similar_is_served_stale(client, fake_tmdb, monkeypatch):
+    movie_id = fake_tmdb.fake.summaries[0]['id']
+    recommender = movie_app.recommender
+    page = recommender.get_similar_by_genre(movie_id, 'en')
+    recommender.cache.set(_similar_key(movie_id), page, ttl=-1)
+    scheduled = []
+    monkeypatch.setattr(recommender.cache.refresher, 'schedule', lambda key, loader, hits=0: scheduled.append(key))
+    monkeypatch.setattr(recommender, '_stream_similar_by_genre', None)  # must not rebuild inline
+    assert list(recommender.iter_similar_by_genre(movie_id, 'en')) == [('cached', page['results'])]
+    assert scheduled == [_similar_key(movie_id)]
+
+
+def test_rate_limited_stream_falls_back_to_a_stale_page(client, monkeypatch):
+    recommender = movie_app.recommender
+    monkeypatch.setattr(recommender, 'cache', movie_app.TTLCache())
+    recommender.cache.set(_similar_key(7), {'results': [{'id': 8}], 'page': 1, 'total_pages': 1}, ttl=-1)
+
+    def throttled(movie_id, language):
+        raise movie_app.RateLimitExceeded(1, allow_stale=True)
+        yield
+
+    monkeypatch.setattr(recommender, '_stream_similar_by_genre', throttled)
+    assert list(recommender.iter_similar_by_genre(7, 'en')) == [('cached', [{'id': 8}])]
+
+
+def test_closed_stream_lets_waiting_callers_load_it(client, fake_tmdb):
+    movie_id = fake_tmdb.fake.summaries[1]['id']
+    recommender = movie_app.recommender
+    stream = recommender.iter_similar_by_genre(movie_id, 'en')
+    next(stream)
+    assert _similar_key(movie_id) in recommender.cache._inflight
+    stream.close()
+    assert _similar_key(movie_id) not in recommender.cache._inflight
+    assert recommender.get_similar_by_genre(movie_id, 'en')['results']
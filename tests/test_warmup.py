@@ -0,0 +1,31 @@
+import app as movie_app
+
+
+def test_rate_limited_tasks_fail_after_a_few_waits():
+    calls = []
+
+    def throttled(movie_id):
+        calls.append(movie_id)
+        raise movie_app.RateLimitExceeded(0)
+
+    warmer = movie_app.CacheWarmer(movie_app.recommender)
+    warmer.planned = 1
+    warmer._run_task('details 1', throttled, (1,))
+    assert len(calls) == movie_app.WARMUP_RATE_LIMIT_RETRIES + 1
+    assert warmer.progress()['failed'] == 1 and warmer.progress()['completed'] == 1
+
+
+def test_warm_up_fills_the_cache(fake_tmdb, client):
+    warmer = movie_app.CacheWarmer(movie_app.recommender, top_movies=3, top_people=2, languages=['en'])
+    progress = warmer.run()
+    assert progress['state'] == 'done' and progress['ready']
+    assert progress['planned'] == 1 + 3 + 3 + 2 and progress['failed'] == 0
+    top_movie = fake_tmdb.fake.summaries[0]['id']
+    assert f'details_{top_movie}' in movie_app.recommender.cache
+
+
+def test_details_route_uses_the_cached_details(client, fake_tmdb):
+    movie_id = fake_tmdb.fake.summaries[0]['id']
+    assert client.get(f'/movie_details/{movie_id}').get_json()['id'] == movie_id
+    assert f'details_{movie_id}' in movie_app.recommender.cache
+    assert client.get('/movie_details/999999').get_json() == {'error': 'Movie not found'}